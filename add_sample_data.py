@@ -1,40 +1,44 @@
 """Script to add sample data to the database"""
+from sqlalchemy import insert
+
 from app import create_app, db
+from app.changes import bump_version, clear_tasks, commit_changes
 from app.models import Task
 
 app = create_app()
 
 with app.app_context():
     # Clear existing data
-    Task.query.delete()
+    version = bump_version()
+    clear_tasks(version)
     
     # Add sample tasks
     tasks = [
-        Task(
+        dict(
             title="Set up GitHub repository",
             description="Create repository and initialize project structure",
             status="Done",
             priority="High"
         ),
-        Task(
+        dict(
             title="Implement REST API",
             description="Create CRUD endpoints for task management",
             status="In Progress",
             priority="High"
         ),
-        Task(
+        dict(
             title="Write unit tests",
             description="Create test cases for all API endpoints",
             status="In Progress",
             priority="Medium"
         ),
-        Task(
+        dict(
             title="Setup CI/CD pipeline",
             description="Configure GitHub Actions for automated testing",
             status="New",
             priority="Medium"
         ),
-        Task(
+        dict(
             title="Deploy to production",
             description="Deploy application to cloud hosting",
             status="New",
@@ -42,8 +46,6 @@ with app.app_context():
         )
     ]
     
-    for task in tasks:
-        db.session.add(task)
-    
-    db.session.commit()
+    db.session.execute(insert(Task), [dict(task, change_seq=version) for task in tasks])
+    commit_changes([{'op': 'reloaded', 'id': None, 'task': None, 'before': None}], version)
     print(f"✓ Added {len(tasks)} sample tasks to database")
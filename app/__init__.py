@@ -2,24 +2,123 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import os
+from functools import partial
 
-db = SQLAlchemy()
+from app.database import ShardSession, apply_sqlite_pragmas, engine_options, env_int, sqlite_pragmas_from_env
 
-def create_app():
+db = SQLAlchemy(session_options={'class_': ShardSession})
+
+def create_app(test_config=None):
     app = Flask(__name__)
     
     # Configuration
-    app.config['SECRET_KEY'] = 'dev-secret-key-change-in-production'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///kanban.db'
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///kanban.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLITE_PRAGMAS'] = sqlite_pragmas_from_env()
+    # Apply pending schema migrations at startup too, not only with `flask upgrade`
+    app.config['SCHEMA_AUTO_UPGRADE'] = os.environ.get('SCHEMA_AUTO_UPGRADE', '0') == '1'
+    # Read replicas of DATABASE_URL, comma-separated (see app.replicas)
+    app.config['DATABASE_REPLICA_URLS'] = [
+        url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()
+    ]
+    app.config['REPLICA_MAX_LAG'] = float(os.environ.get('REPLICA_MAX_LAG', '1.0'))
+    app.config['REPLICA_CHECK_INTERVAL'] = float(os.environ.get('REPLICA_CHECK_INTERVAL', '0.25'))
+    app.config['REPLICA_STICKY_SECONDS'] = int(os.environ.get('REPLICA_STICKY_SECONDS', '5'))
+    app.config['TASKS_PAGE_SIZE'] = 100
+    app.config['TASKS_MAX_PAGE_SIZE'] = 1000
+    app.config['TASKS_MAX_BATCH_SIZE'] = 1000
+    app.config['BOARD_COLUMN_SIZE'] = 20
+    app.config['TASK_CACHE_ENABLED'] = True
+    app.config['TASK_CACHE_MAX_ENTRIES'] = 512
+    app.config['TASK_CACHE_TTL'] = 30
+    app.config['EXPORT_CHUNK_SIZE'] = 1000
+    app.config['IMPORT_CHUNK_SIZE'] = 1000
+    app.config['IMPORT_MAX_LINE_BYTES'] = 1024 * 1024
+    app.config['SSE_QUEUE_SIZE'] = 100
+    app.config['SSE_HISTORY_SIZE'] = 1000
+    app.config['SSE_POLL_INTERVAL'] = 1.0
+    app.config['SSE_HEARTBEAT_INTERVAL'] = 15
+    app.config['SSE_MAX_DURATION'] = 300
+    # Each stream holds a worker thread. gunicorn.conf.py sizes its thread pool
+    # to these streams plus 4 threads for ordinary requests, which a
+    # GUNICORN_THREADS set on its own still leaves free
+    threads = env_int('GUNICORN_THREADS', None)
+    app.config['SSE_MAX_SUBSCRIBERS'] = env_int(
+        'SSE_MAX_SUBSCRIBERS', 16 if threads is None else max(1, threads - 4)
+    )
+    app.config['TOMBSTONE_RETENTION_DAYS'] = 30
+    app.config['JSON_PROVIDER'] = os.environ.get('JSON_PROVIDER', 'auto')
+    app.config['COMPRESS_ENABLED'] = True
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    app.config['COMPRESS_LEVEL'] = 6
+    app.config['COMPRESS_BROTLI_QUALITY'] = 4
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') == '1'
+    app.config['DIAGNOSTICS_ENABLED'] = os.environ.get('DIAGNOSTICS_ENABLED', '0') == '1'
+    app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', '100'))
+    app.config['N_PLUS_ONE_THRESHOLD'] = 5
+    # Commit concurrent creates and updates together (see app.group_commit)
+    app.config['GROUP_COMMIT_ENABLED'] = os.environ.get('GROUP_COMMIT_ENABLED', '0') == '1'
+    app.config['GROUP_COMMIT_MAX_DELAY_MS'] = float(os.environ.get('GROUP_COMMIT_MAX_DELAY_MS', '5'))
+    app.config['GROUP_COMMIT_MAX_BATCH'] = int(os.environ.get('GROUP_COMMIT_MAX_BATCH', '64'))
+    # Directories holding board shard databases (default: instance/shards)
+    app.config['SHARD_DIRS'] = [path for path in os.environ.get('SHARD_DIRS', '').split(os.pathsep) if path]
+    app.config['SHARD_IDLE_TIMEOUT'] = float(os.environ.get('SHARD_IDLE_TIMEOUT', '300'))
+    app.config['SHARD_MAX_OPEN'] = 64
+    # Seconds a board's registry entry is reused between requests
+    app.config['SHARD_REGISTRY_TTL'] = 0.5
+    # Seconds a moving board answers 503 before its database is copied
+    app.config['SHARD_MOVE_SETTLE'] = 1.0
+    
+    if test_config is not None:
+        app.config.update(test_config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    
+    from app.serialization import make_json_provider
+    app.json = make_json_provider(app)
     
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
+        # Also applied to every board shard engine the router opens later
+        engine_hooks = [partial(apply_sqlite_pragmas, pragmas=app.config['SQLITE_PRAGMAS'])]
+        if app.config['METRICS_ENABLED']:
+            from app.metrics import init_metrics, instrument_engine
+            if init_metrics(app, db.engine) is not None:
+                engine_hooks.append(instrument_engine)
+        if app.config['DIAGNOSTICS_ENABLED']:
+            from app.diagnostics import init_diagnostics, instrument_engine
+            init_diagnostics(app, db.engine)
+            engine_hooks.append(instrument_engine)
     CORS(app)
     
+    from app.shards import init_shards
+    init_shards(app, engine_hooks)
+    
+    from app.replicas import init_replicas
+    init_replicas(app, engine_hooks)
+    
+    if app.config['TASK_CACHE_ENABLED']:
+        from app.cache import init_task_cache
+        init_task_cache(app)
+    
+    from app.stream import init_change_broker
+    init_change_broker(app)
+    
+    if app.config['GROUP_COMMIT_ENABLED']:
+        from app.group_commit import init_group_commit
+        init_group_commit(app)
+    
+    from app.commands import register_commands
+    register_commands(app)
+    
     # Register blueprints
-    from app.routes import api
+    from app.routes import api, boards
     app.register_blueprint(api, url_prefix='/api')
+    # The same routes scoped to one board, e.g. /api/boards/2/tasks
+    app.register_blueprint(api, url_prefix='/api/boards/<int:board_id>', name='board_api')
+    app.register_blueprint(boards, url_prefix='/api/boards')
     
     # Security headers
     @app.after_request
@@ -34,8 +133,13 @@ def create_app():
         response.headers['Permissions-Policy'] = 'geolocation=(), microphone=(), camera=()'
         return response
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Response compression
+    if app.config['COMPRESS_ENABLED']:
+        from app.compression import compress_response
+        app.after_request(compress_response)
+    
+    # Check the schema version; migrations normally run with `flask upgrade`
+    from app.migrations import init_schema
+    init_schema(app)
     
     return app
@@ -0,0 +1,116 @@
+"""In-process cache of serialized task list responses"""
+import threading
+import time
+from collections import OrderedDict
+
+from app.changes import tasks_committed
+
+
+class ResponseCache:
+    """Bounded LRU + TTL cache of serialized responses.
+
+    Every entry records the data version it was built from, a tag (the
+    status filter of the list query, or None for an unfiltered list) and a
+    scope (the board it was read from). An
+    entry is only served while the data version is unchanged, so writes
+    made by other worker processes can never be masked. Writes made in this
+    process invalidate precisely: entries of the written board whose tag is
+    touched by the write are dropped, and the rest of that board's entries
+    are carried forward to the new version.
+    """
+
+    def __init__(self, max_entries=256, ttl=30.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, version):
+        """Return the cached value for key at version, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, entry_version, _, _, expires = entry
+            if entry_version != version or expires <= self._clock():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, version, tag=None, scope=None):
+        """Store value for key, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = [value, version, tag, scope, self._clock() + self.ttl]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, version, tags, scope=None):
+        """Apply a write committed at version, in scope, that touched the given tags"""
+        with self._lock:
+            for key in list(self._entries):
+                entry = self._entries[key]
+                if entry[3] != scope:
+                    # Other boards have their own data versions
+                    continue
+                if entry[2] is None or entry[2] in tags:
+                    del self._entries[key]
+                    self.invalidations += 1
+                elif entry[1] == version - 1:
+                    # No other write happened in between, so the entry is still current
+                    entry[1] = version
+
+    def clear(self, scope=None):
+        """Drop every entry, or only those of scope"""
+        with self._lock:
+            if scope is None:
+                self._entries.clear()
+                return
+            for key in [key for key, entry in self._entries.items() if entry[3] == scope]:
+                del self._entries[key]
+
+    def stats(self):
+        """Return the cache counters"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+def init_task_cache(app):
+    """Create the task list cache for app, export its counters and invalidate it on every committed write"""
+    cache = ResponseCache(app.config['TASK_CACHE_MAX_ENTRIES'], app.config['TASK_CACHE_TTL'])
+    app.extensions['task_cache'] = cache
+    if 'metrics' in app.extensions:
+        app.extensions['metrics'].watch_cache(cache)
+
+    def invalidate(sender, version, changes, board_id=None):
+        if any(change['op'] == 'reloaded' for change in changes):
+            cache.clear(board_id)
+            return
+
+        tags = set()
+        for change in changes:
+            for values in (change['before'], change['task']):
+                if values:
+                    tags.add(values['status'])
+        cache.invalidate(version, tags, board_id)
+
+    tasks_committed.connect(invalidate, sender=app, weak=False)
+    return cache
@@ -0,0 +1,269 @@
+"""Change tracking for the tasks table
+
+Every write builds a list of change records and hands it to
+commit_changes(). A change record is a dict with:
+
+- op: 'created', 'updated' or 'deleted'
+- id: the task id
+- task: the task as returned by Task.to_dict() after the write (None for deletes)
+- before: the TRACKED_FIELDS values before the write (None for creates)
+
+Bulk loads that are too large to describe row by row (imports) record a
+single change with op 'reloaded' and every other key set to None;
+subscribers must assume any task may have changed. Such writers call
+bump_version() first and stamp their own rows' change_seq with it.
+
+Each change to a tracked field is also appended to task_events, and the
+status moves among them are summed per day into flow_daily, the rollup
+behind cumulative flow diagrams (see app.history).
+"""
+from collections import Counter
+from datetime import datetime
+from blinker import Namespace
+from flask import current_app
+from sqlalchemy import (Date, and_, case, delete, func, insert, literal, null, or_, select, type_coerce, union_all,
+                        update)
+from app import db
+from app.database import current_board_id
+from app.models import DataVersion, FlowDay, Task, TaskEvent, TaskTombstone
+
+# Primary key of the single data_version row
+VERSION_ROW_ID = 1
+
+# Task fields whose previous values are recorded with every change
+TRACKED_FIELDS = ('status', 'priority', 'assigned_to')
+
+_signals = Namespace()
+
+# Sent with version=, changes= and board_id= after a write to a board's tasks table commits
+tasks_committed = _signals.signal('tasks-committed')
+
+
+def current_version():
+    """Return the current data version with a single primary-key lookup"""
+    version = db.session.execute(
+        select(DataVersion.version).where(DataVersion.id == VERSION_ROW_ID)
+    ).scalar()
+    return version or 0
+
+
+def bump_version():
+    """Increment the data version in the current transaction and return it.
+
+    Call this before committing any write to the tasks table, so the new
+    version becomes visible atomically with the change it describes.
+    """
+    version = db.session.execute(
+        update(DataVersion)
+        .where(DataVersion.id == VERSION_ROW_ID)
+        .values(version=DataVersion.version + 1)
+        .returning(DataVersion.version)
+    ).scalar()
+
+    if version is None:
+        version = 1
+        db.session.execute(insert(DataVersion).values(id=VERSION_ROW_ID, version=version))
+    return version
+
+
+def tracked_values(task):
+    """Return the TRACKED_FIELDS of a task (ORM object or row) as a dict"""
+    return {field: getattr(task, field) for field in TRACKED_FIELDS}
+
+
+def stamp_changes(version, changes):
+    """Record changes for delta sync: stamp written tasks, leave tombstones for deleted ones"""
+    written = [change['id'] for change in changes if change['op'] in ('created', 'updated')]
+    if written:
+        db.session.execute(
+            update(Task)
+            .where(Task.id.in_(written))
+            # Setting updated_at to itself keeps its onupdate from firing
+            .values(change_seq=version, updated_at=Task.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    deleted = [change['id'] for change in changes if change['op'] == 'deleted']
+    if deleted:
+        db.session.execute(
+            insert(TaskTombstone),
+            [{'task_id': task_id, 'change_seq': version} for task_id in deleted]
+        )
+
+
+def _event_rows(version, changes, now):
+    """task_events rows for the tracked fields each change modified"""
+    rows = []
+    for change in changes:
+        op = change['op']
+        before = change['before'] or {}
+        after = change['task'] or {}
+        # A deletion takes the task off the board: only its status matters
+        fields = ('status',) if op == 'deleted' else TRACKED_FIELDS
+        for field in fields:
+            old, new = before.get(field), after.get(field)
+            if old != new and not (op == 'created' and new == ''):
+                rows.append({'task_id': change['id'], 'op': op, 'field': field, 'old_value': old,
+                             'new_value': new, 'occurred_at': now, 'change_seq': version})
+    return rows
+
+
+def _reloaded_event_queries(version=None):
+    """SELECTs reconstructing the history of the tasks a bulk load stamped with version
+
+    Each task is created New and then moved to In Progress at started_at and
+    to Done at completed_at, as far as those are known; tasks without them
+    are created in their current status. With version None, the history of
+    every task that has no events is reconstructed, at its own change_seq.
+    """
+    if version is None:
+        loaded = ~select(TaskEvent.id).where(TaskEvent.task_id == Task.id).exists()
+        change_seq = Task.change_seq
+        # Rows written by hand may lack created_at
+        created_at = func.coalesce(Task.created_at, Task.updated_at, func.current_timestamp())
+    else:
+        loaded = Task.change_seq == version
+        change_seq = literal(version)
+        created_at = Task.created_at
+    started = and_(Task.status == 'In Progress', Task.started_at.isnot(None))
+    done = and_(Task.status == 'Done', Task.completed_at.isnot(None))
+
+    def events(op, field, old, new, occurred_at, *where):
+        return select(Task.id, literal(op), literal(field), old, new, occurred_at,
+                      change_seq).where(loaded, *where)
+
+    return [
+        events('created', 'status', null(), case((or_(started, done), 'New'), else_=Task.status),
+               created_at),
+        events('created', 'priority', null(), Task.priority, created_at,
+               Task.priority.isnot(None), Task.priority != ''),
+        events('created', 'assigned_to', null(), Task.assigned_to, created_at,
+               Task.assigned_to.isnot(None), Task.assigned_to != ''),
+        events('updated', 'status', literal('New'), literal('In Progress'), Task.started_at,
+               Task.started_at.isnot(None), or_(started, done)),
+        events('updated', 'status', case((Task.started_at.is_(None), 'New'), else_='In Progress'),
+               literal('Done'), Task.completed_at, done),
+    ]
+
+
+def backfill_task_events(conn):
+    """Reconstruct the history of tasks with no events (written before task_events existed)
+
+    Returns True if any were found; flow_daily then needs rebuilding.
+    """
+    columns = ('task_id', 'op', 'field', 'old_value', 'new_value', 'occurred_at', 'change_seq')
+    # One statement: each query skips tasks that already have events, including those just added
+    inserted = conn.execute(insert(TaskEvent).from_select(columns, union_all(*_reloaded_event_queries())))
+    return inserted.rowcount > 0
+
+
+def _add_flow(deltas):
+    """Add {(day, status): delta} to flow_daily"""
+    for (day, status), delta in deltas.items():
+        if not delta or status is None:
+            continue
+        updated = db.session.execute(
+            update(FlowDay)
+            .where(FlowDay.day == day, FlowDay.status == status)
+            .values(delta=FlowDay.delta + delta)
+        ).rowcount
+        if not updated:
+            db.session.execute(insert(FlowDay).values(day=day, status=status, delta=delta))
+
+
+def record_events(version, changes):
+    """Append the changes to task_events and their status moves to flow_daily
+
+    Bulk loads ('reloaded') get their history reconstructed from the loaded
+    rows with a few INSERT ... SELECT statements.
+    """
+    deltas = Counter()
+    if any(change['op'] == 'reloaded' for change in changes):
+        last_id = db.session.execute(select(func.max(TaskEvent.id))).scalar() or 0
+        columns = ('task_id', 'op', 'field', 'old_value', 'new_value', 'occurred_at', 'change_seq')
+        for query in _reloaded_event_queries(version):
+            db.session.execute(insert(TaskEvent).from_select(columns, query))
+
+        day = type_coerce(func.date(TaskEvent.occurred_at), Date)
+        moves = db.session.execute(
+            select(day, TaskEvent.old_value, TaskEvent.new_value, func.count())
+            .where(TaskEvent.id > last_id, TaskEvent.field == 'status')
+            .group_by(day, TaskEvent.old_value, TaskEvent.new_value)
+        )
+        for moved_on, old, new, count in moves:
+            deltas[moved_on, old] -= count
+            deltas[moved_on, new] += count
+        changes = [change for change in changes if change['op'] != 'reloaded']
+
+    now = datetime.utcnow()
+    rows = _event_rows(version, changes, now)
+    if rows:
+        db.session.execute(insert(TaskEvent), rows)
+        for row in rows:
+            if row['field'] == 'status':
+                deltas[now.date(), row['old_value']] -= 1
+                deltas[now.date(), row['new_value']] += 1
+    _add_flow(deltas)
+
+
+def commit_changes(changes, version=None):
+    """Stamp a new data version, commit, then announce the committed changes
+
+    Pass version if the caller already called bump_version() in this transaction.
+    """
+    if version is None:
+        version = bump_version()
+    stamp_changes(version, changes)
+    record_events(version, changes)
+    db.session.commit()
+    tasks_committed.send(current_app._get_current_object(), version=version, changes=changes,
+                         board_id=current_board_id())
+    return version
+
+
+def clear_tasks(version):
+    """Delete every task, tombstone and event in the current transaction
+
+    Pass the version from bump_version(). Every sync token issued before it
+    expires, so delta-sync clients resync from scratch.
+    """
+    db.session.execute(delete(Task))
+    db.session.execute(delete(TaskTombstone))
+    db.session.execute(delete(TaskEvent))
+    db.session.execute(delete(FlowDay))
+    db.session.execute(
+        update(DataVersion)
+        .where(DataVersion.id == VERSION_ROW_ID)
+        .values(compacted_version=version)
+    )
+
+
+def sync_state():
+    """Return (current data version, compacted tombstone version)"""
+    row = db.session.execute(
+        select(DataVersion.version, DataVersion.compacted_version).where(DataVersion.id == VERSION_ROW_ID)
+    ).first()
+    return (row.version, row.compacted_version) if row else (0, 0)
+
+
+def compact_tombstones(retention):
+    """Delete tombstones older than retention (a timedelta) and return how many were removed
+
+    Sync tokens from before the newest removed tombstone can no longer be
+    served; DataVersion.compacted_version records that watermark.
+    """
+    cutoff = datetime.utcnow() - retention
+    watermark = db.session.execute(
+        select(func.max(TaskTombstone.change_seq)).where(TaskTombstone.deleted_at < cutoff)
+    ).scalar()
+    if watermark is None:
+        return 0
+
+    removed = db.session.execute(delete(TaskTombstone).where(TaskTombstone.change_seq <= watermark)).rowcount
+    db.session.execute(
+        update(DataVersion)
+        .where(DataVersion.id == VERSION_ROW_ID, DataVersion.compacted_version < watermark)
+        .values(compacted_version=watermark)
+    )
+    db.session.commit()
+    return removed
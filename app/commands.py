@@ -0,0 +1,145 @@
+"""Flask CLI commands (run with: flask --app run <command>)"""
+import time
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import create_engine
+
+from app.changes import compact_tombstones
+from app import db
+from app.database import DEFAULT_BOARD_ID
+from app.history import rebuild_flow
+from app.migrations import head_version, schema_version, upgrade
+from app.models import Board
+from app.seed import seed_tasks
+from app.shards import BALANCE_BY, board_loads, board_scope, create_board, move_board, plan_rebalance
+from app.stats import rebuild_stats, stats_available
+
+board_option = click.option('--board', type=int, default=DEFAULT_BOARD_ID, show_default=True,
+                            help='Board to run against.')
+
+
+@click.command('compact-tombstones')
+@click.option('--days', type=int, default=None,
+              help='Keep tombstones for this many days (default: TOMBSTONE_RETENTION_DAYS).')
+@board_option
+@with_appcontext
+def compact_tombstones_command(days, board):
+    """Delete delta-sync tombstones older than the retention period."""
+    if days is None:
+        days = current_app.config['TOMBSTONE_RETENTION_DAYS']
+    with board_scope(board):
+        removed = compact_tombstones(timedelta(days=days))
+    click.echo(f'Removed {removed} tombstones older than {days} days')
+
+
+@click.command('seed')
+@click.option('--count', type=int, default=100000, show_default=True, help='Number of tasks to generate.')
+@click.option('--seed', type=int, default=0, show_default=True,
+              help='Random seed; the same seed always generates the same tasks.')
+@click.option('--assignees', type=int, default=50, show_default=True, help='Number of distinct assignees.')
+@click.option('--days', type=int, default=365, show_default=True, help='Spread creation dates over this many days.')
+@click.option('--chunk-size', type=int, default=10000, show_default=True, help='Rows per bulk insert.')
+@click.option('--reset', is_flag=True, help='Delete every existing task first.')
+@board_option
+@with_appcontext
+def seed_command(count, seed, assignees, days, chunk_size, reset, board):
+    """Fill the database with synthetic tasks, in one transaction."""
+    started = time.perf_counter()
+    with board_scope(board), click.progressbar(length=count, label=f'Seeding {count} tasks') as bar:
+        seed_tasks(count, seed=seed, assignees=assignees, days=days, chunk_size=chunk_size,
+                   reset=reset, progress=bar.update)
+    elapsed = time.perf_counter() - started
+    click.echo(f'Inserted {count} tasks in {elapsed:.1f}s ({count / elapsed:,.0f} rows/s)')
+
+
+@click.command('rebuild-stats')
+@board_option
+@with_appcontext
+def rebuild_stats_command(board):
+    """Recompute the flow statistics and cumulative flow summaries from scratch."""
+    started = time.perf_counter()
+    with board_scope(board):
+        if stats_available(db.session.get_bind()):
+            rebuild_stats()
+        rebuild_flow()
+        db.session.commit()
+    click.echo(f'Rebuilt flow statistics in {time.perf_counter() - started:.2f}s')
+
+
+@click.command('create-board')
+@click.argument('name')
+@with_appcontext
+def create_board_command(name):
+    """Create a board with its own shard database."""
+    board = create_board(name)
+    click.echo(f'Created board {board.id} in {board.shard}')
+
+
+@click.command('move-board')
+@click.argument('board', type=int)
+@click.argument('directory', type=click.Path(file_okay=False))
+@with_appcontext
+def move_board_command(board, directory):
+    """Move a board's database to another shard directory."""
+    started = time.perf_counter()
+    move_board(board, directory, current_app.config['SHARD_MOVE_SETTLE'])
+    click.echo(f'Moved board {board} to {directory} in {time.perf_counter() - started:.1f}s')
+
+
+@click.command('rebalance-shards')
+@click.option('--by', type=click.Choice(BALANCE_BY), default='size', show_default=True,
+              help='Even out database size or write volume.')
+@click.option('--dry-run', is_flag=True, help='Only print the planned moves.')
+@with_appcontext
+def rebalance_shards_command(by, dry_run):
+    """Move boards between SHARD_DIRS so each directory carries a similar load."""
+    loads = board_loads(by)
+    moves = plan_rebalance(loads, current_app.extensions['shards'].directories)
+    if not moves:
+        click.echo('Shards are balanced')
+    for board, source, target in moves:
+        click.echo(f'Board {board} ({loads[board][1]} {"bytes" if by == "size" else "writes"}): {source} -> {target}')
+        if not dry_run:
+            move_board(board, target, current_app.config['SHARD_MOVE_SETTLE'])
+
+
+@click.command('upgrade')
+@with_appcontext
+def upgrade_command():
+    """Apply pending schema migrations to the database and every board database."""
+    started = time.perf_counter()
+    previous = schema_version()
+    applied = upgrade()
+    if applied:
+        click.echo(f'Upgraded from version {previous} to {head_version()}: {", ".join(applied)}')
+    else:
+        click.echo(f'Schema is up to date (version {head_version()})')
+
+    router = current_app.extensions['shards']
+    upgraded = 0
+    for board in Board.query.filter(Board.shard.isnot(None)):
+        # Not through router.engine(), which migrates or refuses a stale database itself
+        path = router.path(board.id, board.shard)
+        router.close(path)
+        engine = create_engine(f'sqlite:///{path}')
+        try:
+            upgraded += bool(upgrade(engine, shard=True))
+        finally:
+            engine.dispose()
+    if upgraded:
+        click.echo(f'Upgraded {upgraded} board databases')
+    click.echo(f'Done in {time.perf_counter() - started:.2f}s')
+
+
+def register_commands(app):
+    """Register the CLI commands on app"""
+    app.cli.add_command(compact_tombstones_command)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(rebuild_stats_command)
+    app.cli.add_command(create_board_command)
+    app.cli.add_command(move_board_command)
+    app.cli.add_command(rebalance_shards_command)
+    app.cli.add_command(upgrade_command)
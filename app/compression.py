@@ -0,0 +1,94 @@
+"""Negotiated response compression (gzip, and brotli when installed)"""
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# Server preference order; the client's q-values decide between them
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+# Server-Sent Events are left alone: events are tiny and a compressor
+# per long-lived connection costs more memory than it saves bandwidth
+COMPRESSIBLE_MIMETYPES = frozenset({
+    'application/json',
+    'application/x-ndjson',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/csv',
+    'application/javascript',
+})
+
+
+class _Compressor:
+    """Incremental compressor with a common interface for gzip and brotli"""
+
+    def __init__(self, encoding, config):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=config['COMPRESS_BROTLI_QUALITY'])
+            self.compress = compressor.process
+            self.flush = compressor.flush
+            self.finish = compressor.finish
+        else:
+            compressor = zlib.compressobj(config['COMPRESS_LEVEL'], zlib.DEFLATED, 31)
+            self.compress = compressor.compress
+            self.flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = compressor.flush
+
+
+def _compress_stream(source, chunks, compressor):
+    """Compress a streamed body chunk by chunk, flushing after each chunk.
+
+    Flushing keeps the stream incremental: every chunk the view yields
+    reaches the client as soon as it is produced instead of sitting in the
+    compressor's window until the end of the response.
+    """
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield compressor.compress(chunk) + compressor.flush()
+        yield compressor.finish()
+    finally:
+        if hasattr(source, 'close'):
+            source.close()
+
+
+def compress_response(response):
+    """Compress response with the best encoding the client accepts.
+
+    Buffered bodies are compressed whole when at least COMPRESS_MIN_SIZE
+    bytes long; streamed bodies are always compressed, incrementally, and
+    are never buffered. Strong ETags become weak, since the compressed
+    bytes differ from the identity representation.
+    """
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES or response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+
+    config = current_app.config
+    if response.is_streamed:
+        source = response.response
+        response.response = _compress_stream(source, response.iter_encoded(), _Compressor(encoding, config))
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        compressor = _Compressor(encoding, config)
+        response.set_data(compressor.compress(data) + compressor.finish())
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,136 @@
+"""Database engine configuration"""
+import os
+from contextvars import ContextVar
+
+import sqlalchemy as sa
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+
+def env_int(name, default):
+    """Read an integer setting from the environment"""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def sqlite_pragmas_from_env():
+    """Connect-time SQLite pragmas, overridable from the environment
+
+    WAL lets readers proceed while a writer commits; synchronous=NORMAL is
+    durable across application crashes in WAL mode and avoids an fsync per
+    commit; busy_timeout makes concurrent writers wait instead of failing
+    with "database is locked".
+    """
+    return {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': env_int('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'mmap_size': env_int('SQLITE_MMAP_SIZE', 64 * 1024 * 1024),
+        # Negative values are KiB rather than pages
+        'cache_size': env_int('SQLITE_CACHE_SIZE', -16000),
+    }
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for uri, tunable from the environment
+
+    Pool sizing only applies to server databases; SQLite connections are
+    cheap and SQLAlchemy picks a suitable pool for file and memory databases.
+    """
+    if uri.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': env_int('DB_POOL_SIZE', 5),
+        'max_overflow': env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': True,
+    }
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run pragmas on every new connection of a SQLite engine"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+# Board every statement is scoped to: (board id, shard database path or None
+# for the default database). Set per request by app.shards.
+DEFAULT_BOARD_ID = 1
+_board_scope = ContextVar('kanban_board_scope', default=(DEFAULT_BOARD_ID, None))
+
+
+def current_board_id():
+    """Id of the board the current request or board_scope() works on"""
+    return _board_scope.get()[0]
+
+
+def current_shard_path():
+    """Database file of the current board, or None for the default database"""
+    return _board_scope.get()[1]
+
+
+def set_board_scope(board_id, shard_path):
+    """Route db.session to shard_path (None: the default database) as board board_id"""
+    _board_scope.set((board_id, shard_path))
+
+
+# Engine of the read replica the current read-only view was routed to, if
+# any. Set per request by app.replicas.
+_replica_engine = ContextVar('kanban_replica_engine', default=None)
+
+
+def current_replica():
+    """Replica engine the current request reads from, or None for the primary"""
+    return _replica_engine.get()
+
+
+def set_replica(engine):
+    """Route db.session to engine (None: the primary); returns a token for reset_replica()"""
+    return _replica_engine.set(engine)
+
+
+def reset_replica(token):
+    """Undo set_replica()"""
+    _replica_engine.reset(token)
+
+
+def _is_registry(mapper, clause):
+    """True if the statement targets a table marked info={'registry': True}"""
+    table = None
+    if mapper is not None:
+        table = sa.inspect(mapper).local_table
+    elif isinstance(clause, sa.Table):
+        table = clause
+    elif isinstance(clause, sa.UpdateBase) and isinstance(clause.table, sa.Table):
+        table = clause.table
+    return table is not None and table.info.get('registry', False)
+
+
+class ShardSession(Session):
+    """Session sending the statements of a board scope to that board's shard database
+
+    Registry tables (the board directory itself) always stay on the default
+    database; see app.shards for how scopes are entered. Views routed to a
+    read replica (see app.replicas) read the default database from it.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not _is_registry(mapper, clause):
+            shard_path = current_shard_path()
+            if shard_path is not None:
+                return current_app.extensions['shards'].engine(shard_path)
+            replica = current_replica()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
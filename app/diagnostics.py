@@ -0,0 +1,153 @@
+"""Opt-in request diagnostics: slow query log, N+1 detection and Server-Timing
+
+Enabled with DIAGNOSTICS_ENABLED. For every request it times each SQL
+statement and the JSON encoding of the response, then:
+
+- logs statements slower than SLOW_QUERY_MS with their query plan,
+- logs requests that run the same statement shape N_PLUS_ONE_THRESHOLD
+  times or more, the signature of a query issued once per row,
+- adds a Server-Timing header splitting db, serialize and total time to
+  responses of the api blueprints.
+
+Streamed bodies are produced after the headers are sent, so for them the
+header only covers the work done before streaming started.
+"""
+import re
+import time
+from collections import Counter
+
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+
+# WSGI environ key holding the RequestDiagnostics of the current request
+ENVIRON_KEY = 'kanban.diagnostics'
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAMETER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class RequestDiagnostics:
+    """SQL and serialization timings of one request"""
+
+    __slots__ = ('start', 'db_seconds', 'serialize_seconds', 'serializing', 'statements', 'shapes')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        # True while inside the provider, whose response() may call its own dumps()
+        self.serializing = False
+        self.statements = 0
+        self.shapes = Counter()
+
+
+def statement_shape(statement):
+    """Reduce a SQL statement to its structure: literals and IN-list lengths are dropped"""
+    shape = _LITERAL.sub('?', statement)
+    shape = _PARAMETER_LIST.sub('(?...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+def _current():
+    if has_request_context():
+        return request.environ.get(ENVIRON_KEY)
+    return None
+
+
+def _explain(cursor, dialect_name, statement, parameters):
+    """Return the query plan of statement as text, run on the same connection"""
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect_name == 'sqlite' else 'EXPLAIN '
+    try:
+        plan_cursor = cursor.connection.cursor()
+        try:
+            plan_cursor.execute(prefix + statement, parameters)
+            rows = plan_cursor.fetchall()
+        finally:
+            plan_cursor.close()
+    except Exception as e:
+        return f'(no plan: {e})'
+    if dialect_name == 'sqlite':
+        # Rows are (id, parent, notused, detail)
+        return '\n'.join(f'  {row[-1]}' for row in rows)
+    return '\n'.join(f'  {row[0]}' for row in rows)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current() is not None:
+        context._diagnostics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_diagnostics_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    diagnostics = request.environ[ENVIRON_KEY]
+    diagnostics.db_seconds += elapsed
+    diagnostics.statements += 1
+    diagnostics.shapes[statement_shape(statement)] += 1
+
+    threshold = current_app.config['SLOW_QUERY_MS']
+    if elapsed * 1000 >= threshold and not executemany:
+        plan = _explain(cursor, conn.dialect.name, statement, parameters)
+        current_app.logger.warning('Slow query (%.1f ms) in %s %s:\n  %s\n  parameters: %.200r\nplan:\n%s',
+                                   elapsed * 1000, request.method, request.path,
+                                   _WHITESPACE.sub(' ', statement), parameters, plan)
+
+
+def _time_serialization(provider):
+    """Make provider add the time it spends encoding JSON to the current request"""
+    for name in ('dumps', 'response'):
+        method = getattr(provider, name)
+
+        def timed(*args, _method=method, **kwargs):
+            diagnostics = _current()
+            if diagnostics is None or diagnostics.serializing:
+                return _method(*args, **kwargs)
+            diagnostics.serializing = True
+            start = time.perf_counter()
+            try:
+                return _method(*args, **kwargs)
+            finally:
+                diagnostics.serialize_seconds += time.perf_counter() - start
+                diagnostics.serializing = False
+        setattr(provider, name, timed)
+
+
+def init_diagnostics(app, engine):
+    """Turn on request diagnostics for app"""
+    threshold = app.config['N_PLUS_ONE_THRESHOLD']
+
+    @app.before_request
+    def start_diagnostics():
+        request.environ[ENVIRON_KEY] = RequestDiagnostics()
+
+    @app.after_request
+    def finish_diagnostics(response):
+        diagnostics = request.environ.get(ENVIRON_KEY)
+        if diagnostics is None:
+            return response
+
+        repeated = [(count, shape) for shape, count in diagnostics.shapes.items() if count >= threshold]
+        for count, shape in sorted(repeated, reverse=True):
+            app.logger.warning('Possible N+1 queries in %s %s: ran %d times: %s',
+                               request.method, request.path, count, shape)
+
+        if request.blueprint in ('api', 'board_api', 'boards'):
+            response.headers['Server-Timing'] = (
+                f'db;dur={diagnostics.db_seconds * 1000:.2f};desc="{diagnostics.statements} queries", '
+                f'serialize;dur={diagnostics.serialize_seconds * 1000:.2f}, '
+                f'total;dur={(time.perf_counter() - diagnostics.start) * 1000:.2f}'
+            )
+        return response
+
+    _time_serialization(app.json)
+    instrument_engine(engine)
+
+
+def instrument_engine(engine):
+    """Time the SQL statements of engine for the current request's diagnostics"""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
@@ -0,0 +1,176 @@
+"""Group commit: one transaction, and one fsync, for many concurrent task writes
+
+With GROUP_COMMIT_ENABLED, create_task and update_task hand their write to
+a single writer thread instead of committing it themselves. The writer
+takes every write that is queued, and while writes keep arriving waits up
+to GROUP_COMMIT_MAX_DELAY_MS (the latency budget, counted from when the
+oldest write was queued) or until GROUP_COMMIT_MAX_BATCH are queued. It
+then applies them in one transaction, each inside its own savepoint, and
+commits once at a single data version. Every caller gets its own result
+back, or its own error if its savepoint was rolled back; if the commit
+itself fails, every write in the group fails with that error.
+
+A write arriving after the writer has been idle is committed at once, so
+a lone client pays no delay. A write the writer has not started within
+RESULT_TIMEOUT is cancelled and never applied; one it has started may
+still be committed after its caller has given up.
+"""
+import queue
+import threading
+import time
+from concurrent import futures
+
+from flask import current_app
+
+from app import db
+from app.changes import bump_version, commit_changes
+from app.database import current_board_id
+
+# Seconds a request waits for the writer before giving up
+RESULT_TIMEOUT = 30
+
+
+class WriteJob:
+    """A write waiting for the writer thread"""
+
+    def __init__(self, board_id, write, args):
+        self.board_id = board_id
+        self.write = write
+        self.args = args
+        self.queued_at = time.monotonic()
+        self.future = futures.Future()
+
+
+class GroupCommitter:
+    """Queue of pending writes and the thread that commits them in groups"""
+
+    def __init__(self, max_delay=0.005, max_batch=64):
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        # Set while writes arrive concurrently; only then does the writer wait for company
+        self.busy = False
+        self.groups = 0
+        self.writes = 0
+
+    def submit(self, app, write, *args):
+        """Run write(*args) in the writer thread and return its (payload, status, version)
+
+        write must not commit: it returns (payload, status, change records).
+        Raises TimeoutError after RESULT_TIMEOUT seconds; the write is then
+        cancelled unless the writer has already started it.
+        """
+        self._start(app)
+        job = WriteJob(current_board_id(), write, args)
+        self._queue.put(job)
+        try:
+            return job.future.result(timeout=RESULT_TIMEOUT)
+        except futures.TimeoutError:
+            job.future.cancel()
+            raise
+
+    def _start(self, app):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(app,), daemon=True,
+                                                name='group-commit-writer')
+                self._thread.start()
+
+    def _collect(self):
+        """Block for the next write, then gather the writes to commit with it"""
+        jobs = [self._queue.get()]
+        deadline = jobs[0].queued_at + self.max_delay
+        while len(jobs) < self.max_batch:
+            try:
+                jobs.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            # Only wait for company while writes are coming in concurrently
+            if not self.busy or remaining <= 0:
+                break
+            try:
+                jobs.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        self.busy = len(jobs) > 1
+        return jobs
+
+    def _run(self, app):
+        from app.shards import board_scope
+        with app.app_context():
+            while True:
+                jobs = self._collect()
+                by_board = {}
+                for job in jobs:
+                    by_board.setdefault(job.board_id, []).append(job)
+                for board_id, group in by_board.items():
+                    try:
+                        with board_scope(board_id):
+                            self._commit(group)
+                    except Exception as e:
+                        db.session.rollback()
+                        for job in group:
+                            if not job.future.done():
+                                job.future.set_exception(e)
+                    finally:
+                        db.session.remove()
+
+    def _commit(self, jobs):
+        """Apply jobs in one transaction and resolve their futures"""
+        # Bumping first also opens the transaction the savepoints need
+        version = bump_version()
+        results = []
+        changes = []
+        for job in jobs:
+            # Skips writes whose caller timed out; the rest can no longer be cancelled
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                with db.session.begin_nested():
+                    payload, status, job_changes = job.write(*job.args)
+            except Exception as e:
+                job.future.set_exception(e)
+                continue
+            results.append((job, payload, status))
+            changes.extend(job_changes)
+
+        if changes:
+            commit_changes(changes, version)
+        else:
+            db.session.rollback()
+        self.groups += 1
+        self.writes += len(jobs)
+        for job, payload, status in results:
+            job.future.set_result((payload, status, version if changes else None))
+
+
+def apply_write(write, *args):
+    """Run a task write and commit it, through the group committer when enabled
+
+    write(*args) makes its changes in db.session without committing and
+    returns (payload, status, change records); this returns (payload, status).
+    """
+    committer = current_app.extensions.get('group_commit')
+    if committer is None:
+        payload, status, changes = write(*args)
+        if changes:
+            commit_changes(changes)
+        return payload, status
+
+    payload, status, version = committer.submit(current_app._get_current_object(), write, *args)
+    if version is not None:
+        from app.replicas import note_write
+        note_write(version)
+    return payload, status
+
+
+def init_group_commit(app):
+    """Create the group committer for app; its writer thread starts with the first write"""
+    committer = GroupCommitter(app.config['GROUP_COMMIT_MAX_DELAY_MS'] / 1000,
+                               app.config['GROUP_COMMIT_MAX_BATCH'])
+    app.extensions['group_commit'] = committer
+    return committer
@@ -0,0 +1,99 @@
+"""Task history and cumulative flow, read from the append-only task_events table
+
+commit_changes() appends an event for every status, priority and assignee
+change and adds each status move to flow_daily, which holds the net number
+of tasks that entered every status per day. A cumulative flow diagram is
+then a running sum over flow_daily: one range scan of its primary key,
+a few rows per day of history, however many events there are.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from sqlalchemy import Date, delete, func, insert, literal, select, type_coerce, union_all
+
+from app import db
+from app.models import FlowDay, TaskEvent
+
+BUCKETS = ('day', 'week', 'month')
+
+# Most buckets a single cumulative flow request may return
+MAX_FLOW_POINTS = 1000
+
+
+def task_history(task_id):
+    """Return the events of a task, oldest first"""
+    return db.session.execute(
+        select(TaskEvent)
+        .where(TaskEvent.task_id == task_id)
+        .order_by(TaskEvent.occurred_at, TaskEvent.id)
+    ).scalars().all()
+
+
+def bucket_start(day, bucket):
+    """First day of the bucket containing day"""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(start, bucket):
+    if bucket == 'week':
+        return start + timedelta(weeks=1)
+    if bucket == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def cumulative_flow(start, end, bucket='day'):
+    """Return (bucket starts, status counts) between the dates start and end
+
+    counts[i] maps each status to the number of tasks in it at the end of
+    the i-th bucket, or at end for the last bucket if end falls inside it.
+    Raises ValueError for more than MAX_FLOW_POINTS buckets.
+    """
+    buckets = []
+    current = bucket_start(start, bucket)
+    while current <= end:
+        following = _next_bucket(current, bucket)
+        buckets.append((current, min(following - timedelta(days=1), end)))
+        if len(buckets) > MAX_FLOW_POINTS:
+            raise ValueError(f'More than {MAX_FLOW_POINTS} buckets; use a larger bucket or a shorter range')
+        current = following
+
+    counts = Counter()
+    snapshots = []
+    rows = db.session.execute(
+        select(FlowDay.day, FlowDay.status, FlowDay.delta)
+        .where(FlowDay.day <= end)
+        .order_by(FlowDay.day)
+    )
+    for day, status, delta in rows:
+        while len(snapshots) < len(buckets) and day > buckets[len(snapshots)][1]:
+            snapshots.append(+counts)
+        counts[status] += delta
+    while len(snapshots) < len(buckets):
+        snapshots.append(+counts)
+
+    return [first for first, _ in buckets], snapshots
+
+
+def rebuild_flow(conn=None):
+    """Recompute flow_daily from task_events, in the current session's transaction or on conn"""
+    conn = conn or db.session
+    day = type_coerce(func.date(TaskEvent.occurred_at), Date)
+    status_events = (TaskEvent.field == 'status',)
+    moves = union_all(
+        select(day.label('day'), TaskEvent.new_value.label('status'), literal(1).label('delta'))
+        .where(*status_events, TaskEvent.new_value.isnot(None)),
+        select(day, TaskEvent.old_value, literal(-1))
+        .where(*status_events, TaskEvent.old_value.isnot(None))
+    ).subquery()
+
+    conn.execute(delete(FlowDay))
+    conn.execute(insert(FlowDay).from_select(
+        ('day', 'status', 'delta'),
+        select(moves.c.day, moves.c.status, func.sum(moves.c.delta))
+        .group_by(moves.c.day, moves.c.status)
+    ))
@@ -0,0 +1,171 @@
+"""Prometheus metrics: request latency, status codes and SQL statements per request,
+and the counters of the task list cache
+
+Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+(see gunicorn.conf.py) and GET /api/metrics merges the files of all
+workers, so each scrape sees the totals of the whole server whichever
+worker answers it. Without that variable, metrics are kept in memory for
+the current process only.
+"""
+import os
+import threading
+import time
+
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:  # pragma: no cover - prometheus_client is optional
+    prometheus_client = None
+
+# WSGI environ key holding the RequestStats of the current request
+ENVIRON_KEY = 'kanban.metrics'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 1000)
+
+
+class RequestStats:
+    """Timing and SQL statement totals of one request"""
+
+    __slots__ = ('start', 'statements', 'db_seconds')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+class RequestMetrics:
+    """The request and SQL metrics of one app"""
+
+    def __init__(self):
+        self.multiprocess = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+        # In multiprocess mode samples live in files and the registry is built per scrape
+        self.registry = None if self.multiprocess else CollectorRegistry()
+        labels = ('method', 'route')
+
+        self.duration = Histogram('http_request_duration_seconds', 'Time to serve a request',
+                                  labels, buckets=LATENCY_BUCKETS, registry=self.registry)
+        self.requests = Counter('http_requests', 'Requests served', labels + ('status',),
+                                registry=self.registry)
+        self.in_progress = Gauge('http_requests_in_progress', 'Requests being served',
+                                 multiprocess_mode='livesum', registry=self.registry)
+        self.statements = Histogram('http_request_db_statements', 'SQL statements executed per request',
+                                    labels, buckets=STATEMENT_BUCKETS, registry=self.registry)
+        self.db_duration = Histogram('http_request_db_duration_seconds', 'Time spent in SQL per request',
+                                     labels, buckets=LATENCY_BUCKETS, registry=self.registry)
+
+        self.cache = None
+        self._cache_seen = {}
+        self._cache_lock = threading.Lock()
+        self.cache_lookups = Counter('task_cache_lookups', 'Task list cache lookups', ('result',),
+                                     registry=self.registry)
+        self.cache_evictions = Counter('task_cache_evictions', 'Task list cache entries evicted to make room',
+                                       registry=self.registry)
+        self.cache_invalidations = Counter('task_cache_invalidations',
+                                           'Task list cache entries dropped by a write', registry=self.registry)
+        self.cache_entries = Gauge('task_cache_entries', 'Entries in the task list cache',
+                                   multiprocess_mode='livesum', registry=self.registry)
+
+    def watch_cache(self, cache):
+        """Export the counters of a ResponseCache, brought up to date after every request"""
+        self.cache = cache
+        self._cache_seen = dict.fromkeys(('hits', 'misses', 'evictions', 'invalidations'), 0)
+
+    def _record_cache(self):
+        with self._cache_lock:
+            stats = self.cache.stats()
+            delta = {name: stats[name] - seen for name, seen in self._cache_seen.items()}
+            self._cache_seen = {name: stats[name] for name in self._cache_seen}
+        if delta['hits']:
+            self.cache_lookups.labels('hit').inc(delta['hits'])
+        if delta['misses']:
+            self.cache_lookups.labels('miss').inc(delta['misses'])
+        if delta['evictions']:
+            self.cache_evictions.inc(delta['evictions'])
+        if delta['invalidations']:
+            self.cache_invalidations.inc(delta['invalidations'])
+        self.cache_entries.set(stats['size'])
+
+    def start_request(self):
+        """Count a request as in progress and start collecting its stats"""
+        self.in_progress.inc()
+        request.environ[ENVIRON_KEY] = RequestStats()
+
+    def finish_request(self, response):
+        """Record a response once its body has been sent"""
+        stats = request.environ.get(ENVIRON_KEY)
+        if stats is None:
+            return response
+        method = request.method
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        status = str(response.status_code)
+
+        def record():
+            self.in_progress.dec()
+            self.duration.labels(method, route).observe(time.perf_counter() - stats.start)
+            self.requests.labels(method, route, status).inc()
+            self.statements.labels(method, route).observe(stats.statements)
+            self.db_duration.labels(method, route).observe(stats.db_seconds)
+            if self.cache is not None:
+                self._record_cache()
+
+        if response.is_streamed:
+            # Streamed bodies are produced after this hook; record once the server closes the response
+            response.call_on_close(record)
+        else:
+            record()
+        return response
+
+    def render(self):
+        """Return (body, content type) of the Prometheus text exposition"""
+        registry = self.registry
+        if registry is None:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and ENVIRON_KEY in request.environ:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_metrics_start', None)
+    if start is not None:
+        stats = request.environ[ENVIRON_KEY]
+        stats.statements += 1
+        stats.db_seconds += time.perf_counter() - start
+
+
+def init_metrics(app, engine):
+    """Collect request and SQL metrics for app, if prometheus_client is installed"""
+    if prometheus_client is None:
+        return None
+
+    metrics = RequestMetrics()
+    app.extensions['metrics'] = metrics
+    app.before_request(metrics.start_request)
+    app.after_request(metrics.finish_request)
+    instrument_engine(engine)
+    return metrics
+
+
+def instrument_engine(engine):
+    """Count the SQL statements of engine towards the current request"""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def metrics_response():
+    """Response for GET /api/metrics"""
+    metrics = current_app.extensions.get('metrics')
+    if metrics is None:
+        return None
+    body, content_type = metrics.render()
+    return current_app.response_class(body, content_type=content_type)
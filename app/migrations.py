@@ -0,0 +1,143 @@
+"""Versioned schema migrations
+
+The schema version of a database is the highest migration recorded in its
+schema_migrations table. `flask --app run upgrade` applies the migrations
+newer than that, in order, recording each one as it completes. At startup
+the app only reads the version, a single query. An empty database is
+created there and then; pending migrations are applied only with
+SCHEMA_AUTO_UPGRADE. Otherwise they are logged, and /api/ready and every
+request that needs the database answer 503 until the upgrade has run.
+
+Migration 1 is the baseline: ensure_schema() brings an empty database, or
+one created before migrations existed, up to the models. Such databases
+are then stamped with the latest version, since the models already
+include every later change. To change the schema, change the models and
+append a migration that makes the same change to existing databases.
+"""
+from datetime import datetime
+
+from flask import jsonify, request
+from sqlalchemy import func, insert, inspect, select
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+from app.models import Board, SchemaMigration
+from app.schema import add_missing_columns, ensure_schema, ensure_task_autoincrement, ensure_task_history
+
+# (version, name, function(engine, shard)), in version order
+MIGRATIONS = []
+
+
+def migration(version, name):
+    """Register the decorated function as migration version"""
+    def register(function):
+        assert not MIGRATIONS or version > MIGRATIONS[-1][0], 'migrations must be registered in order'
+        MIGRATIONS.append((version, name, function))
+        return function
+    return register
+
+
+@migration(1, 'baseline')
+def baseline(engine, shard):
+    ensure_schema(engine, shard)
+
+
+@migration(2, 'task_ids_autoincrement')
+def task_ids_autoincrement(engine, shard):
+    ensure_task_autoincrement(engine)
+
+
+@migration(3, 'backfill_task_events')
+def backfill_task_events(engine, shard):
+    ensure_task_history(engine)
+
+
+@migration(4, 'board_generation')
+def board_generation(engine, shard):
+    if not shard:
+        add_missing_columns(engine, [Board.__table__])
+
+
+def head_version():
+    """Version of the latest migration"""
+    return MIGRATIONS[-1][0]
+
+
+def schema_version(engine=None):
+    """Latest migration applied to the database, or None if it has never been migrated"""
+    engine = engine or db.engine
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(SchemaMigration.version))).scalar()
+    except DBAPIError:
+        # No schema_migrations table yet
+        return None
+
+
+def _record(engine, migrations):
+    with engine.begin() as conn:
+        conn.execute(insert(SchemaMigration), [
+            {'version': version, 'name': name, 'applied_at': datetime.utcnow()}
+            for version, name, _ in migrations
+        ])
+
+
+def upgrade(engine=None, shard=False):
+    """Apply the pending migrations to the database and return their names
+
+    Pass the engine of a board shard with shard=True.
+    """
+    engine = engine or db.engine
+    current = schema_version(engine)
+    if current is None:
+        ensure_schema(engine, shard)
+        _record(engine, MIGRATIONS)
+        return [name for _, name, _ in MIGRATIONS]
+
+    applied = []
+    for version, name, function in MIGRATIONS:
+        if version > current:
+            function(engine, shard)
+            _record(engine, [(version, name, function)])
+            applied.append(name)
+    return applied
+
+
+# Endpoints that answer while the schema is out of date
+SCHEMA_EXEMPT_ENDPOINTS = frozenset({'index', 'health', 'health_check', 'ready', 'metrics', 'static'})
+
+
+def init_schema(app):
+    """Check the schema version at startup, upgrading if SCHEMA_AUTO_UPGRADE is set
+
+    An out-of-date database is otherwise re-checked on each request, which
+    gets 503 until `flask upgrade` has run.
+    """
+    with app.app_context():
+        current = schema_version()
+        if current is not None and current >= head_version():
+            return
+        if app.config['SCHEMA_AUTO_UPGRADE'] or not inspect(db.engine).get_table_names():
+            upgrade()
+            return
+        app.logger.warning('Database schema is at version %s but this release needs %s; '
+                           'run `flask --app run upgrade`', current, head_version())
+
+    app.extensions['schema_pending'] = True
+
+    @app.before_request
+    def require_current_schema():
+        endpoint = (request.endpoint or '').rsplit('.', 1)[-1]
+        if not app.extensions['schema_pending'] or endpoint in SCHEMA_EXEMPT_ENDPOINTS:
+            return None
+        current = schema_version()
+        if current is not None and current >= head_version():
+            app.extensions['schema_pending'] = False
+            return None
+        response = jsonify({
+            'success': False,
+            'error': 'Database needs `flask --app run upgrade`'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
@@ -1,10 +1,20 @@
 from app import db
+from app.database import DEFAULT_BOARD_ID, current_board_id
 from datetime import datetime
 
 class Task(db.Model):
     """Task model for Kanban board"""
     
     __tablename__ = 'tasks'
+    __table_args__ = (
+        db.Index('ix_tasks_status', 'status'),
+        db.Index('ix_tasks_status_priority', 'status', 'priority'),
+        db.Index('ix_tasks_assigned_to', 'assigned_to'),
+        db.Index('ix_tasks_status_updated_at_id', 'status', 'updated_at', 'id'),
+        db.Index('ix_tasks_change_seq_id', 'change_seq', 'id'),
+        # Never reuse the id of a deleted task: its history and tombstone stay keyed by it
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -14,19 +24,190 @@ class Task(db.Model):
     assigned_to = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Data version of the last write to this task, for delta sync
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Board the task belongs to; each board's tasks live in its own shard (see app.shards)
+    board_id = db.Column(db.Integer, nullable=False, default=current_board_id, server_default=str(DEFAULT_BOARD_ID))
+    # When work started and finished, kept by triggers for flow analytics (see app.stats)
+    started_at = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    
+    # Serializable fields, in to_dict() order; ?fields= may select a subset
+    FIELDS = ('id', 'title', 'description', 'status', 'priority', 'assigned_to', 'created_at', 'updated_at')
+    
+    def to_dict(self, fields=FIELDS):
+        """Convert task to dictionary, limited to fields
+        
+        Only the requested attributes are read, so a task loaded with
+        load_only() serializes without lazy-loading its deferred columns.
+        """
+        data = {}
+        for field in fields:
+            value = getattr(self, field)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            data[field] = value
+        return data
+    
+    def __repr__(self):
+        return f'<Task {self.id}: {self.title}>'
+
+
+class Board(db.Model):
+    """A board and the shard directory holding its database
+    
+    The registry lives in the default database only, whichever board a
+    session is scoped to. The default board has no shard: its tasks are in
+    the default database as well.
+    """
+    
+    __tablename__ = 'boards'
+    __table_args__ = {'info': {'registry': True}}
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    shard = db.Column(db.String(500), nullable=True)
+    # Set while the board's database is copied to another shard; requests get 503
+    moving = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    # Bumped by every move, so workers drop engines still open on the old file
+    generation = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
-        """Convert task to dictionary"""
+        """Convert board to dictionary"""
         return {
             'id': self.id,
-            'title': self.title,
-            'description': self.description,
-            'status': self.status,
-            'priority': self.priority,
-            'assigned_to': self.assigned_to,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'name': self.name,
+            'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
     def __repr__(self):
-        return f'<Task {self.id}: {self.title}>'
+        return f'<Board {self.id}: {self.name}>'
+
+
+class DataVersion(db.Model):
+    """Single-row counter bumped by every write to the tasks table"""
+    
+    __tablename__ = 'data_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # Highest data version whose tombstones have been compacted away
+    compacted_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    def __repr__(self):
+        return f'<DataVersion {self.version}>'
+
+
+class SchemaMigration(db.Model):
+    """A schema migration applied to this database (see app.migrations)"""
+    
+    __tablename__ = 'schema_migrations'
+    
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SchemaMigration {self.version} {self.name}>'
+
+
+class TaskTombstone(db.Model):
+    """Record of a deleted task, kept for delta sync until compacted"""
+    
+    __tablename__ = 'task_tombstones'
+    __table_args__ = (
+        db.Index('ix_task_tombstones_change_seq_task_id', 'change_seq', 'task_id'),
+        db.Index('ix_task_tombstones_deleted_at', 'deleted_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<TaskTombstone {self.task_id} @ {self.change_seq}>'
+
+
+class StatusCount(db.Model):
+    """Number of tasks per status, for WIP in GET /api/stats"""
+    
+    __tablename__ = 'stats_status'
+    
+    status = db.Column(db.String(50), primary_key=True)
+    tasks = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<StatusCount {self.status}: {self.tasks}>'
+
+
+class WeeklyThroughput(db.Model):
+    """Number of done tasks per week of completion, weeks starting on Monday"""
+    
+    __tablename__ = 'stats_throughput'
+    
+    week = db.Column(db.Date, primary_key=True)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<WeeklyThroughput {self.week}: {self.completed}>'
+
+
+class AssigneeCycleTime(db.Model):
+    """Done tasks and their summed cycle time per assignee ('' when unassigned)"""
+    
+    __tablename__ = 'stats_cycle_time'
+    
+    assigned_to = db.Column(db.String(100), primary_key=True)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    cycle_seconds = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<AssigneeCycleTime {self.assigned_to}: {self.completed}>'
+
+
+class TaskEvent(db.Model):
+    """One change to a tracked field of a task; rows are only ever appended"""
+    
+    __tablename__ = 'task_events'
+    __table_args__ = (
+        db.Index('ix_task_events_task_id_occurred_at', 'task_id', 'occurred_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # created, updated, deleted
+    field = db.Column(db.String(20), nullable=False)  # status, priority, assigned_to
+    old_value = db.Column(db.String(100), nullable=True)
+    new_value = db.Column(db.String(100), nullable=True)
+    occurred_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Data version of the write that made the change
+    change_seq = db.Column(db.Integer, nullable=False)
+    
+    def to_dict(self):
+        """Convert event to dictionary"""
+        return {
+            'id': self.id,
+            'op': self.op,
+            'field': self.field,
+            'from': self.old_value,
+            'to': self.new_value,
+            'occurred_at': self.occurred_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<TaskEvent {self.task_id}.{self.field}: {self.old_value} -> {self.new_value}>'
+
+
+class FlowDay(db.Model):
+    """Net number of tasks that entered each status per day, for cumulative flow"""
+    
+    __tablename__ = 'flow_daily'
+    
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    delta = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<FlowDay {self.day} {self.status}: {self.delta:+d}>'
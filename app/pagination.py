@@ -0,0 +1,64 @@
+"""Keyset (cursor) pagination helpers"""
+import base64
+import json
+
+from app import db
+
+
+def encode_cursor(*values):
+    """Encode keyset values into an opaque, URL-safe cursor"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def is_int64(value):
+    """True if value is an int, not a bool, that fits a signed 64-bit column"""
+    return type(value) is int and -2 ** 63 <= value < 2 ** 63
+
+
+def decode_cursor(cursor, size=1):
+    """Decode a cursor created by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def parse_limit(value, default, maximum):
+    """Parse the ?limit= query parameter, clamping it to maximum"""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except ValueError as e:
+        raise ValueError('limit must be an integer') from e
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, maximum)
+
+
+def keyset_page(query, column, cursor, limit):
+    """Return one page of a SELECT ordered by column, resuming after cursor.
+
+    Each page is a range seek on column, so the cost stays constant no
+    matter how deep the client has paged. Returns (rows, next_cursor);
+    next_cursor is None on the last page.
+    """
+    if cursor:
+        (last_key,) = decode_cursor(cursor)
+        if not is_int64(last_key):
+            raise ValueError('Invalid cursor')
+        query = query.where(column > last_key)
+
+    rows = db.session.execute(query.order_by(column).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], column.key))
+    return rows, next_cursor
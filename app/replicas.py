@@ -0,0 +1,205 @@
+"""Read replicas of the default database
+
+With DATABASE_REPLICA_URLS set, views decorated with @reads_from_replica
+run their queries against one of the replicas, round robin; every other
+view, and every write, uses the primary (SQLALCHEMY_DATABASE_URI).
+
+Replication itself is left to the database (streaming replication, or a
+SQLite file kept current by Litestream/LiteFS). A background thread
+compares the data version of each replica with the primary's every
+REPLICA_CHECK_INTERVAL seconds, so a slow or unreachable replica never
+holds up a request; until its first check, reads use the primary. A
+replica that has not yet caught up with a version the primary
+reached more than REPLICA_MAX_LAG seconds ago, or that cannot be reached,
+is skipped until it catches up.
+
+Read-your-writes: a response to a write sets a short-lived cookie with the
+data version it committed. For REPLICA_STICKY_SECONDS, that client's reads
+only go to a replica known to have reached that version, and to the
+primary otherwise.
+"""
+import atexit
+import itertools
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import create_engine, select
+
+from app import db
+from app.changes import VERSION_ROW_ID, tasks_committed
+from app.database import (DEFAULT_BOARD_ID, current_board_id, current_shard_path, engine_options, reset_replica,
+                          set_replica)
+from app.models import DataVersion
+
+# Cookie holding the data version of the client's latest write
+WRITTEN_VERSION_COOKIE = 'kanban_written_version'
+
+
+def _read_version(engine):
+    with engine.connect() as conn:
+        version = conn.execute(
+            select(DataVersion.version).where(DataVersion.id == VERSION_ROW_ID)
+        ).scalar()
+    return version or 0
+
+
+class ReplicaPool:
+    """Replica engines, their last known data versions and estimated lag"""
+
+    def __init__(self, engines, max_lag=1.0, check_interval=0.25, clock=time.monotonic):
+        self.engines = list(engines)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.clock = clock
+        self.versions = [0] * len(self.engines)
+        self.lags = [float('inf')] * len(self.engines)
+        # (time, primary data version) of recent checks, to turn versions into seconds of lag
+        self._checkpoints = deque(maxlen=64)
+        self._checked_at = None
+        self._check_lock = threading.Lock()
+        self._checker = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._next = itertools.count()
+
+    def start_checker(self, app):
+        """Check the replicas every check_interval seconds in a background thread (not when it is 0)"""
+        if self._checker is not None:
+            return
+        with self._start_lock:
+            if self._checker is not None or self.check_interval <= 0 or self._stop.is_set():
+                return
+            self._checker = threading.Thread(target=self._check_forever, args=(app,), daemon=True,
+                                             name='replica-checker')
+            self._checker.start()
+
+    def _check_forever(self, app):
+        with app.app_context():
+            while not self._stop.is_set():
+                try:
+                    self.check(db.engine, force=True)
+                except Exception:
+                    app.logger.warning('Checking the read replicas failed', exc_info=True)
+                self._stop.wait(self.check_interval)
+
+    def close(self):
+        """Stop the checker thread and dispose the replica engines"""
+        self._stop.set()
+        with self._start_lock:
+            checker, self._checker = self._checker, None
+        if checker is not None:
+            checker.join()
+        for engine in self.engines:
+            engine.dispose()
+
+    def check(self, primary, force=False):
+        """Refresh the replica versions and lags if check_interval has passed
+
+        Only one thread checks at a time; the others keep using the last results.
+        """
+        now = self.clock()
+        if not force and self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = now
+            self._checkpoints.append((now, _read_version(primary)))
+            for index, engine in enumerate(self.engines):
+                try:
+                    self.versions[index] = _read_version(engine)
+                except Exception:
+                    current_app.logger.warning('Read replica %d is unreachable', index, exc_info=True)
+                    self.lags[index] = float('inf')
+                    continue
+                self.lags[index] = self._lag(self.versions[index], now)
+        finally:
+            self._check_lock.release()
+
+    def _lag(self, version, now):
+        """Seconds since the primary first reported a version newer than version"""
+        for checked_at, primary_version in self._checkpoints:
+            if primary_version > version:
+                return now - checked_at
+        return 0.0
+
+    def choose(self, min_version=0):
+        """Return a healthy replica engine that has reached min_version, or None"""
+        healthy = [
+            index for index in range(len(self.engines))
+            if self.lags[index] <= self.max_lag and self.versions[index] >= min_version
+        ]
+        if not healthy:
+            return None
+        return self.engines[healthy[next(self._next) % len(healthy)]]
+
+
+def _written_version():
+    """Data version of the client's latest write, if within the sticky window"""
+    value = request.cookies.get(WRITTEN_VERSION_COOKIE, '')
+    return int(value) if value.isdigit() else 0
+
+
+def note_write(version):
+    """Make the current client's reads stick to data at least as new as version"""
+    if current_board_id() == DEFAULT_BOARD_ID:
+        g.written_version = version
+
+
+def reads_from_replica(view):
+    """Run a read-only view against a replica of the default database, when one is fit to serve it"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        pool = current_app.extensions.get('replicas')
+        # Board shards are not replicated
+        if pool is None or current_shard_path() is not None:
+            return view(*args, **kwargs)
+
+        pool.start_checker(current_app._get_current_object())
+        engine = pool.choose(_written_version())
+        if engine is None:
+            return view(*args, **kwargs)
+
+        db.session.remove()
+        token = set_replica(engine)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            db.session.remove()
+            reset_replica(token)
+    return wrapper
+
+
+def init_replicas(app, engine_hooks):
+    """Create the replica pool for app and make writes sticky to the primary"""
+    urls = app.config['DATABASE_REPLICA_URLS']
+    if not urls:
+        return None
+
+    engines = []
+    for url in urls:
+        engine = create_engine(url, **engine_options(url))
+        for hook in engine_hooks:
+            hook(engine)
+        engines.append(engine)
+    pool = ReplicaPool(engines, app.config['REPLICA_MAX_LAG'], app.config['REPLICA_CHECK_INTERVAL'])
+    app.extensions['replicas'] = pool
+    atexit.register(pool.close)
+
+    def remember_write(sender, version, changes, board_id=DEFAULT_BOARD_ID):
+        if has_request_context():
+            note_write(version)
+
+    @app.after_request
+    def set_written_version(response):
+        version = g.pop('written_version', None)
+        if version is not None:
+            response.set_cookie(WRITTEN_VERSION_COOKIE, str(version), httponly=True, samesite='Lax',
+                                max_age=app.config['REPLICA_STICKY_SECONDS'])
+        return response
+
+    tasks_committed.connect(remember_write, sender=app, weak=False)
+    return pool
@@ -1,8 +1,97 @@
-from flask import Blueprint, request, jsonify
+import math
+import queue
+import time
+from datetime import date, datetime, timedelta
+from functools import wraps
+from flask import Blueprint, request, jsonify, current_app, make_response, g, stream_with_context
+from sqlalchemy import and_, delete, func, insert, or_, select, update
 from app import db
-from app.models import Task
+from app.database import DEFAULT_BOARD_ID, current_board_id
+from app.models import Board, Task, TaskTombstone
+from app.changes import bump_version, commit_changes, current_version, sync_state, tracked_values
+from app.pagination import decode_cursor, encode_cursor, is_int64, keyset_page, parse_limit
+from app.search import build_match_query, search_available, search_tasks
+from app.stats import read_stats, stats_available
+from app.history import BUCKETS, cumulative_flow, task_history
+from app.group_commit import apply_write
+from app.metrics import metrics_response
+from app.migrations import head_version, schema_version
+from app.replicas import reads_from_replica
+from app.shards import BoardUnavailable, create_board, enter_board
+from app.stream import board_change_broker, format_event, subscribe_within_limit
+from app.serialization import task_row_serializer, task_select
 
 api = Blueprint('api', __name__)
+boards = Blueprint('boards', __name__)
+
+# Task fields clients may set on create and update
+TASK_FIELDS = ('title', 'description', 'status', 'priority', 'assigned_to')
+
+# Kanban columns, in board order
+BOARD_COLUMNS = ('New', 'In Progress', 'Done')
+
+@api.url_value_preprocessor
+def pop_board_id(endpoint, values):
+    """Take the board of /api/boards/<board_id>/... routes out of the view arguments"""
+    g.board_id = values.pop('board_id', DEFAULT_BOARD_ID) if values else DEFAULT_BOARD_ID
+
+@api.before_request
+def scope_to_board():
+    """Bind db.session to the database of the requested board"""
+    try:
+        enter_board(g.board_id)
+    except BoardUnavailable as e:
+        response = jsonify({
+            'success': False,
+            'error': str(e)
+        })
+        response.status_code = e.status
+        if e.status == 503:
+            response.headers['Retry-After'] = '1'
+        return response
+
+def parse_fields(value):
+    """Parse ?fields=id,title,... into Task fields, in serialization order
+    
+    Returns Task.FIELDS when value is empty; raises ValueError for unknown fields.
+    """
+    if not value:
+        return Task.FIELDS
+    
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = requested - set(Task.FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(field for field in Task.FIELDS if field in requested)
+
+def task_reader(fields=Task.FIELDS):
+    """Return (SELECT, row serializer) for reading fields without building ORM objects"""
+    dialect_name = db.session.get_bind().dialect.name
+    return task_select(fields, dialect_name), task_row_serializer(fields, dialect_name)
+
+def versioned(view):
+    """Tag 200 responses with an ETag derived from the data version
+    
+    A matching If-None-Match is answered with 304 Not Modified after a
+    single version lookup, before the view queries or serializes tasks.
+    Matching is weak, so the W/ ETags of compressed responses revalidate too.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.data_version = current_version()
+        etag = f'v{g.data_version}'
+        
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
 
 @api.route('/')
 def index():
@@ -11,11 +100,26 @@ def index():
         'message': 'Welcome to Kanban Board API',
         'version': '1.0',
         'endpoints': {
-            'GET /api/tasks': 'Get all tasks',
+            'GET /api/tasks': 'Get tasks (paginated with ?limit= and ?cursor=, ?fields= to pick fields)',
             'GET /api/tasks/<id>': 'Get a specific task',
             'POST /api/tasks': 'Create a new task',
             'PUT /api/tasks/<id>': 'Update a task',
-            'DELETE /api/tasks/<id>': 'Delete a task'
+            'DELETE /api/tasks/<id>': 'Delete a task',
+            'POST /api/tasks/batch': 'Create, update and delete tasks in one transaction',
+            'GET /api/board': 'Get the board: first cards and counts per column',
+            'GET /api/tasks/search?q=': 'Full-text search over task titles and descriptions',
+            'GET /api/stats': 'WIP per status, weekly throughput and cycle time per assignee',
+            'GET /api/tasks/<id>/history': 'Status, priority and assignee changes of a task',
+            'GET /api/flow?from=&to=&bucket=day': 'Cumulative flow: tasks per status at the end of each bucket',
+            'GET /api/tasks/export': 'Stream every task as newline-delimited JSON',
+            'POST /api/tasks/import': 'Import tasks from newline-delimited JSON',
+            'GET /api/tasks/stream': 'Server-Sent Events feed of task changes',
+            'GET /api/tasks/changes?since=': 'Tasks changed and deleted since a sync token',
+            'GET /api/metrics': 'Request and SQL metrics in Prometheus text format',
+            'GET /api/ready': 'Readiness: the database is reachable and its schema is migrated',
+            'GET /api/boards': 'List boards',
+            'POST /api/boards': 'Create a board in its own shard database',
+            '/api/boards/<board_id>/...': 'Any endpoint above, scoped to one board'
         }
     })
 
@@ -27,21 +131,357 @@ def health():
         'message': 'API is running'
     })
 
+@api.route('/ready', methods=['GET'])
+def ready():
+    """Readiness check: the database answers and its schema is migrated"""
+    try:
+        version = schema_version(db.engine)
+    except Exception as e:
+        return jsonify({
+            'status': 'unavailable',
+            'error': str(e)
+        }), 503
+    
+    if version is None or version < head_version():
+        return jsonify({
+            'status': 'migrations pending',
+            'schema_version': version,
+            'required_version': head_version()
+        }), 503
+    return jsonify({
+        'status': 'ready',
+        'schema_version': version
+    })
+
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics, summed over every worker process"""
+    response = metrics_response()
+    if response is None:
+        return jsonify({
+            'success': False,
+            'error': 'Metrics are disabled'
+        }), 404
+    return response
+
 @api.route('/tasks', methods=['GET'])
+@reads_from_replica
+@versioned
 def get_tasks():
-    """Get all tasks"""
+    """Get a page of tasks, ordered by id"""
     try:
-        status_filter = request.args.get('status')
+        status_filter = request.args.get('status') or None
+        cursor = request.args.get('cursor') or None
         
+        try:
+            limit = parse_limit(request.args.get('limit'),
+                                current_app.config['TASKS_PAGE_SIZE'],
+                                current_app.config['TASKS_MAX_PAGE_SIZE'])
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        cache = current_app.extensions.get('task_cache')
+        cache_key = (current_board_id(), status_filter, limit, cursor, fields)
+        if cache is not None:
+            body = cache.get(cache_key, g.data_version)
+            if body is not None:
+                response = current_app.response_class(body, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+                return response
+        
+        query, serialize = task_reader(fields)
         if status_filter:
-            tasks = Task.query.filter_by(status=status_filter).all()
+            query = query.where(Task.status == status_filter)
+        
+        try:
+            rows, next_cursor = keyset_page(query, Task.id, cursor, limit)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        response = jsonify({
+            'success': True,
+            'count': len(rows),
+            'tasks': [serialize(row) for row in rows],
+            'next_cursor': next_cursor
+        })
+        if cache is not None:
+            cache.set(cache_key, response.get_data(), g.data_version, tag=status_filter,
+                      scope=current_board_id())
+            response.headers['X-Cache'] = 'MISS'
+        return response
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api.route('/board', methods=['GET'])
+@versioned
+def get_board():
+    """Get the board grouped by column, with per-column and per-priority counts
+    
+    Each column holds at most ?limit= cards; its next_cursor continues the
+    column through GET /api/tasks?status=<column>&cursor=<next_cursor>.
+    ?fields= selects the card fields, as on the task list.
+    """
+    try:
+        try:
+            limit = parse_limit(request.args.get('limit'),
+                                current_app.config['BOARD_COLUMN_SIZE'],
+                                current_app.config['TASKS_MAX_PAGE_SIZE'])
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        counts = {}
+        rows = db.session.execute(
+            select(Task.status, Task.priority, func.count()).group_by(Task.status, Task.priority)
+        )
+        for status, priority, count in rows:
+            counts.setdefault(status, {})[priority] = count
+        
+        query, serialize = task_reader(fields)
+        columns = []
+        for status in BOARD_COLUMNS:
+            rows, next_cursor = keyset_page(query.where(Task.status == status), Task.id, None, limit)
+            priority_counts = counts.get(status, {})
+            columns.append({
+                'status': status,
+                'count': sum(priority_counts.values()),
+                'priority_counts': priority_counts,
+                'tasks': [serialize(row) for row in rows],
+                'next_cursor': next_cursor
+            })
+        
+        return jsonify({
+            'success': True,
+            'total': sum(sum(by_priority.values()) for by_priority in counts.values()),
+            'columns': columns
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api.route('/tasks/search', methods=['GET'])
+@versioned
+def search():
+    """Search task titles and descriptions, best matches first (bm25)"""
+    try:
+        if not search_available(db.session.get_bind()):
+            return jsonify({
+                'success': False,
+                'error': 'Full-text search is not available on this database'
+            }), 501
+        
+        match = build_match_query(request.args.get('q'))
+        if match is None:
+            return jsonify({
+                'success': False,
+                'error': 'q must contain at least one word'
+            }), 400
+        
+        try:
+            limit = parse_limit(request.args.get('limit'),
+                                current_app.config['TASKS_PAGE_SIZE'],
+                                current_app.config['TASKS_MAX_PAGE_SIZE'])
+            after = None
+            if request.args.get('cursor'):
+                after = decode_cursor(request.args['cursor'], 2)
+                rank, last_id = after
+                valid_rank = is_int64(rank) or (type(rank) is float and math.isfinite(rank))
+                if not valid_rank or not is_int64(last_id):
+                    raise ValueError('Invalid cursor')
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        hits = search_tasks(match, limit + 1, after, request.args.get('status'))
+        next_cursor = None
+        if len(hits) > limit:
+            hits = hits[:limit]
+            next_cursor = encode_cursor(hits[-1][0], hits[-1][2].id)
+        
+        return jsonify({
+            'success': True,
+            'count': len(hits),
+            'tasks': [
+                # Rounded so tiny scores are not written in exponent form,
+                # which differs between JSON providers
+                dict(task.to_dict(), score=round(score, 4), highlights=highlights)
+                for score, highlights, task in hits
+            ],
+            'next_cursor': next_cursor
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api.route('/stats', methods=['GET'])
+@versioned
+def get_stats():
+    """Flow analytics from the summary tables: WIP, weekly throughput and cycle time"""
+    try:
+        if not stats_available(db.session.get_bind()):
+            return jsonify({
+                'success': False,
+                'error': 'Statistics are not available on this database'
+            }), 501
+        
+        weeks = request.args.get('weeks', '12')
+        if not weeks.isdigit() or not 1 <= int(weeks) <= 520:
+            return jsonify({
+                'success': False,
+                'error': 'weeks must be an integer between 1 and 520'
+            }), 400
+        
+        wip, throughput, cycle_time = read_stats(int(weeks))
+        return jsonify({
+            'success': True,
+            'wip': wip,
+            'throughput': throughput,
+            'cycle_time': cycle_time
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api.route('/flow', methods=['GET'])
+@versioned
+def get_flow():
+    """Cumulative flow diagram: tasks per status at the end of each day, week or month
+    
+    ?from= and ?to= are ISO dates (default: the last 30 days up to today).
+    """
+    try:
+        bucket = request.args.get('bucket', 'day')
+        try:
+            if bucket not in BUCKETS:
+                raise ValueError(f"bucket must be one of: {', '.join(BUCKETS)}")
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') \
+                else datetime.utcnow().date()
+            start = date.fromisoformat(request.args['from']) if request.args.get('from') \
+                else end - timedelta(days=29)
+            if start > end:
+                raise ValueError('from must not be after to')
+            dates, counts = cumulative_flow(start, end, bucket)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        statuses = list(BOARD_COLUMNS) + sorted(set().union(*counts) - set(BOARD_COLUMNS))
+        return jsonify({
+            'success': True,
+            'bucket': bucket,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'dates': [day.isoformat() for day in dates],
+            # A list, so the board order of the statuses survives key sorting
+            'series': [
+                {'status': status, 'counts': [snapshot.get(status, 0) for snapshot in counts]}
+                for status in statuses
+            ]
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _after_key(seq_column, id_column, seq, last_id):
+    """Filter for rows after the (change_seq, id) position of a sync token"""
+    if last_id is None:
+        return seq_column > seq
+    return or_(seq_column > seq, and_(seq_column == seq, id_column > last_id))
+
+@api.route('/tasks/changes', methods=['GET'])
+def get_changes():
+    """Get the tasks changed and deleted since a sync token
+    
+    Without ?since= every task is returned, one page at a time. Each
+    response carries next_token for the following call; while has_more is
+    true the client should call again straight away. The cost of a call is
+    proportional to the number of changes, not to the size of the table.
+    A token older than the tombstone retention answers 410 Gone, and the
+    client has to resync from scratch.
+    """
+    try:
+        try:
+            limit = parse_limit(request.args.get('limit'),
+                                current_app.config['TASKS_PAGE_SIZE'],
+                                current_app.config['TASKS_MAX_PAGE_SIZE'])
+            since = request.args.get('since')
+            seq, last_id = decode_cursor(since, 2) if since else (0, 0)
+            if not is_int64(seq) or not (last_id is None or is_int64(last_id)):
+                raise ValueError('Invalid sync token')
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        # Read the version first: rows committed after it are left for the next call
+        version, compacted = sync_state()
+        if since and seq < compacted:
+            return jsonify({
+                'success': False,
+                'error': 'Sync token has expired; resync without since'
+            }), 410
+        
+        tasks = (
+            Task.query
+            .filter(_after_key(Task.change_seq, Task.id, seq, last_id), Task.change_seq <= version)
+            .order_by(Task.change_seq, Task.id)
+            .limit(limit + 1)
+            .all()
+        )
+        tombstones = db.session.execute(
+            select(TaskTombstone.change_seq, TaskTombstone.task_id)
+            .where(_after_key(TaskTombstone.change_seq, TaskTombstone.task_id, seq, last_id),
+                   TaskTombstone.change_seq <= version)
+            .order_by(TaskTombstone.change_seq, TaskTombstone.task_id)
+            .limit(limit + 1)
+        ).all()
+        
+        # Merge both streams in (change_seq, id) order and cut the page
+        entries = sorted(
+            [(task.change_seq, task.id, task) for task in tasks] +
+            [(row.change_seq, row.task_id, None) for row in tombstones],
+            key=lambda entry: (entry[0], entry[1])
+        )
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        
+        if has_more:
+            next_token = encode_cursor(entries[-1][0], entries[-1][1])
         else:
-            tasks = Task.query.all()
+            next_token = encode_cursor(version, None)
         
         return jsonify({
             'success': True,
-            'count': len(tasks),
-            'tasks': [task.to_dict() for task in tasks]
+            'tasks': [task.to_dict() for _, _, task in entries if task is not None],
+            'deleted': [task_id for _, task_id, task in entries if task is None],
+            'next_token': next_token,
+            'has_more': has_more
         }), 200
     except Exception as e:
         return jsonify({
@@ -50,12 +490,40 @@ def get_tasks():
         }), 500
 
 @api.route('/tasks/<int:task_id>', methods=['GET'])
+@reads_from_replica
+@versioned
 def get_task(task_id):
     """Get a specific task"""
     try:
-        task = Task.query.get(task_id)
+        query, serialize = task_reader()
+        row = db.session.execute(query.where(Task.id == task_id)).first()
         
-        if not task:
+        if not row:
+            return jsonify({
+                'success': False,
+                'error': 'Task not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'task': serialize(row)
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api.route('/tasks/<int:task_id>/history', methods=['GET'])
+@versioned
+def get_task_history(task_id):
+    """Get the status, priority and assignee changes of a task, oldest first
+    
+    History outlives the task, so deleted tasks still have one.
+    """
+    try:
+        events = task_history(task_id)
+        if not events and db.session.get(Task, task_id) is None:
             return jsonify({
                 'success': False,
                 'error': 'Task not found'
@@ -63,7 +531,9 @@ def get_task(task_id):
         
         return jsonify({
             'success': True,
-            'task': task.to_dict()
+            'task_id': task_id,
+            'count': len(events),
+            'events': [event.to_dict() for event in events]
         }), 200
     except Exception as e:
         return jsonify({
@@ -71,6 +541,26 @@ def get_task(task_id):
             'error': str(e)
         }), 500
 
+def _create_task(data):
+    """Insert a task from request data; returns (payload, status, change records)"""
+    task = Task(
+        title=data['title'],
+        description=data.get('description', ''),
+        status=data.get('status', 'New'),
+        priority=data.get('priority', 'Medium'),
+        assigned_to=data.get('assigned_to', '')
+    )
+    
+    db.session.add(task)
+    db.session.flush()
+    
+    task_dict = task.to_dict()
+    return {
+        'success': True,
+        'message': 'Task created successfully',
+        'task': task_dict
+    }, 201, [{'op': 'created', 'id': task.id, 'task': task_dict, 'before': None}]
+
 @api.route('/tasks', methods=['POST'])
 def create_task():
     """Create a new task"""
@@ -83,22 +573,8 @@ def create_task():
                 'error': 'Title is required'
             }), 400
         
-        task = Task(
-            title=data['title'],
-            description=data.get('description', ''),
-            status=data.get('status', 'New'),
-            priority=data.get('priority', 'Medium'),
-            assigned_to=data.get('assigned_to', '')
-        )
-        
-        db.session.add(task)
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'message': 'Task created successfully',
-            'task': task.to_dict()
-        }), 201
+        payload, status = apply_write(_create_task, data)
+        return jsonify(payload), status
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -106,11 +582,55 @@ def create_task():
             'error': str(e)
         }), 500
 
+def _update_task(task_id, data):
+    """Apply request data to a task; returns (payload, status, change records)"""
+    task = db.session.get(Task, task_id)
+    
+    if not task:
+        return {
+            'success': False,
+            'error': 'Task not found'
+        }, 404, []
+    
+    before = tracked_values(task)
+    
+    if 'title' in data:
+        task.title = data['title']
+    if 'description' in data:
+        task.description = data['description']
+    if 'status' in data:
+        task.status = data['status']
+    if 'priority' in data:
+        task.priority = data['priority']
+    if 'assigned_to' in data:
+        task.assigned_to = data['assigned_to']
+    
+    db.session.flush()
+    task_dict = task.to_dict()
+    return {
+        'success': True,
+        'message': 'Task updated successfully',
+        'task': task_dict
+    }, 200, [{'op': 'updated', 'id': task.id, 'task': task_dict, 'before': before}]
+
 @api.route('/tasks/<int:task_id>', methods=['PUT'])
 def update_task(task_id):
     """Update a task"""
     try:
-        task = Task.query.get(task_id)
+        payload, status = apply_write(_update_task, task_id, request.get_json())
+        return jsonify(payload), status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api.route('/tasks/<int:task_id>', methods=['DELETE'])
+def delete_task(task_id):
+    """Delete a task"""
+    try:
+        task = db.session.get(Task, task_id)
         
         if not task:
             return jsonify({
@@ -118,25 +638,13 @@ def update_task(task_id):
                 'error': 'Task not found'
             }), 404
         
-        data = request.get_json()
-        
-        if 'title' in data:
-            task.title = data['title']
-        if 'description' in data:
-            task.description = data['description']
-        if 'status' in data:
-            task.status = data['status']
-        if 'priority' in data:
-            task.priority = data['priority']
-        if 'assigned_to' in data:
-            task.assigned_to = data['assigned_to']
-        
-        db.session.commit()
+        change = {'op': 'deleted', 'id': task.id, 'task': None, 'before': tracked_values(task)}
+        db.session.delete(task)
+        commit_changes([change])
         
         return jsonify({
             'success': True,
-            'message': 'Task updated successfully',
-            'task': task.to_dict()
+            'message': 'Task deleted successfully'
         }), 200
     except Exception as e:
         db.session.rollback()
@@ -145,25 +653,283 @@ def update_task(task_id):
             'error': str(e)
         }), 500
 
-@api.route('/tasks/<int:task_id>', methods=['DELETE'])
-def delete_task(task_id):
-    """Delete a task"""
+def _valid_title(title):
+    """True for a non-empty string title"""
+    return isinstance(title, str) and bool(title.strip())
+
+def _batch_error(index, op, error, task_id=None, status=400):
+    """Build the result entry for a batch operation that was not applied"""
+    result = {'index': index, 'op': op, 'success': False, 'status': status, 'error': error}
+    if task_id is not None:
+        result['id'] = task_id
+    return result
+
+@api.route('/tasks/batch', methods=['POST'])
+def batch_tasks():
+    """Apply a list of create/update/delete operations in one transaction
+    
+    Valid operations are applied with one bulk INSERT, one bulk UPDATE and
+    one DELETE, then committed once. Invalid operations (missing title,
+    unknown task, ...) are reported per item and do not stop the others.
+    """
     try:
-        task = Task.query.get(task_id)
+        data = request.get_json(silent=True)
+        operations = data.get('operations') if isinstance(data, dict) else None
         
-        if not task:
+        if not isinstance(operations, list) or not operations:
             return jsonify({
                 'success': False,
-                'error': 'Task not found'
-            }), 404
+                'error': 'operations must be a non-empty list'
+            }), 400
         
-        db.session.delete(task)
-        db.session.commit()
+        max_size = current_app.config['TASKS_MAX_BATCH_SIZE']
+        if len(operations) > max_size:
+            return jsonify({
+                'success': False,
+                'error': f'A batch may contain at most {max_size} operations'
+            }), 400
+        
+        results = [None] * len(operations)
+        creates, updates, deletes = [], [], []
+        
+        for index, operation in enumerate(operations):
+            op = operation.get('op') if isinstance(operation, dict) else None
+            fields = operation.get('task', {}) if op else {}
+            
+            if op not in ('create', 'update', 'delete'):
+                results[index] = _batch_error(index, op, "op must be 'create', 'update' or 'delete'")
+            elif not isinstance(fields, dict):
+                results[index] = _batch_error(index, op, 'task must be an object')
+            elif op == 'create':
+                if not _valid_title(fields.get('title')):
+                    results[index] = _batch_error(index, op, 'Title is required')
+                else:
+                    creates.append((index, {
+                        'title': fields['title'],
+                        'description': fields.get('description', ''),
+                        'status': fields.get('status', 'New'),
+                        'priority': fields.get('priority', 'Medium'),
+                        'assigned_to': fields.get('assigned_to', '')
+                    }))
+            elif not is_int64(operation.get('id')):
+                results[index] = _batch_error(index, op, 'id must be a 64-bit integer')
+            elif op == 'update' and 'title' in fields and not _valid_title(fields['title']):
+                results[index] = _batch_error(index, op, 'Title must be a non-empty string', operation['id'])
+            elif op == 'update':
+                changes = {key: fields[key] for key in TASK_FIELDS if key in fields}
+                updates.append((index, operation['id'], changes))
+            else:
+                deletes.append((index, operation['id']))
+        
+        # One lookup for every task referenced by an update or delete
+        referenced = {task_id for _, task_id, _ in updates} | {task_id for _, task_id in deletes}
+        existing = {}
+        if referenced:
+            rows = db.session.execute(
+                select(Task.id, Task.status, Task.priority, Task.assigned_to).where(Task.id.in_(referenced))
+            )
+            existing = {row.id: tracked_values(row) for row in rows}
+        
+        deleted_ids = set()
+        for index, task_id in deletes:
+            if task_id not in existing or task_id in deleted_ids:
+                results[index] = _batch_error(index, 'delete', 'Task not found', task_id, 404)
+            else:
+                deleted_ids.add(task_id)
+        
+        # Updates run before deletes, so an update that follows the delete
+        # of the same task in the batch would be silently lost; reject it.
+        delete_positions = {task_id: index for index, task_id in deletes if task_id in deleted_ids}
+        valid_updates = []
+        for index, task_id, changes in updates:
+            if task_id not in existing:
+                results[index] = _batch_error(index, 'update', 'Task not found', task_id, 404)
+            elif delete_positions.get(task_id, len(operations)) < index:
+                results[index] = _batch_error(index, 'update', 'Task is deleted earlier in the batch', task_id, 409)
+            else:
+                valid_updates.append((index, task_id, changes))
+        
+        changes = []
+        if creates:
+            created = db.session.scalars(
+                insert(Task).returning(Task, sort_by_parameter_order=True),
+                [row for _, row in creates]
+            ).all()
+            for (index, _), task in zip(creates, created):
+                task_dict = task.to_dict()
+                results[index] = {'index': index, 'op': 'create', 'success': True, 'task': task_dict}
+                changes.append({'op': 'created', 'id': task.id, 'task': task_dict, 'before': None})
+        
+        if valid_updates:
+            now = datetime.utcnow()
+            db.session.execute(
+                update(Task),
+                [dict(changes, id=task_id, updated_at=now) for _, task_id, changes in valid_updates]
+            )
+            updated = {
+                task.id: task.to_dict()
+                for task in db.session.scalars(
+                    select(Task)
+                    .where(Task.id.in_({task_id for _, task_id, _ in valid_updates}))
+                    .execution_options(populate_existing=True)
+                )
+            }
+            for index, task_id, _ in valid_updates:
+                results[index] = {'index': index, 'op': 'update', 'success': True, 'task': updated[task_id]}
+            # One change per task, from its state before the batch to its final state
+            for task_id, task_dict in updated.items():
+                changes.append({'op': 'updated', 'id': task_id, 'task': task_dict, 'before': existing[task_id]})
+                existing[task_id] = {field: task_dict[field] for field in existing[task_id]}
+        
+        if deleted_ids:
+            db.session.execute(delete(Task).where(Task.id.in_(deleted_ids)))
+            for index, task_id in deletes:
+                if results[index] is None:
+                    results[index] = {'index': index, 'op': 'delete', 'success': True, 'id': task_id}
+                    changes.append({'op': 'deleted', 'id': task_id, 'task': None, 'before': existing[task_id]})
+        
+        if changes:
+            commit_changes(changes)
+        
+        failed = sum(1 for result in results if not result['success'])
+        return jsonify({
+            'success': failed == 0,
+            'succeeded': len(results) - failed,
+            'failed': failed,
+            'results': results
+        }), 200 if failed == 0 else 207
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api.route('/tasks/export', methods=['GET'])
+def export_tasks():
+    """Stream every task as newline-delimited JSON
+    
+    Rows are fetched from a streaming cursor EXPORT_CHUNK_SIZE at a time and
+    written out chunk by chunk, so memory use does not grow with the table.
+    """
+    chunk_size = current_app.config['EXPORT_CHUNK_SIZE']
+    dumps = current_app.json.dumps
+    
+    query, serialize = task_reader()
+    
+    def generate():
+        result = db.session.execute(query.order_by(Task.id).execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            yield ''.join(dumps(serialize(row)) + '\n' for row in rows)
+    
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def _import_row(record):
+    """Validate one imported record and convert it to an insert row"""
+    if not isinstance(record, dict):
+        raise ValueError('each line must be a JSON object')
+    if not _valid_title(record.get('title')):
+        raise ValueError('Title must be a non-empty string')
+    
+    row = {
+        'title': record['title'],
+        'description': record.get('description', ''),
+        'status': record.get('status', 'New'),
+        'priority': record.get('priority', 'Medium'),
+        'assigned_to': record.get('assigned_to', '')
+    }
+    if record.get('id') is not None:
+        if not is_int64(record['id']):
+            raise ValueError('id must be a 64-bit integer')
+        row['id'] = record['id']
+    for field in ('created_at', 'updated_at'):
+        row[field] = datetime.fromisoformat(record[field]) if record.get(field) else datetime.utcnow()
+    return row
+
+def _insert_import_chunk(chunk, id_lines):
+    """Insert a chunk of imported rows, or return a 409 response if one of their ids is taken"""
+    ids = [row['id'] for row in chunk if 'id' in row]
+    taken = db.session.scalars(select(Task.id).where(Task.id.in_(ids))).all() if ids else []
+    if taken:
+        line_number, task_id = min((id_lines[task_id], task_id) for task_id in taken)
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'Line {line_number}: task {task_id} already exists'
+        }), 409
+    db.session.execute(insert(Task), chunk)
+    return None
+
+@api.route('/tasks/import', methods=['POST'])
+def import_tasks():
+    """Import tasks from a newline-delimited JSON request body
+    
+    The body is read line by line and inserted IMPORT_CHUNK_SIZE rows at a
+    time with executemany, all in one transaction: either every line is
+    imported or, on the first invalid line, none is. Task ids present in
+    the input are kept, so an export can be restored as-is; an id that
+    already exists, or repeats within the input, answers 409.
+    """
+    try:
+        chunk_size = current_app.config['IMPORT_CHUNK_SIZE']
+        max_line = current_app.config['IMPORT_MAX_LINE_BYTES']
+        stream = request.stream
+        chunk = []
+        imported = 0
+        line_number = 0
+        id_lines = {}  # task id -> line it was read from
+        version = bump_version()
+        
+        for line in iter(lambda: stream.readline(max_line + 1), b''):
+            line_number += 1
+            if len(line) > max_line:
+                db.session.rollback()
+                return jsonify({
+                    'success': False,
+                    'error': f'Line {line_number}: longer than {max_line} bytes'
+                }), 400
+            if not line.strip():
+                continue
+            
+            try:
+                row = _import_row(current_app.json.loads(line))
+            except (ValueError, TypeError) as e:
+                db.session.rollback()
+                return jsonify({
+                    'success': False,
+                    'error': f'Line {line_number}: {e}'
+                }), 400
+            
+            if 'id' in row:
+                if row['id'] in id_lines:
+                    db.session.rollback()
+                    return jsonify({
+                        'success': False,
+                        'error': f"Line {line_number}: id {row['id']} repeats line {id_lines[row['id']]}"
+                    }), 409
+                id_lines[row['id']] = line_number
+            chunk.append(dict(row, change_seq=version))
+            
+            if len(chunk) >= chunk_size:
+                conflict = _insert_import_chunk(chunk, id_lines)
+                if conflict:
+                    return conflict
+                imported += len(chunk)
+                chunk = []
+        
+        if chunk:
+            conflict = _insert_import_chunk(chunk, id_lines)
+            if conflict:
+                return conflict
+            imported += len(chunk)
+        
+        if imported:
+            commit_changes([{'op': 'reloaded', 'id': None, 'task': None, 'before': None}], version)
         
         return jsonify({
             'success': True,
-            'message': 'Task deleted successfully'
-        }), 200
+            'imported': imported
+        }), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -171,6 +937,65 @@ def delete_task(task_id):
             'error': str(e)
         }), 500
 
+@api.route('/tasks/stream', methods=['GET'])
+def stream_changes():
+    """Server-Sent Events feed of created/updated/deleted tasks
+    
+    Reconnecting clients send Last-Event-ID (a data version) and receive the
+    events they missed; if those are no longer retained they get a 'reset'
+    event and should refetch. A comment line is sent every
+    SSE_HEARTBEAT_INTERVAL seconds, and the stream is closed after
+    SSE_MAX_DURATION seconds or when the client falls too far behind;
+    EventSource clients reconnect on their own in both cases. Each stream
+    holds a server thread, so beyond SSE_MAX_SUBSCRIBERS per process the
+    request is refused with 503 and Retry-After.
+    """
+    broker = board_change_broker(current_app, current_board_id())
+    heartbeat = current_app.config['SSE_HEARTBEAT_INTERVAL']
+    max_duration = current_app.config['SSE_MAX_DURATION']
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    version = current_version()
+    db.session.remove()
+    broker.observe(version)
+    subscriber, backlog = subscribe_within_limit(current_app, broker, last_event_id)
+    if subscriber is None:
+        response = jsonify({
+            'success': False,
+            'error': 'Too many open streams; retry shortly'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(max(1, int(heartbeat)))
+        return response
+    broker.start_watcher(current_app._get_current_object())
+    
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            if backlog is None:
+                yield format_event('reset', {'version': version}, version)
+            else:
+                yield from backlog
+            
+            deadline = time.monotonic() + max_duration
+            while not subscriber.dropped and time.monotonic() < deadline:
+                try:
+                    yield subscriber.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            broker.unsubscribe(subscriber)
+    
+    response = current_app.response_class(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @api.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -178,3 +1003,41 @@ def health_check():
         'status': 'healthy',
         'message': 'API is running'
     }), 200
+
+@boards.route('', methods=['GET'])
+def get_boards():
+    """List boards"""
+    try:
+        return jsonify({
+            'success': True,
+            'boards': [board.to_dict() for board in Board.query.order_by(Board.id)]
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@boards.route('', methods=['POST'])
+def post_board():
+    """Create a board; its tasks live in their own database in a shard directory"""
+    try:
+        data = request.get_json(silent=True) or {}
+        name = data.get('name')
+        if not isinstance(name, str) or not name.strip():
+            return jsonify({
+                'success': False,
+                'error': 'Board name is required'
+            }), 400
+        
+        board = create_board(name.strip())
+        return jsonify({
+            'success': True,
+            'board': board.to_dict()
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -0,0 +1,106 @@
+"""Schema helpers for new and existing databases"""
+from sqlalchemy import inspect, insert, select, text
+from sqlalchemy.schema import CreateTable
+from app import db
+from app.changes import backfill_task_events
+from app.database import DEFAULT_BOARD_ID
+from app.history import rebuild_flow
+from app.models import Board, Task
+from app.search import ensure_search_index
+from app.stats import ensure_stats
+
+
+def schema_tables(shard=False):
+    """Tables of the default database, or of a board shard (everything but the registry)"""
+    return [table for table in db.metadata.sorted_tables if not (shard and table.info.get('registry'))]
+
+
+def add_missing_columns(engine=None, tables=None):
+    """Add columns declared on the models but missing from existing tables
+
+    Only columns that are nullable or have a server default can be added
+    this way, which is all that ALTER TABLE ... ADD COLUMN supports anyway.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        for table in tables or db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} ' \
+                      f'{column.type.compile(engine.dialect)}'
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                if not column.nullable:
+                    ddl += ' NOT NULL'
+                conn.execute(text(ddl))
+
+
+def ensure_schema(engine=None, shard=False):
+    """Create missing tables, then any columns and indexes missing from existing tables.
+
+    db.create_all() only creates columns and indexes together with a
+    brand-new table, so databases created before they were declared would
+    never get them. Pass the engine of a board shard with shard=True; the
+    default database also gets the board registry and its default board.
+    """
+    engine = engine or db.engine
+    tables = schema_tables(shard)
+    db.metadata.create_all(engine, tables=tables)
+    add_missing_columns(engine, tables)
+    for table in tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+    ensure_search_index(engine)
+    ensure_stats(engine)
+    ensure_task_autoincrement(engine)
+    ensure_task_history(engine)
+
+    if not shard:
+        with engine.begin() as conn:
+            if conn.execute(select(Board.id).where(Board.id == DEFAULT_BOARD_ID)).first() is None:
+                conn.execute(insert(Board).values(id=DEFAULT_BOARD_ID, name='Default'))
+
+
+def ensure_task_autoincrement(engine=None):
+    """Rebuild a SQLite tasks table created without AUTOINCREMENT, so ids of deleted tasks are not reused
+
+    SQLite cannot change a table in place, so tasks is renamed, recreated
+    from the model and refilled, and its indexes and triggers (search
+    index, flow summaries) are recreated from their stored SQL. The id
+    sequence starts after every id still referenced by history or
+    tombstones.
+    """
+    engine = engine or db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+    columns = ', '.join(column.name for column in Task.__table__.columns)
+    with engine.begin() as conn:
+        ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tasks'")).scalar()
+        if 'AUTOINCREMENT' in ddl.upper():
+            return
+        dependents = conn.execute(text("SELECT sql FROM sqlite_master WHERE tbl_name = 'tasks' "
+                                       "AND type IN ('index', 'trigger') AND sql IS NOT NULL")).scalars().all()
+        conn.execute(text('ALTER TABLE tasks RENAME TO tasks_old'))
+        conn.execute(CreateTable(Task.__table__))
+        conn.execute(text(f'INSERT INTO tasks ({columns}) SELECT {columns} FROM tasks_old'))
+        conn.execute(text('DROP TABLE tasks_old'))
+        for statement in dependents:
+            conn.execute(text(statement))
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'tasks'"))
+        conn.execute(text("INSERT INTO sqlite_sequence(name, seq) SELECT 'tasks', max("
+                          "(SELECT IFNULL(max(id), 0) FROM tasks), "
+                          "(SELECT IFNULL(max(task_id), 0) FROM task_events), "
+                          "(SELECT IFNULL(max(task_id), 0) FROM task_tombstones))"))
+
+
+def ensure_task_history(engine=None):
+    """Give tasks that have no task_events their reconstructed history, and rebuild flow_daily"""
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        if backfill_task_events(conn):
+            rebuild_flow(conn)
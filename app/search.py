@@ -0,0 +1,115 @@
+"""Full-text search over task titles and descriptions (SQLite FTS5)"""
+import re
+from sqlalchemy import and_, column, event, inspect, literal_column, or_, select, table, text
+from app import db
+from app.models import Task
+
+# Title matches weigh ten times more than description matches
+BM25 = 'bm25(tasks_fts, 10.0, 1.0)'
+
+HIGHLIGHT_OPEN = '<mark>'
+HIGHLIGHT_CLOSE = '</mark>'
+
+# tasks_fts is an external-content index over tasks, kept in sync by triggers
+# so every writer (ORM, bulk statements, raw SQL) updates it in the same
+# transaction.
+SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+    "END",
+)
+
+_TOKEN = re.compile(r'\w+\*?')
+
+_tasks_fts = table('tasks_fts', column('rowid'))
+
+
+# engine URL -> whether its SQLite library has FTS5, checked once per engine
+_fts5_available = {}
+
+
+def search_available(engine):
+    """Return True if engine is SQLite with the FTS5 extension compiled in"""
+    if engine.dialect.name != 'sqlite':
+        return False
+    available = _fts5_available.get(engine.url)
+    if available is None:
+        with engine.connect() as conn:
+            available = bool(conn.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar())
+        _fts5_available[engine.url] = available
+    return available
+
+
+def ensure_search_index(engine):
+    """Create the FTS5 index and its triggers, indexing existing tasks if the index is new"""
+    if not search_available(engine):
+        return
+
+    is_new = not inspect(engine).has_table('tasks_fts')
+    with engine.begin() as conn:
+        for statement in SEARCH_DDL:
+            conn.execute(text(statement))
+        if is_new:
+            conn.execute(text("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')"))
+
+
+@event.listens_for(Task.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kwargs):
+    """Drop the FTS5 index together with the tasks table"""
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text('DROP TABLE IF EXISTS tasks_fts'))
+
+
+def build_match_query(q):
+    """Turn free text into a safe FTS5 query: every word must match, word* matches a prefix.
+
+    Returns None if q contains no searchable words.
+    """
+    terms = []
+    for token in _TOKEN.findall(q or ''):
+        word, star = (token[:-1], '*') if token.endswith('*') else (token, '')
+        terms.append(f'"{word}"{star}')
+    return ' '.join(terms) or None
+
+
+def search_tasks(match, limit, after=None, status=None):
+    """Return up to limit (score, highlights, Task) hits for match, best first.
+
+    after is the (score, id) of the last hit on the previous page; results
+    are ordered by (score, id), so pages are a keyset seek as well.
+    """
+    score = literal_column(BM25)
+    query = (
+        select(
+            Task,
+            score.label('score'),
+            literal_column(f"highlight(tasks_fts, 0, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}')"),
+            literal_column(f"snippet(tasks_fts, 1, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}', '…', 16)")
+        )
+        .join_from(Task, _tasks_fts, _tasks_fts.c.rowid == Task.id)
+        .where(text('tasks_fts MATCH :match').bindparams(match=match))
+        .order_by(score, Task.id)
+        .limit(limit)
+    )
+    if after is not None:
+        last_score, last_id = after
+        query = query.where(or_(score > last_score, and_(score == last_score, Task.id > last_id)))
+    if status:
+        query = query.where(Task.status == status)
+
+    return [
+        (hit_score, {'title': title, 'description': description}, task)
+        for task, hit_score, title, description in db.session.execute(query)
+    ]
@@ -0,0 +1,185 @@
+"""Deterministic synthetic task data for development and benchmark databases"""
+import math
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+from app import db
+from app.changes import bump_version, clear_tasks, commit_changes
+from app.database import current_board_id
+from app.models import Task
+from app.search import search_available
+from app.stats import rebuild_stats, stats_available
+
+# Most tasks on a long-lived board are finished; few are being worked on
+STATUS_WEIGHTS = {'Done': 60, 'New': 28, 'In Progress': 12}
+PRIORITY_WEIGHTS = {'Medium': 55, 'Low': 27, 'High': 18}
+# Share of tasks nobody has picked up yet
+UNASSIGNED_SHARE = 0.1
+
+VERBS = ('Implement', 'Fix', 'Refactor', 'Document', 'Test', 'Review', 'Design', 'Migrate',
+         'Optimize', 'Investigate', 'Remove', 'Update', 'Add', 'Automate', 'Monitor')
+SUBJECTS = ('login form', 'checkout flow', 'invoice export', 'search index', 'user profile',
+            'payment webhook', 'dashboard charts', 'mobile layout', 'email templates', 'API rate limits',
+            'audit log', 'password reset', 'CSV import', 'notification settings', 'billing page',
+            'session timeout', 'file upload', 'report scheduler', 'cache layer', 'database backups')
+AREAS = ('frontend', 'backend', 'infra', 'docs', 'mobile', 'data', 'security', 'ops')
+DETAILS = ('Customers reported this in support tickets.', 'Blocked until the design review is done.',
+           'Needs a feature flag for the gradual rollout.', 'Add tests covering the edge cases.',
+           'See the linked incident for the stack trace.', 'Coordinate with the platform team.',
+           'Measure before and after in staging.', 'Keep the old endpoint working for one release.',
+           'Split into smaller tasks if it grows.', 'Acceptance criteria are in the spec.')
+FIRST_NAMES = ('Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn',
+               'Robin', 'Drew', 'Kai', 'Noa', 'Sasha', 'Eli', 'Rowan', 'Emery', 'Parker', 'Reese')
+LAST_NAMES = ('Smith', 'Garcia', 'Kim', 'Nguyen', 'Patel', 'Müller', 'Rossi', 'Silva', 'Cohen', 'Tanaka',
+              'Okafor', 'Novak', 'Larsen', 'Dubois', 'Kowalski', 'Haddad', 'Ivanova', 'Mensah', 'Costa', 'Berg')
+
+
+def assignee_names(count):
+    """Return count distinct, deterministic assignee names"""
+    names = []
+    for n in range(count):
+        first, last = FIRST_NAMES[n % len(FIRST_NAMES)], LAST_NAMES[n // len(FIRST_NAMES) % len(LAST_NAMES)]
+        cycle = n // (len(FIRST_NAMES) * len(LAST_NAMES))
+        names.append(f'{first} {last}' + (f' {cycle + 1}' if cycle else ''))
+    return names
+
+
+def generate_tasks(count, seed=0, assignees=50, days=365, end=None, chunk_size=10000):
+    """Yield lists of up to chunk_size task rows (dicts for insert(Task)).
+
+    The same arguments always produce the same rows. Statuses and priorities
+    follow STATUS_WEIGHTS and PRIORITY_WEIGHTS; work is spread over the
+    assignees with a Zipf-like skew, so a few people own most tasks. Tasks
+    are created over the days before end (today by default), more densely
+    towards the end as on a growing project, in id order.
+    """
+    rng = random.Random(seed)
+    end = end or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    span = days * 86400
+    start = end - timedelta(seconds=span)
+
+    statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+    priorities, priority_weights = zip(*PRIORITY_WEIGHTS.items())
+    zipf = [1 / (rank + 1) for rank in range(assignees)]
+    people = assignee_names(assignees) + ['']
+    people_weights = [(1 - UNASSIGNED_SHARE) * weight / sum(zipf) for weight in zipf] + [UNASSIGNED_SHARE]
+
+    for first in range(0, count, chunk_size):
+        n = min(chunk_size, count - first)
+        chunk_statuses = rng.choices(statuses, status_weights, k=n)
+        chunk_priorities = rng.choices(priorities, priority_weights, k=n)
+        chunk_people = rng.choices(people, people_weights, k=n)
+        verbs = rng.choices(VERBS, k=n)
+        subjects = rng.choices(SUBJECTS, k=n)
+        areas = rng.choices(AREAS, k=n)
+        details = rng.choices(DETAILS, k=n)
+
+        rows = []
+        for i in range(n):
+            # Creation density grows linearly towards end
+            created_offset = span * math.sqrt((first + i + rng.random()) / count)
+            created_at = start + timedelta(seconds=created_offset)
+            # Finished tasks were last touched long after creation, new ones soon after
+            status = chunk_statuses[i]
+            reach = 1.0 if status == 'Done' else 0.5 if status == 'In Progress' else 0.05
+            updated_at = created_at + timedelta(seconds=(span - created_offset) * reach * rng.random())
+            # Work started somewhere between creation and the last update
+            started_at = completed_at = None
+            if status != 'New':
+                started_at = created_at + (updated_at - created_at) * rng.random()
+            if status == 'Done':
+                completed_at = updated_at
+            rows.append({
+                'title': f'{verbs[i]} {subjects[i]} ({areas[i]})',
+                'description': f'{verbs[i]} the {subjects[i]} for the {areas[i]} team. {details[i]}',
+                'status': status,
+                'priority': chunk_priorities[i],
+                'assigned_to': chunk_people[i],
+                'created_at': created_at,
+                'updated_at': updated_at,
+                'started_at': started_at,
+                'completed_at': completed_at,
+            })
+        yield rows
+
+
+def _insert_sqlite(connection, rows):
+    """executemany rows straight through the driver, skipping SQLAlchemy's per-row bind processing
+
+    Datetimes are written in the text format SQLAlchemy stores on SQLite.
+    """
+    table = Task.__table__
+    # The compiled statement lists its columns in table order
+    columns = [column.name for column in table.columns if column.name in rows[0]]
+    sql = str(insert(table).compile(dialect=connection.dialect, column_keys=columns))
+    connection.exec_driver_sql(sql, [
+        tuple(value.isoformat(' ', 'microseconds') if isinstance(value, datetime) else value
+              for value in map(row.__getitem__, columns))
+        for row in rows
+    ])
+
+
+def seed_tasks(count, seed=0, assignees=50, days=365, end=None, chunk_size=10000, reset=False, progress=None):
+    """Insert count generated tasks in one transaction and return the new data version.
+
+    Rows go in with one executemany per chunk; progress(rows) is called
+    after each chunk. With reset, existing tasks and tombstones are removed
+    first and every outstanding sync token expires. Loads larger than the
+    table drop its secondary indexes and build them again afterwards, and
+    on SQLite the triggers on tasks are dropped during the load: the search
+    index is then filled by one INSERT ... SELECT and the flow statistics
+    are rebuilt in one pass, both much faster than a trigger per row.
+    Subscribers are told the tasks were reloaded.
+    """
+    table = Task.__table__
+    fts = search_available(db.session.get_bind())
+    # The UPDATE opens the transaction, so the DDL below is rolled back on failure
+    version = bump_version()
+    connection = db.session.connection()
+    board_id = current_board_id()
+
+    triggers = []
+    if connection.dialect.name == 'sqlite':
+        triggers = db.session.execute(text("SELECT name, sql FROM sqlite_master "
+                                           "WHERE type = 'trigger' AND tbl_name = 'tasks'")).all()
+        for name, _ in triggers:
+            db.session.execute(text(f'DROP TRIGGER "{name}"'))
+
+    if reset:
+        clear_tasks(version)
+        if fts:
+            db.session.execute(text("INSERT INTO tasks_fts(tasks_fts) VALUES ('delete-all')"))
+
+    existing, last_id = db.session.execute(select(func.count(), func.max(table.c.id))).one()
+    rebuild_indexes = existing < count
+    if rebuild_indexes:
+        for index in table.indexes:
+            index.drop(connection)
+
+    for rows in generate_tasks(count, seed, assignees, days, end, chunk_size):
+        for row in rows:
+            row['change_seq'] = version
+            row['board_id'] = board_id
+        if connection.dialect.name == 'sqlite':
+            _insert_sqlite(connection, rows)
+        else:
+            db.session.execute(insert(table), rows)
+        if progress:
+            progress(len(rows))
+
+    if rebuild_indexes:
+        for index in table.indexes:
+            index.create(connection)
+    if fts:
+        db.session.execute(text('INSERT INTO tasks_fts(rowid, title, description) '
+                                'SELECT id, title, description FROM tasks WHERE id > :last_id'),
+                           {'last_id': last_id or 0})
+    if stats_available(db.session.get_bind()):
+        rebuild_stats()
+    for _, sql in triggers:
+        connection.exec_driver_sql(sql)
+
+    commit_changes([{'op': 'reloaded', 'id': None, 'task': None, 'before': None}], version)
+    return version
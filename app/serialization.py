@@ -0,0 +1,110 @@
+"""Fast JSON serialization: pluggable JSON providers and ORM-free task rows"""
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select, type_coerce, String
+
+from app.models import Task
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Task fields stored as DATETIME and serialized as ISO 8601 strings
+DATETIME_FIELDS = frozenset({'created_at', 'updated_at'})
+
+
+class CompactJSONProvider(DefaultJSONProvider):
+    """Compact, key-sorted JSON with non-ASCII text written as UTF-8
+
+    This is the standard-library provider. OrJSONProvider writes the same
+    bytes for every payload the API produces, so either can serve responses.
+    Unlike Flask's default provider, which escapes non-ASCII characters as
+    \\uXXXX, text is written as UTF-8 (orjson cannot escape it); the decoded
+    values are the same.
+    """
+
+    ensure_ascii = False
+    sort_keys = True
+    compact = True
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault('separators', (',', ':'))
+        return super().dumps(obj, **kwargs)
+
+
+class OrJSONProvider(CompactJSONProvider):
+    """CompactJSONProvider backed by orjson"""
+
+    options = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+               if orjson else 0)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # orjson has no equivalent of most json.dumps arguments
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.options).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.options | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def make_json_provider(app):
+    """Return the JSON provider selected by JSON_PROVIDER ('auto', 'orjson' or 'stdlib')"""
+    choice = app.config['JSON_PROVIDER']
+    if choice == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_PROVIDER is 'orjson' but orjson is not installed")
+    if choice == 'orjson' or (choice == 'auto' and orjson is not None):
+        return OrJSONProvider(app)
+    return CompactJSONProvider(app)
+
+
+def task_select(fields=Task.FIELDS, dialect_name=None):
+    """Core SELECT of the columns behind fields, plus id (needed for keyset cursors)
+
+    On SQLite, datetime columns are selected as their stored text so no
+    datetime objects are built; task_row_serializer() reformats the text.
+    """
+    columns = Task.__table__.c
+    selected = []
+    for field in ('id',) + tuple(field for field in fields if field != 'id'):
+        column = columns[field]
+        if field in DATETIME_FIELDS and dialect_name == 'sqlite':
+            column = type_coerce(column, String).label(field)
+        selected.append(column)
+    return select(*selected)
+
+
+def _iso_from_sqlite(value):
+    """Turn SQLite's stored 'YYYY-MM-DD HH:MM:SS[.ffffff]' into datetime.isoformat() output"""
+    if value is None:
+        return None
+    value = value.replace(' ', 'T', 1)
+    return value[:-7] if value.endswith('.000000') else value
+
+
+def task_row_serializer(fields=Task.FIELDS, dialect_name=None):
+    """Return a function turning a task_select(fields) row into Task.to_dict(fields) output"""
+    # Row positions: id first, then the other fields in order
+    positions = {'id': 0}
+    for index, field in enumerate((field for field in fields if field != 'id'), start=1):
+        positions[field] = index
+
+    plain = [(field, positions[field]) for field in fields if field not in DATETIME_FIELDS]
+    dates = [(field, positions[field]) for field in fields if field in DATETIME_FIELDS]
+    if dialect_name == 'sqlite':
+        convert = _iso_from_sqlite
+    else:
+        def convert(value):
+            return value.isoformat() if value is not None else None
+
+    def serialize(row):
+        data = {field: row[index] for field, index in plain}
+        for field, index in dates:
+            data[field] = convert(row[index])
+        return data
+    return serialize
@@ -0,0 +1,348 @@
+"""Boards and the shard router
+
+Every board but the default one keeps its tasks, and everything derived
+from them (sync tombstones, search index, statistics, events), in its own
+SQLite database file, so writes to different boards never queue for the
+same write lock. The files live in shard directories (SHARD_DIRS, usually
+one per volume); the boards registry in the default database records the
+directory of each board. The default board stays in the default database.
+
+Requests under /api/boards/<board_id>/ are scoped to their board and
+app.database.ShardSession binds their statements to its database. Shard
+engines are created on first use and disposed once idle for
+SHARD_IDLE_TIMEOUT seconds, or when more than SHARD_MAX_OPEN are open.
+`flask rebalance-shards` moves boards between directories to even out
+their size or write volume.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import create_engine, func, select
+
+from app import db
+from app.database import DEFAULT_BOARD_ID, current_board_id, current_shard_path, set_board_scope
+from app.models import Board, DataVersion
+from app.migrations import head_version, schema_version, upgrade
+
+BALANCE_BY = ('size', 'writes')
+
+
+class BoardUnavailable(Exception):
+    """The board does not exist (status 404) or is being moved (status 503)"""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+class ShardRouter:
+    """Opens, caches and closes the engines of board shard databases"""
+
+    def __init__(self, directories, engine_hooks=(), idle_timeout=300, max_open=64, registry_ttl=0.5,
+                 auto_upgrade=True):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        # Called with every new engine: pragmas, metrics and diagnostics listeners
+        self.engine_hooks = list(engine_hooks)
+        self.idle_timeout = idle_timeout
+        self.max_open = max_open
+        # Seconds a registry lookup is reused; move_board() waits longer than this
+        self.registry_ttl = registry_ttl
+        # Migrate existing shards on first use; otherwise only `flask upgrade` does (SCHEMA_AUTO_UPGRADE)
+        self.auto_upgrade = auto_upgrade
+        self._registry = {}  # board id -> (shard directory, moving, generation, looked up at)
+        self._engines = OrderedDict()  # path -> [engine, last used, board generation]
+        self._ready = set()  # paths whose schema has been brought up to date
+        self._lock = threading.Lock()
+        self._schema_lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    @staticmethod
+    def path(board_id, directory):
+        """Database file of a board in a shard directory"""
+        return os.path.join(directory, f'board-{board_id}.db')
+
+    def engine(self, path, generation=None):
+        """Engine of the shard database at path, created (and migrated) on first use
+
+        Without auto_upgrade an existing database is only checked, and
+        BoardUnavailable (503) is raised while it needs `flask upgrade`.
+        Given the board's registry generation, an engine opened for another
+        generation is disposed first: the board has been moved since, maybe
+        away and back, and its connections hold the replaced file.
+        """
+        exists = os.path.exists(path)
+        evicted = []
+        with self._lock:
+            entry = self._engines.get(path)
+            if entry is not None and generation is not None and entry[2] != generation:
+                evicted.append(self._engines.pop(path)[0])
+                self._ready.discard(path)
+                entry = None
+            if entry is None:
+                engine = create_engine(f'sqlite:///{path}')
+                for hook in self.engine_hooks:
+                    hook(engine)
+                entry = self._engines[path] = [engine, 0.0, generation]
+            entry[1] = time.monotonic()
+            self._engines.move_to_end(path)
+            while len(self._engines) > self.max_open:
+                evicted.append(self._engines.popitem(last=False)[1][0])
+        for engine in evicted:
+            engine.dispose()
+
+        if path not in self._ready:
+            with self._schema_lock:
+                if path not in self._ready:
+                    if self.auto_upgrade or not exists:
+                        upgrade(entry[0], shard=True)
+                    elif (schema_version(entry[0]) or 0) < head_version():
+                        raise BoardUnavailable('Board database needs `flask --app run upgrade`', 503)
+                    self._ready.add(path)
+        return entry[0]
+
+    def lookup(self, board_id):
+        """Return (shard directory, moving, generation) of a board from the registry, or None"""
+        now = time.monotonic()
+        cached = self._registry.get(board_id)
+        if cached is not None and now - cached[3] < self.registry_ttl:
+            return cached[:3]
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(Board.shard, Board.moving, Board.generation).where(Board.id == board_id)
+            ).first()
+        if row is None:
+            self._registry.pop(board_id, None)
+            return None
+        self._registry[board_id] = (row.shard, row.moving, row.generation, now)
+        return row.shard, row.moving, row.generation
+
+    def forget(self, board_id):
+        """Drop the cached registry entry of a board"""
+        self._registry.pop(board_id, None)
+
+    def open_paths(self):
+        """Paths of the shard databases with an open engine"""
+        with self._lock:
+            return list(self._engines)
+
+    def close(self, path):
+        """Dispose the engine of path, if open"""
+        with self._lock:
+            entry = self._engines.pop(path, None)
+            self._ready.discard(path)
+        if entry is not None:
+            entry[0].dispose()
+
+    def close_idle(self, now=None):
+        """Dispose engines unused for idle_timeout seconds and return how many"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_sweep = now
+            idle = [path for path, (_, used, _) in self._engines.items() if now - used >= self.idle_timeout]
+            engines = [self._engines.pop(path)[0] for path in idle]
+        for engine in engines:
+            engine.dispose()
+        return len(engines)
+
+    def sweep(self):
+        """close_idle(), at most a few times per idle_timeout"""
+        if time.monotonic() - self._last_sweep >= self.idle_timeout / 4:
+            self.close_idle()
+
+
+def enter_board(board_id):
+    """Scope db.session to board_id; raises BoardUnavailable
+
+    The session is reset when the scope changes, so objects loaded from one
+    board's database are never served from the identity map for another.
+    """
+    shard_path = None
+    if board_id != DEFAULT_BOARD_ID:
+        entry = current_app.extensions['shards'].lookup(board_id)
+        if entry is None:
+            raise BoardUnavailable('Board not found', 404)
+        shard, moving, generation = entry
+        if moving:
+            raise BoardUnavailable('Board is being moved to another shard; retry shortly', 503)
+        if shard is not None:
+            shard_path = ShardRouter.path(board_id, shard)
+            # Opened here so an out-of-date database fails the request up front
+            current_app.extensions['shards'].engine(shard_path, generation)
+
+    if (board_id, shard_path) != (current_board_id(), current_shard_path()):
+        db.session.remove()
+        set_board_scope(board_id, shard_path)
+
+
+def leave_board():
+    """Return db.session to the default board"""
+    enter_board(DEFAULT_BOARD_ID)
+
+
+@contextmanager
+def board_scope(board_id):
+    """Run a block (a CLI command, a background thread) against one board"""
+    previous = current_board_id()
+    enter_board(board_id)
+    try:
+        yield
+    finally:
+        enter_board(previous)
+
+
+def create_board(name):
+    """Register a board in the shard directory holding the fewest boards and create its database"""
+    router = current_app.extensions['shards']
+    counts = dict(db.session.execute(
+        select(Board.shard, func.count()).where(Board.shard.isnot(None)).group_by(Board.shard)
+    ).all())
+    directory = min(router.directories, key=lambda candidate: counts.get(candidate, 0))
+
+    board = Board(name=name, shard=directory)
+    db.session.add(board)
+    db.session.flush()
+    os.makedirs(directory, exist_ok=True)
+    router.engine(router.path(board.id, directory), board.generation)
+    db.session.commit()
+    return board
+
+
+def _database_files(path):
+    return [name for name in (path, path + '-wal', path + '-shm') if os.path.exists(name)]
+
+
+def board_loads(by='size'):
+    """Return {board id: (shard directory, load)} for every sharded board
+
+    Load is the database size in bytes, or with by='writes' the board's
+    data version, which counts its write transactions.
+    """
+    router = current_app.extensions['shards']
+    loads = {}
+    for board in Board.query.filter(Board.shard.isnot(None)).order_by(Board.id):
+        path = router.path(board.id, board.shard)
+        if by == 'writes':
+            with router.engine(path, board.generation).connect() as conn:
+                load = conn.execute(select(DataVersion.version)).scalar() or 0
+        else:
+            load = sum(os.path.getsize(name) for name in _database_files(path))
+        loads[board.id] = (board.shard, load)
+    return loads
+
+
+def plan_rebalance(loads, directories):
+    """Return [(board id, from directory, to directory)] evening out the load of directories
+
+    Boards in directories that are no longer configured always move. Then,
+    repeatedly, the board of the fullest directory whose move narrows the
+    gap to the emptiest directory the most is moved, until no move helps.
+    """
+    placement = {board_id: directory for board_id, (directory, _) in loads.items()}
+    totals = dict.fromkeys(directories, 0)
+    moves = []
+
+    for board_id, (directory, load) in sorted(loads.items(), key=lambda item: -item[1][1]):
+        if directory not in totals:
+            target = min(totals, key=totals.get)
+            moves.append((board_id, directory, target))
+            placement[board_id] = target
+            directory = target
+        totals[directory] += load
+
+    while len(totals) > 1:
+        fullest = max(totals, key=totals.get)
+        emptiest = min(totals, key=totals.get)
+        gap = totals[fullest] - totals[emptiest]
+        candidates = [
+            (abs(gap - 2 * loads[board_id][1]), board_id)
+            for board_id, directory in placement.items()
+            if directory == fullest and 0 < loads[board_id][1] < gap
+        ]
+        if not candidates:
+            break
+        new_gap, board_id = min(candidates)
+        if new_gap >= gap:
+            break
+        load = loads[board_id][1]
+        totals[fullest] -= load
+        totals[emptiest] += load
+        placement[board_id] = emptiest
+        moves.append((board_id, fullest, emptiest))
+
+    # A board moved twice only needs its final move
+    final = {}
+    for board_id, source, target in moves:
+        final[board_id] = (final.get(board_id, (source,))[0], target)
+    return [(board_id, source, target) for board_id, (source, target) in final.items() if source != target]
+
+
+def move_board(board_id, directory, settle=1.0):
+    """Copy a board's database to another shard directory and point the registry at it
+
+    While the board is marked as moving its requests are answered with 503.
+    settle seconds are left for requests that looked the board up just
+    before, or that reuse a registry lookup (SHARD_REGISTRY_TTL, which must
+    be shorter), to finish; then the database is copied with SQLite's online
+    backup, which includes anything still in the write-ahead log. The
+    board's generation is bumped, so workers reopen the engines they still
+    hold on either file.
+    """
+    router = current_app.extensions['shards']
+    board = db.session.get(Board, board_id)
+    if board is None or board.shard is None:
+        raise ValueError(f'Board {board_id} is not on a shard')
+    directory = os.path.abspath(directory)
+    if board.shard == directory:
+        return
+
+    source = router.path(board_id, board.shard)
+    target = router.path(board_id, directory)
+    board.moving = True
+    db.session.commit()
+    router.forget(board_id)
+    try:
+        time.sleep(settle)
+        router.close(source)
+        os.makedirs(directory, exist_ok=True)
+        source_db = sqlite3.connect(source)
+        target_db = sqlite3.connect(target)
+        try:
+            source_db.backup(target_db)
+        finally:
+            target_db.close()
+            source_db.close()
+        board.shard = directory
+        board.generation += 1
+    except Exception:
+        for name in _database_files(target):
+            os.remove(name)
+        raise
+    finally:
+        board.moving = False
+        db.session.commit()
+        router.forget(board_id)
+
+    for name in _database_files(source):
+        os.remove(name)
+
+
+def init_shards(app, engine_hooks):
+    """Create the shard router for app and close idle shards after requests"""
+    directories = app.config['SHARD_DIRS'] or [os.path.join(app.instance_path, 'shards')]
+    router = ShardRouter(directories, engine_hooks, app.config['SHARD_IDLE_TIMEOUT'],
+                         app.config['SHARD_MAX_OPEN'], app.config['SHARD_REGISTRY_TTL'],
+                         app.config['SCHEMA_AUTO_UPGRADE'])
+    app.extensions['shards'] = router
+
+    @app.teardown_request
+    def leave_board_scope(exc):
+        if current_board_id() != DEFAULT_BOARD_ID:
+            leave_board()
+        router.sweep()
+
+    return router
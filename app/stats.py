@@ -0,0 +1,178 @@
+"""Flow analytics: WIP per status, weekly throughput and cycle time per assignee
+
+GET /api/stats reads three small summary tables (stats_status,
+stats_throughput and stats_cycle_time) instead of aggregating tasks. On
+SQLite, triggers keep them current in the same transaction as every write
+to tasks, whoever makes it (routes, batch, import, raw SQL): an update
+subtracts the row's old contribution and adds its new one. Other triggers
+stamp started_at when a task first moves to In Progress and completed_at
+when it moves to Done. `flask rebuild-stats` recomputes the summaries from
+the tasks table should they ever drift.
+
+Cycle time runs from started_at, or created_at for tasks never seen In
+Progress, to completed_at, in whole seconds so the sums stay exact.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, text
+
+from app import db
+from app.models import AssigneeCycleTime, StatusCount, WeeklyThroughput
+
+# Current UTC time in the text format SQLAlchemy stores datetimes in on SQLite
+_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now') || '000'"
+
+
+def _done(row):
+    return f"{row}.status = 'Done' AND {row}.completed_at IS NOT NULL"
+
+
+def _week(row):
+    """Monday of the week row was completed in"""
+    return f"date({row}.completed_at, 'weekday 0', '-6 days')"
+
+
+def _cycle_seconds(row):
+    return (f"MAX(0, CAST(ROUND((julianday({row}.completed_at) - "
+            f"julianday(COALESCE({row}.started_at, {row}.created_at))) * 86400) AS INTEGER))")
+
+
+def _add(row):
+    """Statements adding the contribution of row to the summaries"""
+    return (
+        f"INSERT INTO stats_status(status, tasks) VALUES (IFNULL({row}.status, ''), 1) "
+        f"ON CONFLICT(status) DO UPDATE SET tasks = tasks + 1; "
+        f"INSERT INTO stats_throughput(week, completed) SELECT {_week(row)}, 1 WHERE {_done(row)} "
+        f"ON CONFLICT(week) DO UPDATE SET completed = completed + 1; "
+        f"INSERT INTO stats_cycle_time(assigned_to, completed, cycle_seconds) "
+        f"SELECT IFNULL({row}.assigned_to, ''), 1, {_cycle_seconds(row)} WHERE {_done(row)} "
+        f"ON CONFLICT(assigned_to) DO UPDATE SET completed = completed + 1, "
+        f"cycle_seconds = cycle_seconds + excluded.cycle_seconds; "
+    )
+
+
+def _remove(row):
+    """Statements subtracting the contribution of row from the summaries"""
+    return (
+        f"UPDATE stats_status SET tasks = tasks - 1 WHERE status = IFNULL({row}.status, ''); "
+        f"UPDATE stats_throughput SET completed = completed - 1 WHERE {_done(row)} AND week = {_week(row)}; "
+        f"UPDATE stats_cycle_time SET completed = completed - 1, cycle_seconds = cycle_seconds - "
+        f"{_cycle_seconds(row)} WHERE {_done(row)} AND assigned_to = IFNULL({row}.assigned_to, ''); "
+    )
+
+
+_STATS_COLUMNS = ('status', 'assigned_to', 'created_at', 'started_at', 'completed_at')
+
+STATS_DDL = (
+    # Tasks inserted without timestamps (created via the API, imported) are
+    # stamped from their own dates: created In Progress means started then
+    "CREATE TRIGGER IF NOT EXISTS tasks_flow_insert AFTER INSERT ON tasks "
+    "WHEN (new.status = 'Done' AND new.completed_at IS NULL) "
+    "OR (new.status = 'In Progress' AND new.started_at IS NULL) BEGIN "
+    "UPDATE tasks SET "
+    "completed_at = CASE WHEN status = 'Done' THEN COALESCE(completed_at, updated_at, created_at) END, "
+    "started_at = CASE WHEN status = 'In Progress' THEN COALESCE(started_at, created_at) ELSE started_at END "
+    "WHERE id = new.id; "
+    "END",
+    # Reopening a task clears completed_at; started_at is kept from the first start
+    "CREATE TRIGGER IF NOT EXISTS tasks_flow_status AFTER UPDATE OF status ON tasks "
+    "WHEN old.status IS NOT new.status BEGIN "
+    f"UPDATE tasks SET completed_at = CASE WHEN new.status = 'Done' THEN {_NOW} END, "
+    f"started_at = CASE WHEN new.status = 'In Progress' THEN COALESCE(started_at, {_NOW}) "
+    "ELSE started_at END "
+    "WHERE id = new.id; "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS tasks_stats_insert AFTER INSERT ON tasks BEGIN {_add('new')}END",
+    f"CREATE TRIGGER IF NOT EXISTS tasks_stats_delete AFTER DELETE ON tasks BEGIN {_remove('old')}END",
+    f"CREATE TRIGGER IF NOT EXISTS tasks_stats_update AFTER UPDATE OF {', '.join(_STATS_COLUMNS)} ON tasks "
+    f"WHEN {' OR '.join(f'old.{name} IS NOT new.{name}' for name in _STATS_COLUMNS)} BEGIN "
+    f"{_remove('old')}{_add('new')}END",
+)
+
+REBUILD_SQL = (
+    # Done tasks from before these columns existed count as completed when last updated
+    "UPDATE tasks SET completed_at = COALESCE(updated_at, created_at) "
+    "WHERE status = 'Done' AND completed_at IS NULL",
+    "DELETE FROM stats_status",
+    "DELETE FROM stats_throughput",
+    "DELETE FROM stats_cycle_time",
+    "INSERT INTO stats_status(status, tasks) SELECT IFNULL(status, ''), count(*) FROM tasks GROUP BY 1",
+    f"INSERT INTO stats_throughput(week, completed) SELECT {_week('tasks')}, count(*) FROM tasks "
+    f"WHERE {_done('tasks')} GROUP BY 1",
+    f"INSERT INTO stats_cycle_time(assigned_to, completed, cycle_seconds) "
+    f"SELECT IFNULL(assigned_to, ''), count(*), sum({_cycle_seconds('tasks')}) FROM tasks "
+    f"WHERE {_done('tasks')} GROUP BY 1",
+)
+
+
+def stats_available(engine):
+    """Return True if engine maintains the summary tables (SQLite only)"""
+    return engine.dialect.name == 'sqlite'
+
+
+def ensure_stats(engine):
+    """Create the triggers, filling the summaries if the triggers are new"""
+    if not stats_available(engine):
+        return
+
+    with engine.begin() as conn:
+        is_new = conn.execute(text("SELECT count(*) FROM sqlite_master "
+                                   "WHERE type = 'trigger' AND name LIKE 'tasks_stats_%'")).scalar() == 0
+        for statement in STATS_DDL:
+            conn.execute(text(statement))
+        if is_new:
+            for statement in REBUILD_SQL:
+                conn.execute(text(statement))
+
+
+def rebuild_stats():
+    """Recompute the summaries from the tasks table, in the current session's transaction"""
+    for statement in REBUILD_SQL:
+        db.session.execute(text(statement))
+
+
+def week_start(day):
+    """Monday of the week containing day"""
+    return day - timedelta(days=day.weekday())
+
+
+def read_stats(weeks, today=None):
+    """Return (wip, throughput, cycle_time) for GET /api/stats
+
+    throughput covers the last weeks calendar weeks up to and including the
+    current one, oldest first, with zeros for weeks without completions.
+    """
+    wip = {
+        status: tasks
+        for status, tasks in db.session.execute(
+            select(StatusCount.status, StatusCount.tasks)
+            .where(StatusCount.tasks > 0)
+            .order_by(StatusCount.status))
+    }
+
+    last = week_start(today or datetime.utcnow().date())
+    first = last - timedelta(weeks=weeks - 1)
+    completed = {
+        week: count
+        for week, count in db.session.execute(
+            select(WeeklyThroughput.week, WeeklyThroughput.completed)
+            .where(WeeklyThroughput.week.between(first, last)))
+    }
+    throughput = [
+        {'week': week.isoformat(), 'completed': completed.get(week, 0)}
+        for week in (first + timedelta(weeks=i) for i in range(weeks))
+    ]
+
+    cycle_time = [
+        {
+            'assigned_to': assigned_to or None,
+            'completed': count,
+            'average_hours': round(seconds / count / 3600, 2)
+        }
+        for assigned_to, count, seconds in db.session.execute(
+            select(AssigneeCycleTime.assigned_to, AssigneeCycleTime.completed,
+                   AssigneeCycleTime.cycle_seconds)
+            .where(AssigneeCycleTime.completed > 0)
+            .order_by(AssigneeCycleTime.assigned_to))
+    ]
+    return wip, throughput, cycle_time
@@ -0,0 +1,198 @@
+"""Server-Sent Events change feed: in-process pub/sub fan-out of task changes"""
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+from app import db
+from app.changes import current_version, tasks_committed
+from app.database import DEFAULT_BOARD_ID
+
+
+class Subscriber:
+    """One SSE connection: a bounded queue of pending events"""
+
+    def __init__(self, queue_size):
+        self.queue = queue.Queue(queue_size)
+        self.dropped = False
+
+
+class ChangeBroker:
+    """Fan task change events out to every subscriber of this process.
+
+    Event ids are data versions, which are shared by all worker processes,
+    so a client can resume with Last-Event-ID on any worker. Writes made in
+    this process are published with their full payload as they commit;
+    writes made by other processes show up as gaps in the version sequence,
+    either at the next local write or through a watcher thread that polls
+    the data version while anyone is subscribed, and are published as a
+    'sync' event telling clients to fetch what changed.
+
+    Publishing never blocks: a subscriber whose queue is full is dropped
+    and its connection closed, and the client reconnects with Last-Event-ID.
+    """
+
+    def __init__(self, queue_size=100, history_size=1000, poll_interval=1.0, board_id=DEFAULT_BOARD_ID):
+        # Every board has its own data versions, and so its own broker
+        self.board_id = board_id
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.last_version = None
+        # Every event after this version is still in _history
+        self._complete_after = None
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._watcher = None
+        self.dropped = 0
+
+    def publish(self, version, events):
+        """Publish (event type, data) pairs that were committed at version"""
+        messages = [(version, format_event(event_type, data, version)) for event_type, data in events]
+        with self._lock:
+            if self.last_version is not None and version > self.last_version + 1:
+                # Another process committed the versions in between
+                messages.insert(0, (version - 1, format_event('sync', {'version': version - 1}, version - 1)))
+            if self._complete_after is None:
+                self._complete_after = version - 1 if self.last_version is None else self.last_version
+            self.last_version = max(version, self.last_version or 0)
+            for entry in messages:
+                if len(self._history) == self._history.maxlen:
+                    # The evicted version may still have other events retained
+                    self._complete_after = max(self._complete_after, self._history[0][0])
+                self._history.append(entry)
+            for subscriber in list(self._subscribers):
+                try:
+                    for _, message in messages:
+                        subscriber.queue.put_nowait(message)
+                except queue.Full:
+                    subscriber.dropped = True
+                    self._subscribers.discard(subscriber)
+                    self.dropped += 1
+
+    def observe(self, version):
+        """Record the current data version if nothing has been published yet"""
+        with self._lock:
+            if self.last_version is None:
+                self.last_version = version
+                self._complete_after = version
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber and return (subscriber, backlog).
+
+        backlog holds the retained events newer than last_event_id, or None
+        if events after last_event_id are no longer retained and the client
+        has to resynchronize.
+        """
+        subscriber = Subscriber(self.queue_size)
+        with self._lock:
+            backlog = []
+            if last_event_id is not None:
+                if self._complete_after is not None and last_event_id >= self._complete_after:
+                    backlog = [message for version, message in self._history if version > last_event_id]
+                else:
+                    backlog = None
+            self._subscribers.add(subscriber)
+        return subscriber, backlog
+
+    def unsubscribe(self, subscriber):
+        """Remove a subscriber"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        """Return the number of connected subscribers"""
+        with self._lock:
+            return len(self._subscribers)
+
+    def start_watcher(self, app):
+        """Poll the data version for writes from other processes while anyone is subscribed"""
+        with self._lock:
+            if self._watcher is not None or self.poll_interval <= 0:
+                return
+            self._watcher = threading.Thread(target=self._watch, args=(app,), daemon=True,
+                                             name='change-broker-watcher')
+            self._watcher.start()
+
+    def _watch(self, app):
+        from app.shards import board_scope
+        with app.app_context(), board_scope(self.board_id):
+            while True:
+                time.sleep(self.poll_interval)
+                with self._lock:
+                    if not self._subscribers:
+                        self._watcher = None
+                        return
+                try:
+                    version = current_version()
+                finally:
+                    db.session.remove()
+                if self.last_version is None:
+                    self.last_version = version
+                elif version > self.last_version:
+                    self.publish(version, [('sync', {'version': version})])
+
+
+def format_event(event_type, data, event_id):
+    """Format one Server-Sent Event"""
+    return f'id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+def change_events(changes):
+    """Convert change records (see app.changes) to (event type, data) pairs"""
+    events = []
+    for change in changes:
+        if change['op'] == 'reloaded':
+            events.append(('reload', {}))
+        elif change['op'] == 'deleted':
+            events.append(('deleted', {'id': change['id']}))
+        else:
+            events.append((change['op'], {'task': change['task']}))
+    return events
+
+
+_brokers_lock = threading.Lock()
+
+
+def board_change_broker(app, board_id):
+    """Return the change broker of a board, created on first use"""
+    brokers = app.extensions['change_brokers']
+    broker = brokers.get(board_id)
+    if broker is None:
+        with _brokers_lock:
+            broker = brokers.setdefault(board_id, ChangeBroker(
+                app.config['SSE_QUEUE_SIZE'], app.config['SSE_HISTORY_SIZE'],
+                app.config['SSE_POLL_INTERVAL'], board_id
+            ))
+    return broker
+
+
+_subscribe_lock = threading.Lock()
+
+
+def subscribe_within_limit(app, broker, last_event_id=None):
+    """Subscribe to broker unless this process already streams to SSE_MAX_SUBSCRIBERS clients
+
+    Returns (subscriber, backlog) as ChangeBroker.subscribe does, or
+    (None, None) when the limit is reached. Each stream holds a server
+    thread, so the limit is counted over the brokers of every board.
+    """
+    with _subscribe_lock:
+        brokers = list(app.extensions['change_brokers'].values())
+        if sum(other.subscriber_count() for other in brokers) >= app.config['SSE_MAX_SUBSCRIBERS']:
+            return None, None
+        return broker.subscribe(last_event_id)
+
+
+def init_change_broker(app):
+    """Create the change broker for app and feed it every committed write"""
+    app.extensions['change_brokers'] = {}
+    broker = board_change_broker(app, DEFAULT_BOARD_ID)
+    app.extensions['change_broker'] = broker
+
+    def publish(sender, version, changes, board_id=DEFAULT_BOARD_ID):
+        board_change_broker(sender, board_id).publish(version, change_events(changes))
+
+    tasks_committed.connect(publish, sender=app, weak=False)
+    return broker
@@ -0,0 +1,95 @@
+"""
+Cold start: time from launching gunicorn until GET /api/ready answers 200
+
+Seeds a scratch SQLite database, then starts gunicorn against it --runs
+times and polls /api/ready (the Kubernetes readinessProbe) every 10ms,
+printing the time to readiness. Also times the schema work done at
+startup in-process: the version check the app now does, against the full
+ensure_schema() pass (reflect every table, create missing columns,
+indexes, search index and triggers) it used to do on every start.
+
+Usage: python benchmarks/cold_start.py [--size 100000] [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from load_test import ROOT, SERVERS
+
+sys.path.insert(0, ROOT)
+
+from app import create_app, db  # noqa: E402
+from app.migrations import schema_version  # noqa: E402
+from app.schema import ensure_schema  # noqa: E402
+from app.seed import seed_tasks  # noqa: E402
+
+
+def time_to_ready(database_url, port, timeout=60):
+    """Start gunicorn and return the seconds until /api/ready answers 200"""
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, PORT=str(port), DATABASE_URL=database_url, GUNICORN_ACCESS_LOG='/dev/null')
+    started = time.perf_counter()
+    process = subprocess.Popen(SERVERS['gunicorn'], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if requests.get(f'{base_url}/api/ready', timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f'Server at {base_url} did not become ready')
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def time_schema_work(app, runs):
+    """Return median seconds of (version check, full ensure_schema pass)"""
+    checks, full = [], []
+    with app.app_context():
+        for _ in range(runs):
+            db.engine.dispose()
+            started = time.perf_counter()
+            schema_version()
+            checks.append(time.perf_counter() - started)
+
+            db.engine.dispose()
+            started = time.perf_counter()
+            ensure_schema()
+            full.append(time.perf_counter() - started)
+    return statistics.median(checks), statistics.median(full)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=100000, help='tasks to seed')
+    parser.add_argument('--runs', type=int, default=5, help='server starts to time')
+    parser.add_argument('--port', type=int, default=5058)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f'sqlite:///{tmp}/bench.db'
+        app = create_app({'SQLALCHEMY_DATABASE_URI': database_url, 'METRICS_ENABLED': False})
+        with app.app_context():
+            seed_tasks(args.size)
+
+        check, full = time_schema_work(app, args.runs)
+        print(f'schema work at startup: version check {check * 1000:.1f} ms, '
+              f'full ensure_schema() {full * 1000:.1f} ms')
+
+        samples = sorted(time_to_ready(database_url, args.port) for _ in range(args.runs))
+        print(f'gunicorn to ready ({args.size} tasks): median {statistics.median(samples) * 1000:.0f} ms, '
+              f'min {samples[0] * 1000:.0f} ms, max {samples[-1] * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+"""
+Endpoint benchmark suite: throughput and latency percentiles for every API route
+
+For each dataset size, seeds a scratch SQLite database, then drives every
+route of the api and boards blueprints in-process through Flask's test client and over
+HTTP against a gunicorn server started on the same database. Prints
+requests/second and p50/p95/p99 latency per route.
+
+With --baseline, results are compared against a stored baseline and the
+script exits with status 1 when any route's p95 latency grows, or its
+throughput drops, by more than --threshold. --save-baseline stores the
+current results as the new baseline. Baselines are only comparable on the
+machine they were recorded on; benchmarks/baseline.json holds a run with
+the defaults (1000 tasks, both modes).
+
+Usage:
+  python benchmarks/endpoints.py [--sizes 1000,100000,1000000] [--modes inprocess,http]
+  python benchmarks/endpoints.py --sizes 100000 --save-baseline benchmarks/baseline.json
+  python benchmarks/endpoints.py --sizes 100000 --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import requests
+
+from load_test import ROOT, SERVERS, percentile, wait_until_ready
+
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import Task  # noqa: E402
+from app.pagination import encode_cursor  # noqa: E402
+from app.seed import PRIORITY_WEIGHTS, STATUS_WEIGHTS, SUBJECTS, seed_tasks  # noqa: E402
+
+# Start of the seeded history, one year back
+YEAR_AGO = (datetime.utcnow().date() - timedelta(days=364)).isoformat()
+
+# Search terms drawn from the generated titles
+WORDS = sorted({word for subject in SUBJECTS for word in subject.split() if len(word) > 3})
+STATUSES = tuple(STATUS_WEIGHTS)
+PRIORITIES = tuple(PRIORITY_WEIGHTS)
+
+
+class Scenario:
+    """One benchmarked request: a route plus a function building its arguments"""
+
+    def __init__(self, name, method, build, share=1.0, http=True):
+        self.name = name
+        self.method = method
+        self.build = build
+        # Fraction of --requests to send (heavy routes send fewer)
+        self.share = share
+        self.http = http
+
+
+def scenarios(max_id, rng):
+    """Every api and boards route, with arguments drawn at random from the seeded data"""
+    created = []
+
+    def task_id():
+        return rng.randint(1, max_id)
+
+    def create():
+        return '/api/tasks', {'json': {'title': 'Benchmark task', 'description': 'created by the benchmark'}}
+
+    def delete():
+        return f'/api/tasks/{created.pop() if created else task_id()}', {}
+
+    def batch():
+        operations = [{'op': 'update', 'id': task_id(), 'task': {'priority': rng.choice(PRIORITIES)}}
+                      for _ in range(10)]
+        return '/api/tasks/batch', {'json': {'operations': operations}}
+
+    def import_body():
+        lines = (json.dumps({'title': f'Imported {n}', 'status': rng.choice(STATUSES)}) for n in range(100))
+        return '/api/tasks/import', {'data': '\n'.join(lines), 'content_type': 'application/x-ndjson'}
+
+    return created, [
+        Scenario('index', 'GET', lambda: ('/api/', {})),
+        Scenario('health', 'GET', lambda: ('/api/health', {})),
+        Scenario('ready', 'GET', lambda: ('/api/ready', {})),
+        Scenario('metrics', 'GET', lambda: ('/api/metrics', {})),
+        Scenario('boards', 'GET', lambda: ('/api/boards', {})),
+        Scenario('tasks_first_page', 'GET', lambda: ('/api/tasks?limit=100', {})),
+        Scenario('tasks_deep_page', 'GET', lambda: (f'/api/tasks?limit=100&cursor={encode_cursor(task_id())}', {})),
+        Scenario('tasks_by_status', 'GET', lambda: (
+            f'/api/tasks?limit=100&status={rng.choice(STATUSES)}&cursor={encode_cursor(task_id())}', {})),
+        Scenario('tasks_fields', 'GET', lambda: (
+            f'/api/tasks?limit=100&fields=id,title,status&cursor={encode_cursor(task_id())}', {})),
+        Scenario('board', 'GET', lambda: ('/api/board', {})),
+        Scenario('search', 'GET', lambda: (f'/api/tasks/search?q={rng.choice(WORDS)}&limit=20', {}), 0.25),
+        Scenario('changes_first_page', 'GET', lambda: ('/api/tasks/changes?limit=100', {})),
+        Scenario('changes_since', 'GET', lambda: (f'/api/tasks/changes?limit=100&since={encode_cursor(0, task_id())}', {})),
+        Scenario('get_task', 'GET', lambda: (f'/api/tasks/{task_id()}', {})),
+        Scenario('task_history', 'GET', lambda: (f'/api/tasks/{task_id()}/history', {})),
+        Scenario('stats', 'GET', lambda: ('/api/stats', {})),
+        Scenario('flow_year', 'GET', lambda: (f'/api/flow?bucket=week&from={YEAR_AGO}', {}), 0.5),
+        Scenario('create_task', 'POST', create),
+        Scenario('update_task', 'PUT', lambda: (f'/api/tasks/{task_id()}', {'json': {'status': rng.choice(STATUSES)}})),
+        Scenario('delete_task', 'DELETE', delete),
+        Scenario('batch', 'POST', batch, 0.5),
+        Scenario('import', 'POST', import_body, 0.1),
+        Scenario('export', 'GET', lambda: ('/api/tasks/export', {}), 0.02),
+        # In-process only: over HTTP an abandoned stream holds a gunicorn
+        # thread until its next heartbeat, starving the remaining clients
+        Scenario('stream_connect', 'GET', lambda: ('/api/tasks/stream', {}), 0.25, http=False),
+    ]
+
+
+def summarize(latencies, elapsed, errors):
+    """Return throughput and latency percentiles (ms) for one scenario"""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_inprocess(database_url, max_id, args):
+    """Drive every route through the Flask test client"""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url})
+    client = app.test_client()
+    created, suite = scenarios(max_id, random.Random(args.seed))
+
+    results = {}
+    for scenario in suite:
+        latencies, errors = [], 0
+        total = max(1, int(args.requests * scenario.share))
+        for n in range(-min(args.warmup, total), total):
+            if n == 0:
+                latencies, errors = [], 0
+                started = time.perf_counter()
+            path, kwargs = scenario.build()
+            start = time.perf_counter()
+            if scenario.name == 'stream_connect':
+                response = client.open(path, method='GET', buffered=False)
+                next(response.response)
+                response.close()
+            else:
+                response = client.open(path, method=scenario.method, **kwargs)
+                response.get_data()
+                response.close()
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+            if scenario.name == 'create_task' and response.status_code == 201:
+                created.append(response.get_json()['task']['id'])
+        results[scenario.name] = summarize(latencies, time.perf_counter() - started, errors)
+    return results
+
+
+def run_http(database_url, max_id, args):
+    """Drive every route over HTTP against a gunicorn server from --clients threads"""
+    base_url = f'http://127.0.0.1:{args.port}'
+    env = dict(os.environ, PORT=str(args.port), DATABASE_URL=database_url, GUNICORN_ACCESS_LOG='/dev/null')
+    process = subprocess.Popen(SERVERS['gunicorn'], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_ready(base_url, timeout=120)
+        created, suite = scenarios(max_id, random.Random(args.seed))
+        lock = threading.Lock()
+
+        results = {}
+        for scenario in (scenario for scenario in suite if scenario.http):
+            latencies, errors = [], [0]
+            total = max(1, int(args.requests * scenario.share))
+            remaining = [min(args.warmup, total)]
+
+            def client():
+                session = requests.Session()
+                while True:
+                    with lock:
+                        if remaining[0] == 0:
+                            return
+                        remaining[0] -= 1
+                        path, kwargs = scenario.build()
+                    if 'content_type' in kwargs:
+                        kwargs = {'data': kwargs['data'], 'headers': {'Content-Type': kwargs['content_type']}}
+                    start = time.perf_counter()
+                    response = session.request(scenario.method, base_url + path, **kwargs)
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        latencies.append(elapsed)
+                        errors[0] += response.status_code >= 400
+                        if scenario.name == 'create_task' and response.status_code == 201:
+                            created.append(response.json()['task']['id'])
+
+            client()
+            latencies.clear()
+            errors[0] = 0
+            remaining[0] = total
+
+            started = time.perf_counter()
+            threads = [threading.Thread(target=client) for _ in range(args.clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            results[scenario.name] = summarize(latencies, time.perf_counter() - started, errors[0])
+        return results
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+MODES = {'inprocess': run_inprocess, 'http': run_http}
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Return the regressions of results against baseline, as printable strings"""
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if (current['p95'] > previous['p95'] * (1 + threshold)
+                and current['p95'] - previous['p95'] > min_delta_ms):
+            regressions.append(f"{key}: p95 {previous['p95']:.2f} -> {current['p95']:.2f} ms")
+        if current['rps'] < previous['rps'] * (1 - threshold):
+            regressions.append(f"{key}: throughput {previous['rps']:.1f} -> {current['rps']:.1f} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000', help='comma-separated dataset sizes, e.g. 1000,100000,1000000')
+    parser.add_argument('--modes', default='inprocess,http', help='inprocess, http or both')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route (heavy routes send fewer)')
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per route before timing')
+    parser.add_argument('--clients', type=int, default=4, help='concurrent clients in http mode')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--seed', type=int, default=1, help='random seed for request arguments')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against this baseline JSON file')
+    parser.add_argument('--save-baseline', help='store the results as a baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed relative regression')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='ignore p95 regressions smaller than this many milliseconds')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    modes = args.modes.split(',')
+    results = {}
+
+    print(f"{'mode':<10}{'tasks':>9}  {'route':<20}{'requests':>9}{'errors':>7}{'req/s':>10}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            database_url = f'sqlite:///{tmp}/bench.db'
+            started = time.perf_counter()
+            seed_app = create_app({'SQLALCHEMY_DATABASE_URI': database_url})
+            with seed_app.app_context():
+                seed_tasks(count, seed=args.seed)
+                max_id = db.session.scalar(select(func.max(Task.id)))
+                db.session.remove()
+                db.engine.dispose()
+            print(f'# seeded {count} tasks in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+            for mode in modes:
+                for name, r in MODES[mode](database_url, max_id, args).items():
+                    results[f'{mode}/{count}/{name}'] = r
+                    print(f"{mode:<10}{count:>9}  {name:<20}{r['requests']:>9}{r['errors']:>7}{r['rps']:>10.1f}"
+                          f"{r['p50']:>9.2f}{r['p95']:>9.2f}{r['p99']:>9.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f'Baseline saved to {args.save_baseline}')
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f'{len(regressions)} regression(s) beyond {args.threshold:.0%}:')
+            for line in regressions:
+                print(f'  {line}')
+            sys.exit(1)
+        print('No regressions against the baseline')
+
+
+if __name__ == '__main__':
+    main()
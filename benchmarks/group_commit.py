@@ -0,0 +1,115 @@
+"""
+Write throughput with and without group commit
+
+Starts gunicorn (one worker, so a single writer thread sees every write)
+against a scratch SQLite database, once with GROUP_COMMIT_ENABLED off and
+once on, and drives alternating POST /api/tasks and PUT /api/tasks/<id>
+from 1, 8 and 64 concurrent keep-alive clients. Prints writes/second and
+latency percentiles, and commits per second from the data version.
+
+Usage:
+  python benchmarks/group_commit.py [--clients 1,8,64] [--duration 10]
+  python benchmarks/group_commit.py --synchronous FULL --max-delay-ms 2
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+
+import requests
+
+from load_test import ROOT, SERVERS, percentile, wait_until_ready
+
+
+def drive(base_url, clients, duration):
+    """Run concurrent writing clients for duration seconds and collect latencies"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(worker_id):
+        session = requests.Session()
+        rng = random.Random(worker_id)
+        local, failed, created = [], 0, []
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            if created and rng.random() < 0.5:
+                response = session.put(f'{base_url}/api/tasks/{rng.choice(created)}',
+                                       json={'status': rng.choice(('New', 'In Progress', 'Done'))})
+                failed += response.status_code != 200
+            else:
+                response = session.post(f'{base_url}/api/tasks', json={'title': f'Client {worker_id}'})
+                if response.status_code == 201:
+                    created.append(response.json()['task']['id'])
+                else:
+                    failed += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'writes': len(latencies),
+        'errors': errors[0],
+        'wps': len(latencies) / duration,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run(group_commit, clients, args):
+    """Start one server, load it with clients writers and shut it down"""
+    port = str(args.port)
+    base_url = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PORT=port, DATABASE_URL=f'sqlite:///{tmp}/bench.db', GUNICORN_ACCESS_LOG='/dev/null',
+                   WEB_CONCURRENCY='1', GUNICORN_THREADS=str(max(clients, 4)), METRICS_ENABLED='0',
+                   SQLITE_SYNCHRONOUS=args.synchronous, GROUP_COMMIT_ENABLED='1' if group_commit else '0',
+                   GROUP_COMMIT_MAX_DELAY_MS=str(args.max_delay_ms))
+        process = subprocess.Popen(SERVERS['gunicorn'], cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_ready(base_url)
+            result = drive(base_url, clients, args.duration)
+            version = requests.get(f'{base_url}/api/tasks?limit=1').headers['ETag'].strip('W/"v')
+            result['commits'] = int(version) / args.duration
+            return result
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', default='1,8,64', help='comma-separated numbers of concurrent clients')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per run')
+    parser.add_argument('--synchronous', default='NORMAL', help='SQLITE_SYNCHRONOUS for the server (FULL fsyncs '
+                                                                'every commit)')
+    parser.add_argument('--max-delay-ms', type=float, default=5, help='GROUP_COMMIT_MAX_DELAY_MS')
+    parser.add_argument('--port', type=int, default=5057)
+    args = parser.parse_args()
+
+    print(f"{'group commit':<14}{'clients':>8}{'writes':>9}{'errors':>8}{'writes/s':>10}{'commits/s':>11}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for clients in (int(value) for value in args.clients.split(',')):
+        for group_commit in (False, True):
+            r = run(group_commit, clients, args)
+            print(f"{'on' if group_commit else 'off':<14}{clients:>8}{r['writes']:>9}{r['errors']:>8}"
+                  f"{r['wps']:>10.1f}{r['commits']:>11.1f}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
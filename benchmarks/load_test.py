@@ -0,0 +1,124 @@
+"""
+Compare request throughput of the development server and gunicorn
+
+Starts each server against a scratch SQLite database, seeds it, then drives
+GET /api/tasks and GET /api/tasks/<id> from concurrent keep-alive clients
+and prints requests/second and latency percentiles for both.
+
+Usage: python benchmarks/load_test.py [--clients 16] [--duration 10]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'flask-dev': [sys.executable, 'run.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'run:app'],
+}
+
+
+def wait_until_ready(base_url, timeout=30):
+    """Poll the health endpoint until the server answers"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f'{base_url}/api/health', timeout=1).status_code == 200:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f'Server at {base_url} did not become ready')
+
+
+def percentile(samples, fraction):
+    """Return the given percentile (0..1) of a sorted list"""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+def drive(base_url, task_ids, clients, duration):
+    """Run concurrent clients for duration seconds and collect latencies"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(worker_id):
+        session = requests.Session()
+        local, failed, i = [], 0, worker_id
+        while time.monotonic() < stop_at:
+            i += 1
+            url = f'{base_url}/api/tasks?limit=50' if i % 2 else f'{base_url}/api/tasks/{task_ids[i % len(task_ids)]}'
+            start = time.perf_counter()
+            response = session.get(url)
+            local.append(time.perf_counter() - start)
+            failed += response.status_code != 200
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / duration,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_server(name, command, args):
+    """Start one server, seed it, load it and shut it down"""
+    port = str(args.port)
+    base_url = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PORT=port, DATABASE_URL=f'sqlite:///{tmp}/bench.db',
+                   GUNICORN_ACCESS_LOG='/dev/null')
+        process = subprocess.Popen(command, cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_ready(base_url)
+            operations = [{'op': 'create', 'task': {'title': f'Task {n}', 'description': 'x' * 200}}
+                          for n in range(args.tasks)]
+            results = requests.post(f'{base_url}/api/tasks/batch', json={'operations': operations}).json()
+            task_ids = [result['task']['id'] for result in results['results']]
+            return drive(base_url, task_ids, args.clients, args.duration)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16, help='concurrent keep-alive clients')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per server')
+    parser.add_argument('--tasks', type=int, default=500, help='tasks to seed')
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    print(f"{'server':<12}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, command in SERVERS.items():
+        r = run_server(name, command, args)
+        print(f"{name:<12}{r['requests']:>10}{r['errors']:>8}{r['rps']:>10.1f}"
+              f"{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
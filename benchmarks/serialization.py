@@ -0,0 +1,109 @@
+"""
+Micro-benchmark of the task list serialization paths
+
+Compares rows/second for serializing one page of tasks to a JSON response:
+
+  orm+flask    Task ORM objects, Task.to_dict() and Flask's default JSON
+               provider (the original read path)
+  orm+stdlib   Task ORM objects, Task.to_dict() and the compact standard
+               library provider
+  core+stdlib  Core row tuples with the row serializer, standard library
+  core+orjson  Core row tuples with the row serializer, orjson provider
+
+It also checks that every path decodes to the same data, and that the new
+providers write byte-identical response bodies (Flask's default escapes
+non-ASCII text, so its bytes differ).
+
+Usage: python benchmarks/serialization.py [--rows 20000] [--page 1000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import Task  # noqa: E402
+from app.serialization import (CompactJSONProvider, OrJSONProvider, orjson,  # noqa: E402
+                               task_row_serializer, task_select)
+
+
+def seed(count):
+    """Insert count tasks with realistic field sizes"""
+    statuses = ('New', 'In Progress', 'Done')
+    priorities = ('Low', 'Medium', 'High')
+    rows = [{
+        'title': f'Task {n}: implement feature ✓',
+        'description': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 4,
+        'status': statuses[n % 3],
+        'priority': priorities[n % 3],
+        'assigned_to': f'user{n % 50}@example.com',
+    } for n in range(count)]
+    db.session.execute(insert(Task), rows)
+    db.session.commit()
+
+
+def orm_page(page):
+    return [task.to_dict() for task in Task.query.order_by(Task.id).limit(page)]
+
+
+def core_page(page):
+    dialect = db.engine.dialect.name
+    serialize = task_row_serializer(Task.FIELDS, dialect)
+    rows = db.session.execute(task_select(Task.FIELDS, dialect).order_by(Task.id).limit(page))
+    return [serialize(row) for row in rows]
+
+
+def measure(build, provider, page, seconds):
+    """Return (rows per second, response body) for one serialization path"""
+    rows = 0
+    body = None
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        tasks = build(page)
+        body = provider.response({'success': True, 'count': len(tasks), 'tasks': tasks}).get_data()
+        db.session.expunge_all()
+        rows += len(tasks)
+    return rows / (time.perf_counter() - start), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='tasks to seed')
+    parser.add_argument('--page', type=int, default=1000, help='tasks per response')
+    parser.add_argument('--seconds', type=float, default=3, help='time per path')
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        seed(args.rows)
+        paths = [('orm+flask', orm_page, DefaultJSONProvider(app)),
+                 ('orm+stdlib', orm_page, CompactJSONProvider(app)),
+                 ('core+stdlib', core_page, CompactJSONProvider(app))]
+        if orjson is not None:
+            paths.append(('core+orjson', core_page, OrJSONProvider(app)))
+
+        baseline = None
+        decoded, bodies = [], set()
+        print(f"{'path':<14}{'rows/s':>12}{'speedup':>9}")
+        for name, build, provider in paths:
+            rate, body = measure(build, provider, args.page, args.seconds)
+            baseline = baseline or rate
+            decoded.append(json.loads(body))
+            if isinstance(provider, CompactJSONProvider):
+                bodies.add(body)
+            print(f'{name:<14}{rate:>12,.0f}{rate / baseline:>8.1f}x')
+
+        print('same data:', 'yes' if all(data == decoded[0] for data in decoded) else 'NO')
+        print('byte-identical output (new providers):', 'yes' if len(bodies) == 1 else 'NO')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Gunicorn configuration for serving the Kanban API in production
+
+Usage: gunicorn --config gunicorn.conf.py run:app
+
+Every setting can be overridden from the environment. Send SIGHUP to the
+master to gracefully restart the workers (each finishes its in-flight
+requests first); with GUNICORN_PRELOAD enabled, code changes need SIGUSR2
+instead, which starts a new master alongside the old one.
+"""
+import glob
+import os
+
+# Workers share their Prometheus metrics through files in this directory
+# (see app/metrics.py); it must be set before the app is imported
+METRICS_DIR = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/kanban-metrics')
+os.makedirs(METRICS_DIR, exist_ok=True)
+
+from app.database import env_int  # noqa: E402
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+
+# Pre-forked worker processes, each serving requests from a thread pool.
+# Every open change stream holds a thread, so by default the pool has one
+# per stream (SSE_MAX_SUBSCRIBERS, 16) plus 4 for ordinary requests
+workers = env_int('WEB_CONCURRENCY', 2)
+worker_class = 'gthread'
+threads = env_int('GUNICORN_THREADS', env_int('SSE_MAX_SUBSCRIBERS', 16) + 4)
+
+# Seconds to keep idle client connections open between requests
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+
+# Recycle workers periodically so slow leaks cannot accumulate
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 10000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 1000)
+
+# Load the app once in the master so workers fork with it already imported
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Worker heartbeats go to tmpfs rather than the container's overlay filesystem
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def on_starting(server):
+    """Forget the metrics of a previous run"""
+    for path in glob.glob(os.path.join(METRICS_DIR, '*.db')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    """Drop a dead worker from the in-progress gauge; its counters are kept"""
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master
+
+    Pooled connections must never be shared between processes; dispose the
+    engines without closing the parent's sockets so each worker opens its own.
+    """
+    from app import db
+
+    with server.app.wsgi().app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
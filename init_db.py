@@ -1,12 +1,22 @@
 """
 Initialize database with sample data for testing
 Run this script to populate the database with sample tasks
+
+Usage: python init_db.py [--synthetic N] [--seed S]
+  --synthetic N  also generate N synthetic tasks (see `flask --app run seed`)
 """
 
+import argparse
+
+from sqlalchemy import insert
+
 from app import create_app, db
+from app.changes import bump_version, commit_changes
 from app.models import Task
+from app.migrations import upgrade
+from app.seed import seed_tasks
 
-def init_db():
+def init_db(synthetic=0, seed=0):
     """Initialize database with sample tasks"""
     app = create_app()
     
@@ -16,32 +26,32 @@ def init_db():
         db.drop_all()
         
         print("Creating new tables...")
-        db.create_all()
+        upgrade()
         
         # Sample tasks for Sprint 1
         sprint1_tasks = [
-            Task(
+            dict(
                 title="Set up GitHub repository",
                 description="Create GitHub repository and push initial code",
                 status="Done",
                 priority="High",
                 assigned_to="Development Team"
             ),
-            Task(
+            dict(
                 title="Create project documentation",
                 description="Write README and documentation files",
                 status="Done",
                 priority="High",
                 assigned_to="Development Team"
             ),
-            Task(
+            dict(
                 title="Define user stories",
                 description="Create and prioritize user stories for all sprints",
                 status="Done",
                 priority="High",
                 assigned_to="Product Owner"
             ),
-            Task(
+            dict(
                 title="Set up Kanban board",
                 description="Configure Kanban board with columns and labels",
                 status="Done",
@@ -52,28 +62,28 @@ def init_db():
         
         # Sample tasks for Sprint 2
         sprint2_tasks = [
-            Task(
+            dict(
                 title="Implement REST API endpoints",
                 description="Create GET, POST, PUT, DELETE endpoints for tasks",
                 status="Done",
                 priority="High",
                 assigned_to="Backend Developer"
             ),
-            Task(
+            dict(
                 title="Add task filtering",
                 description="Implement status-based filtering for tasks",
                 status="Done",
                 priority="Medium",
                 assigned_to="Backend Developer"
             ),
-            Task(
+            dict(
                 title="Write unit tests",
                 description="Create comprehensive unit tests for all API endpoints",
                 status="In Progress",
                 priority="High",
                 assigned_to="QA Engineer"
             ),
-            Task(
+            dict(
                 title="Set up CI/CD pipeline",
                 description="Configure GitHub Actions for automated testing",
                 status="In Progress",
@@ -84,28 +94,28 @@ def init_db():
         
         # Sample tasks for Sprint 3
         sprint3_tasks = [
-            Task(
+            dict(
                 title="Create Dockerfile",
                 description="Write Dockerfile for containerizing the application",
                 status="New",
                 priority="High",
                 assigned_to="DevOps Engineer"
             ),
-            Task(
+            dict(
                 title="Build Docker image",
                 description="Build and test Docker image locally",
                 status="New",
                 priority="High",
                 assigned_to="DevOps Engineer"
             ),
-            Task(
+            dict(
                 title="Deploy to production",
                 description="Deploy application to hosting platform",
                 status="New",
                 priority="Medium",
                 assigned_to="DevOps Engineer"
             ),
-            Task(
+            dict(
                 title="Configure monitoring",
                 description="Set up application monitoring and health checks",
                 status="New",
@@ -114,28 +124,36 @@ def init_db():
             ),
         ]
         
-        # Add all tasks to database
+        # Add all tasks to database in one statement
         print("\nAdding sample tasks...")
         all_tasks = sprint1_tasks + sprint2_tasks + sprint3_tasks
         
+        version = bump_version()
+        db.session.execute(insert(Task), [dict(task, change_seq=version) for task in all_tasks])
         for task in all_tasks:
-            db.session.add(task)
-            print(f"  - Added: {task.title} [{task.status}]")
+            print(f"  - Added: {task['title']} [{task['status']}]")
         
         # Commit changes
-        db.session.commit()
+        commit_changes([{'op': 'reloaded', 'id': None, 'task': None, 'before': None}], version)
+        
+        if synthetic:
+            print(f"\nGenerating {synthetic} synthetic tasks...")
+            seed_tasks(synthetic, seed=seed)
         
         # Display summary
         print("\n" + "="*60)
         print("Database initialized successfully!")
         print("="*60)
-        print(f"\nTotal tasks created: {len(all_tasks)}")
-        print(f"  - Done: {len([t for t in all_tasks if t.status == 'Done'])}")
-        print(f"  - In Progress: {len([t for t in all_tasks if t.status == 'In Progress'])}")
-        print(f"  - New: {len([t for t in all_tasks if t.status == 'New'])}")
+        print(f"\nTotal tasks created: {len(all_tasks) + synthetic}")
+        for status in ('Done', 'In Progress', 'New'):
+            print(f"  - {status}: {Task.query.filter_by(status=status).count()}")
         print("\nRun 'python run.py' to start the application")
         print("Then visit http://localhost:5000/api/tasks to see the tasks")
         print("="*60 + "\n")
 
 if __name__ == '__main__':
-    init_db()
+    parser = argparse.ArgumentParser(description='Initialize the database with sample tasks')
+    parser.add_argument('--synthetic', type=int, default=0, help='also generate this many synthetic tasks')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the synthetic tasks')
+    args = parser.parse_args()
+    init_db(args.synthetic, args.seed)
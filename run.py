@@ -1,6 +1,8 @@
+import os
 from app import create_app
 
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=False, host='0.0.0.0', port=5000)
+    # Development server only; production serves through gunicorn.conf.py
+    app.run(debug=False, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
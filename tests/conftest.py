@@ -0,0 +1,20 @@
+"""Shared test fixtures"""
+import pytest
+from app import create_app, db
+
+@pytest.fixture
+def app():
+    """Create application for testing"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
+    })
+    
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    """Create test client"""
+    return app.test_client()
@@ -1,24 +1,10 @@
+import json
 import pytest
-from app import create_app, db
+from sqlalchemy import event, text
+from app import db
 from app.models import Task
-
-@pytest.fixture
-def app():
-    """Create application for testing"""
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    
-    with app.app_context():
-        db.create_all()
-        yield app
-        db.session.remove()
-        db.drop_all()
-
-@pytest.fixture
-def client(app):
-    """Create test client"""
-    return app.test_client()
+from app.pagination import encode_cursor
+from app.schema import ensure_schema
 
 @pytest.fixture
 def runner(app):
@@ -155,3 +141,415 @@ def test_filter_tasks_by_status(client):
     data = response.get_json()
     assert data['count'] == 2
     assert all(task['status'] == 'New' for task in data['tasks'])
+
+def test_get_tasks_pagination(client):
+    """Test walking the task list with limit and cursor"""
+    for i in range(5):
+        client.post('/api/tasks', json={'title': f'Task {i}'})
+    
+    titles = []
+    cursor = None
+    pages = 0
+    while True:
+        url = '/api/tasks?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url).get_json()
+        assert data['count'] <= 2
+        titles.extend(task['title'] for task in data['tasks'])
+        pages += 1
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+    
+    assert pages == 3
+    assert titles == [f'Task {i}' for i in range(5)]
+
+def test_get_tasks_invalid_pagination(client):
+    """Test that malformed limit and cursor values are rejected"""
+    assert client.get('/api/tasks?limit=abc').status_code == 400
+    assert client.get('/api/tasks?limit=0').status_code == 400
+    assert client.get('/api/tasks?cursor=not-a-cursor').status_code == 400
+
+def test_get_tasks_out_of_range_cursor(client):
+    """Test cursors holding booleans or keys beyond 64 bits are rejected"""
+    for value in (True, 2 ** 63, -2 ** 63 - 1):
+        assert client.get(f'/api/tasks?cursor={encode_cursor(value)}').status_code == 400
+    assert client.get(f'/api/tasks?cursor={encode_cursor(2 ** 63 - 1)}').status_code == 200
+
+def _query_plan(query):
+    """Return the SQLite EXPLAIN QUERY PLAN details for an ORM query"""
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    rows = db.session.execute(text('EXPLAIN QUERY PLAN ' + sql)).all()
+    return [row[-1] for row in rows]
+
+def test_filtered_list_query_uses_index(app):
+    """Test that the status-filtered list query is an index search, not a table scan"""
+    query = Task.query.filter_by(status='New').filter(Task.id > 10).order_by(Task.id).limit(101)
+    plan = _query_plan(query)
+    
+    assert any('USING' in detail and 'INDEX' in detail for detail in plan), plan
+    assert not any(detail.startswith('SCAN tasks') for detail in plan), plan
+
+def test_ensure_schema_adds_missing_indexes(app):
+    """Test that indexes are created for a database that predates them"""
+    db.session.execute(text('DROP INDEX ix_tasks_status_priority'))
+    db.session.commit()
+    
+    ensure_schema()
+    
+    names = {row[0] for row in db.session.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+    assert {'ix_tasks_status', 'ix_tasks_status_priority', 'ix_tasks_assigned_to',
+            'ix_tasks_status_updated_at_id'} <= names
+
+def test_batch_tasks(client):
+    """Test applying creates, updates and deletes in one batch"""
+    keep_id = client.post('/api/tasks', json={'title': 'Keep'}).get_json()['task']['id']
+    drop_id = client.post('/api/tasks', json={'title': 'Drop'}).get_json()['task']['id']
+    
+    response = client.post('/api/tasks/batch', json={'operations': [
+        {'op': 'create', 'task': {'title': 'Batch 1', 'priority': 'High'}},
+        {'op': 'create', 'task': {'title': 'Batch 2'}},
+        {'op': 'update', 'id': keep_id, 'task': {'status': 'Done'}},
+        {'op': 'delete', 'id': drop_id}
+    ]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['success'] is True
+    assert data['succeeded'] == 4
+    assert [r['op'] for r in data['results']] == ['create', 'create', 'update', 'delete']
+    assert data['results'][0]['task']['priority'] == 'High'
+    assert data['results'][2]['task']['status'] == 'Done'
+    
+    titles = {task['title'] for task in client.get('/api/tasks').get_json()['tasks']}
+    assert titles == {'Keep', 'Batch 1', 'Batch 2'}
+
+def test_batch_tasks_partial_failure(client):
+    """Test that invalid batch operations are reported without blocking the rest"""
+    response = client.post('/api/tasks/batch', json={'operations': [
+        {'op': 'create', 'task': {'title': 'Valid'}},
+        {'op': 'create', 'task': {'description': 'No title'}},
+        {'op': 'update', 'id': 9999, 'task': {'status': 'Done'}},
+        {'op': 'archive', 'id': 1}
+    ]})
+    assert response.status_code == 207
+    data = response.get_json()
+    assert data['succeeded'] == 1
+    assert data['failed'] == 3
+    assert [r['success'] for r in data['results']] == [True, False, False, False]
+    assert [r.get('status') for r in data['results']] == [None, 400, 404, 400]
+    assert client.get('/api/tasks').get_json()['count'] == 1
+
+def test_batch_tasks_rejects_bad_titles_and_ids(client):
+    """Test null or empty titles and boolean or out-of-range ids fail per item instead of failing the batch"""
+    client.post('/api/tasks', json={'title': 'First'})
+    # Sent as text: ids beyond 64 bits cannot be encoded by every JSON provider
+    body = json.dumps({'operations': [
+        {'op': 'create', 'task': {'title': None}},
+        {'op': 'create', 'task': {'title': '  '}},
+        {'op': 'update', 'id': 1, 'task': {'title': None}},
+        {'op': 'update', 'id': True, 'task': {'title': 'Hijacked'}},
+        {'op': 'delete', 'id': True},
+        {'op': 'update', 'id': 2 ** 63, 'task': {'title': 'Overflow'}},
+        {'op': 'delete', 'id': -2 ** 63 - 1},
+        {'op': 'create', 'task': {'title': 'Valid'}}
+    ]})
+    response = client.post('/api/tasks/batch', data=body, content_type='application/json')
+    assert response.status_code == 207
+    data = response.get_json()
+    assert [r['success'] for r in data['results']] == [False] * 7 + [True]
+    assert [r['status'] for r in data['results'][3:7]] == [400] * 4
+    assert [r['error'] for r in data['results'][3:7]] == ['id must be a 64-bit integer'] * 4
+    assert client.get('/api/tasks/1').get_json()['task']['title'] == 'First'
+
+def test_batch_tasks_requires_operations(client):
+    """Test that a batch without operations is rejected"""
+    assert client.post('/api/tasks/batch', json={}).status_code == 400
+    assert client.post('/api/tasks/batch', json={'operations': []}).status_code == 400
+
+def test_get_board(client):
+    """Test the board snapshot groups tasks by column with counts"""
+    client.post('/api/tasks', json={'title': 'A', 'status': 'New', 'priority': 'High'})
+    client.post('/api/tasks', json={'title': 'B', 'status': 'New', 'priority': 'Low'})
+    client.post('/api/tasks', json={'title': 'C', 'status': 'New', 'priority': 'High'})
+    client.post('/api/tasks', json={'title': 'D', 'status': 'Done'})
+    
+    response = client.get('/api/board?limit=2')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['total'] == 4
+    
+    columns = {column['status']: column for column in data['columns']}
+    assert list(columns) == ['New', 'In Progress', 'Done']
+    assert columns['New']['count'] == 3
+    assert columns['New']['priority_counts'] == {'High': 2, 'Low': 1}
+    assert [task['title'] for task in columns['New']['tasks']] == ['A', 'B']
+    assert columns['In Progress']['tasks'] == []
+    assert columns['Done']['next_cursor'] is None
+    
+    # The column cursor continues through the filtered task list
+    rest = client.get(f"/api/tasks?status=New&cursor={columns['New']['next_cursor']}").get_json()
+    assert [task['title'] for task in rest['tasks']] == ['C']
+
+def test_conditional_get_tasks(client):
+    """Test ETag / If-None-Match on the task list"""
+    client.post('/api/tasks', json={'title': 'Cached'})
+    
+    response = client.get('/api/tasks')
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    
+    not_modified = client.get('/api/tasks', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+    assert not_modified.headers['ETag'] == etag
+    
+    # Any write bumps the version and invalidates the ETag
+    client.post('/api/tasks', json={'title': 'Another'})
+    changed = client.get('/api/tasks', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['count'] == 2
+
+def test_conditional_get_task(client):
+    """Test ETag / If-None-Match on a single task"""
+    task_id = client.post('/api/tasks', json={'title': 'Detail'}).get_json()['task']['id']
+    
+    etag = client.get(f'/api/tasks/{task_id}').headers['ETag']
+    assert client.get(f'/api/tasks/{task_id}', headers={'If-None-Match': etag}).status_code == 304
+    
+    client.put(f'/api/tasks/{task_id}', json={'status': 'Done'})
+    response = client.get(f'/api/tasks/{task_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['task']['status'] == 'Done'
+    
+    # Errors are never tagged
+    assert 'ETag' not in client.get('/api/tasks/9999').headers
+
+def test_task_list_cache(app, client):
+    """Test list responses are cached and invalidated by writes"""
+    client.post('/api/tasks', json={'title': 'New task', 'status': 'New'})
+    client.post('/api/tasks', json={'title': 'Done task', 'status': 'Done'})
+    
+    assert client.get('/api/tasks?status=Done').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/tasks?status=Done').headers['X-Cache'] == 'HIT'
+    assert client.get('/api/tasks?status=New').headers['X-Cache'] == 'MISS'
+    
+    # Moving a task between New and In Progress leaves the Done list cached
+    task_id = client.get('/api/tasks?status=New').get_json()['tasks'][0]['id']
+    client.put(f'/api/tasks/{task_id}', json={'status': 'In Progress'})
+    
+    assert client.get('/api/tasks?status=Done').headers['X-Cache'] == 'HIT'
+    response = client.get('/api/tasks?status=New')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['count'] == 0
+    
+    stats = app.extensions['task_cache'].stats()
+    assert stats['hits'] == 3
+    assert stats['invalidations'] >= 1
+
+def test_search_tasks(client):
+    """Test full-text search ranks, highlights and paginates results"""
+    client.post('/api/tasks', json={'title': 'Fix login bug', 'description': 'Users cannot sign in'})
+    client.post('/api/tasks', json={'title': 'Write docs', 'description': 'Document the login flow'})
+    client.post('/api/tasks', json={'title': 'Deploy', 'description': 'Ship it'})
+    
+    response = client.get('/api/tasks/search?q=login')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['count'] == 2
+    # Title matches rank above description matches
+    assert data['tasks'][0]['title'] == 'Fix login bug'
+    assert data['tasks'][0]['highlights']['title'] == 'Fix <mark>login</mark> bug'
+    assert '<mark>login</mark>' in data['tasks'][1]['highlights']['description']
+    
+    first = client.get('/api/tasks/search?q=login&limit=1').get_json()
+    second = client.get(f"/api/tasks/search?q=login&limit=1&cursor={first['next_cursor']}").get_json()
+    assert [first['tasks'][0]['title'], second['tasks'][0]['title']] == ['Fix login bug', 'Write docs']
+    assert second['next_cursor'] is None
+
+def test_search_tracks_writes(client):
+    """Test the search index follows updates and deletes"""
+    task_id = client.post('/api/tasks', json={'title': 'Alpha'}).get_json()['task']['id']
+    client.put(f'/api/tasks/{task_id}', json={'title': 'Bravo'})
+    
+    assert client.get('/api/tasks/search?q=alpha').get_json()['count'] == 0
+    assert client.get('/api/tasks/search?q=bra*').get_json()['count'] == 1
+    
+    client.delete(f'/api/tasks/{task_id}')
+    assert client.get('/api/tasks/search?q=bravo').get_json()['count'] == 0
+
+def test_search_availability_is_cached(client):
+    """Test the FTS5 capability check runs once per engine, not on every search"""
+    client.get('/api/tasks/search?q=warmup')
+    statements = []
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        client.get('/api/tasks/search?q=login')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    assert statements and not any('sqlite_compileoption_used' in statement for statement in statements)
+
+def test_search_requires_query(client):
+    """Test search rejects queries without words"""
+    assert client.get('/api/tasks/search').status_code == 400
+    assert client.get('/api/tasks/search?q="*').status_code == 400
+
+def test_search_invalid_cursor(client):
+    """Test crafted search cursors are rejected with 400"""
+    client.post('/api/tasks', json={'title': 'Findable'})
+    for values in ((-1.0, True), (-1.0, 2 ** 63), (True, 1), (float('nan'), 1), ('x', 1)):
+        response = client.get(f'/api/tasks/search?q=findable&cursor={encode_cursor(*values)}')
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Invalid cursor'
+
+def test_get_tasks_sparse_fields(client):
+    """Test ?fields= returns only the requested fields"""
+    task_id = client.post('/api/tasks', json={
+        'title': 'Card', 'description': 'Long text', 'priority': 'High'
+    }).get_json()['task']['id']
+    
+    data = client.get('/api/tasks?fields=title,id,priority').get_json()
+    assert data['tasks'] == [{'id': task_id, 'title': 'Card', 'priority': 'High'}]
+    
+    board = client.get('/api/board?fields=id,title').get_json()
+    assert board['columns'][0]['tasks'] == [{'id': task_id, 'title': 'Card'}]
+    
+    assert client.get('/api/tasks?fields=title,secret').status_code == 400
+
+def test_sparse_fields_skip_large_columns(app):
+    """Test the projected list query does not select the description column"""
+    from app.serialization import task_select
+    sql = str(task_select(('id', 'title', 'status')).compile(db.engine))
+    assert 'tasks.title' in sql
+    assert 'tasks.description' not in sql
+
+def test_export_import_round_trip(app, client):
+    """Test exported NDJSON can be imported back unchanged"""
+    client.post('/api/tasks', json={'title': 'One', 'status': 'Done', 'priority': 'High'})
+    client.post('/api/tasks', json={'title': 'Two', 'description': 'Second'})
+    
+    response = client.get('/api/tasks/export')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    body = response.get_data()
+    lines = body.decode().splitlines()
+    assert len(lines) == 2
+    
+    exported = client.get('/api/tasks').get_json()['tasks']
+    db.session.execute(Task.__table__.delete())
+    db.session.commit()
+    
+    response = client.post('/api/tasks/import', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 201
+    assert response.get_json()['imported'] == 2
+    assert client.get('/api/tasks').get_json()['tasks'] == exported
+
+def test_import_is_all_or_nothing(client):
+    """Test an invalid line rejects the whole import"""
+    body = b'{"title": "Good"}\n\n{"description": "No title"}\n'
+    
+    response = client.post('/api/tasks/import', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Line 3')
+    assert client.get('/api/tasks').get_json()['count'] == 0
+
+def test_import_rejects_bad_titles_and_ids(client):
+    """Test invalid titles and ids answer 400 with their line, and nothing is imported"""
+    cases = [
+        (b'{"title": null}\n', 'Line 1: Title must be a non-empty string'),
+        (b'{"title": 5}\n', 'Line 1: Title must be a non-empty string'),
+        (b'{"title": "Ok"}\n{"title": "Bool", "id": true}\n', 'Line 2: id must be a 64-bit integer'),
+        (b'{"title": "Big", "id": 9223372036854775808}\n', 'Line 1: id must be a 64-bit integer'),
+    ]
+    for body, error in cases:
+        response = client.post('/api/tasks/import', data=body, content_type='application/x-ndjson')
+        assert response.status_code == 400
+        assert response.get_json()['error'] == error
+    assert client.get('/api/tasks').get_json()['count'] == 0
+
+def test_import_rejects_duplicate_ids(app, client):
+    """Test ids already in use, or repeated in the input, answer 409 and import nothing"""
+    client.post('/api/tasks', json={'title': 'Existing'})
+    app.config['IMPORT_CHUNK_SIZE'] = 2
+    
+    body = b'{"title": "A", "id": 5}\n{"title": "B", "id": 6}\n{"title": "C", "id": 5}\n'
+    response = client.post('/api/tasks/import', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 409
+    assert response.get_json()['error'] == 'Line 3: id 5 repeats line 1'
+    
+    body = b'{"title": "A", "id": 7}\n{"title": "B", "id": 8}\n{"title": "C", "id": 1}\n'
+    response = client.post('/api/tasks/import', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 409
+    assert response.get_json()['error'] == 'Line 3: task 1 already exists'
+    assert [task['title'] for task in client.get('/api/tasks').get_json()['tasks']] == ['Existing']
+
+def test_delta_sync(client):
+    """Test the changes feed returns only what changed since the token, with tombstones"""
+    first = client.post('/api/tasks', json={'title': 'First'}).get_json()['task']['id']
+    second = client.post('/api/tasks', json={'title': 'Second'}).get_json()['task']['id']
+    
+    initial = client.get('/api/tasks/changes').get_json()
+    assert [task['title'] for task in initial['tasks']] == ['First', 'Second']
+    assert initial['deleted'] == []
+    assert initial['has_more'] is False
+    
+    client.put(f'/api/tasks/{first}', json={'status': 'Done'})
+    client.delete(f'/api/tasks/{second}')
+    client.post('/api/tasks', json={'title': 'Third'})
+    
+    delta = client.get(f"/api/tasks/changes?since={initial['next_token']}").get_json()
+    assert [task['title'] for task in delta['tasks']] == ['First', 'Third']
+    assert delta['tasks'][0]['status'] == 'Done'
+    assert delta['deleted'] == [second]
+    
+    empty = client.get(f"/api/tasks/changes?since={delta['next_token']}").get_json()
+    assert empty['tasks'] == [] and empty['deleted'] == []
+
+def test_delta_sync_pages(client):
+    """Test large deltas are paged with has_more"""
+    client.post('/api/tasks/batch', json={'operations': [
+        {'op': 'create', 'task': {'title': f'Task {n}'}} for n in range(5)
+    ]})
+    
+    titles = []
+    token = None
+    while True:
+        url = '/api/tasks/changes?limit=2' + (f'&since={token}' if token else '')
+        page = client.get(url).get_json()
+        titles.extend(task['title'] for task in page['tasks'])
+        token = page['next_token']
+        if not page['has_more']:
+            break
+    assert titles == [f'Task {n}' for n in range(5)]
+
+def test_delta_sync_expired_token(app, client, runner):
+    """Test tokens older than compacted tombstones are rejected with 410"""
+    task_id = client.post('/api/tasks', json={'title': 'Gone'}).get_json()['task']['id']
+    token = client.get('/api/tasks/changes').get_json()['next_token']
+    client.delete(f'/api/tasks/{task_id}')
+    
+    result = runner.invoke(args=['compact-tombstones', '--days', '0'])
+    assert 'Removed 1 tombstones' in result.output
+    
+    assert client.get(f'/api/tasks/changes?since={token}').status_code == 410
+    assert client.get('/api/tasks/changes').status_code == 200
+
+def test_delta_sync_invalid_token(client):
+    """Test sync tokens with booleans or ids beyond 64 bits are rejected with 400"""
+    for values in ((True, 0), (2 ** 63, 0), (0, False), (0, -2 ** 63 - 1), ('1', 0)):
+        response = client.get(f'/api/tasks/changes?since={encode_cursor(*values)}')
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Invalid sync token'
+
+def test_ensure_schema_adds_missing_columns(app):
+    """Test columns declared after a table was created are added to it"""
+    db.session.execute(text('DROP INDEX ix_tasks_change_seq_id'))
+    db.session.execute(text('ALTER TABLE tasks DROP COLUMN change_seq'))
+    db.session.execute(text("INSERT INTO tasks (title) VALUES ('Old')"))
+    db.session.commit()
+    
+    ensure_schema()
+    
+    assert db.session.execute(text('SELECT change_seq FROM tasks')).scalar() == 0
@@ -0,0 +1,69 @@
+"""Tests for the task list response cache"""
+from app.cache import ResponseCache
+
+class FakeClock:
+    """Manually advanced clock for TTL tests"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def test_cache_hit_and_miss():
+    """Test cached values are served only at the version they were built from"""
+    cache = ResponseCache(max_entries=4, ttl=10)
+    assert cache.get('a', 1) is None
+    
+    cache.set('a', b'body', 1)
+    assert cache.get('a', 1) == b'body'
+    assert cache.get('a', 2) is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+def test_cache_lru_eviction():
+    """Test the least recently used entry is evicted when full"""
+    cache = ResponseCache(max_entries=2, ttl=10)
+    cache.set('a', b'a', 1)
+    cache.set('b', b'b', 1)
+    cache.get('a', 1)
+    cache.set('c', b'c', 1)
+    
+    assert cache.get('b', 1) is None
+    assert cache.get('a', 1) == b'a'
+    assert cache.get('c', 1) == b'c'
+    assert cache.stats()['evictions'] == 1
+
+def test_cache_ttl_expiry():
+    """Test entries expire after the TTL"""
+    clock = FakeClock()
+    cache = ResponseCache(max_entries=4, ttl=5, clock=clock)
+    cache.set('a', b'a', 1)
+    
+    clock.now = 4.9
+    assert cache.get('a', 1) == b'a'
+    clock.now = 5.0
+    assert cache.get('a', 1) is None
+
+def test_cache_precise_invalidation():
+    """Test a write drops only entries for the statuses it touched"""
+    cache = ResponseCache(max_entries=8, ttl=10)
+    cache.set('all', b'all', 1, tag=None)
+    cache.set('new', b'new', 1, tag='New')
+    cache.set('done', b'done', 1, tag='Done')
+    
+    cache.invalidate(2, {'New'})
+    
+    assert cache.get('all', 2) is None
+    assert cache.get('new', 2) is None
+    assert cache.get('done', 2) == b'done'
+
+def test_cache_invalidation_after_missed_write():
+    """Test entries are not carried forward across a write made elsewhere"""
+    cache = ResponseCache(max_entries=8, ttl=10)
+    cache.set('done', b'done', 1, tag='Done')
+    
+    # Version 2 was written by another process; this process commits version 3
+    cache.invalidate(3, {'New'})
+    
+    assert cache.get('done', 3) is None
@@ -0,0 +1,86 @@
+"""Tests for negotiated response compression"""
+import gzip
+import json
+import zlib
+import pytest
+from app import create_app
+from app.compression import brotli
+
+def _seed(client, count=50):
+    operations = [{'op': 'create', 'task': {'title': f'Task {n}', 'description': 'x' * 100}}
+                  for n in range(count)]
+    client.post('/api/tasks/batch', json={'operations': operations})
+
+def test_gzip_large_response(client):
+    """Test large JSON responses are gzipped when the client accepts gzip"""
+    _seed(client)
+    plain = client.get('/api/tasks')
+    response = client.get('/api/tasks', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert int(response.headers['Content-Length']) < len(plain.data)
+    assert gzip.decompress(response.data) == plain.data
+    assert 'Content-Encoding' not in plain.headers
+
+def test_small_response_not_compressed(client):
+    """Test responses under COMPRESS_MIN_SIZE are sent as is"""
+    response = client.get('/api/health', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json()['status'] == 'healthy'
+
+def test_encoding_negotiation(client):
+    """Test q-values pick the encoding and identity is used when nothing matches"""
+    _seed(client)
+    response = client.get('/api/tasks', headers={'Accept-Encoding': 'gzip;q=0, deflate'})
+    assert 'Content-Encoding' not in response.headers
+
+    response = client.get('/api/tasks', headers={'Accept-Encoding': 'br;q=0.5, gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+@pytest.mark.skipif(brotli is None, reason='brotli is not installed')
+def test_brotli_preferred(client):
+    """Test brotli is used when the client accepts it"""
+    _seed(client)
+    plain = client.get('/api/tasks')
+    response = client.get('/api/tasks', headers={'Accept-Encoding': 'gzip, deflate, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == plain.data
+
+def test_streamed_export_compressed_incrementally(app, client):
+    """Test a streamed export is compressed chunk by chunk without buffering"""
+    app.config['EXPORT_CHUNK_SIZE'] = 10
+    _seed(client)
+    response = client.get('/api/tasks/export', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+
+    # Every chunk decompresses on arrival, before the stream has ended
+    decompressor = zlib.decompressobj(31)
+    lines = []
+    for chunk in response.response:
+        data = decompressor.decompress(chunk)
+        assert data.endswith(b'\n') or data == b''
+        lines.extend(data.splitlines())
+    response.close()
+
+    assert len(lines) == 50
+    assert json.loads(lines[0])['title'] == 'Task 0'
+
+def test_etag_revalidation_with_compression(client):
+    """Test compressed responses carry a weak ETag that still revalidates"""
+    _seed(client)
+    response = client.get('/api/tasks', headers={'Accept-Encoding': 'gzip'})
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+
+    response = client.get('/api/tasks', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert 'Content-Encoding' not in response.headers
+
+def test_compression_disabled():
+    """Test COMPRESS_ENABLED=False turns compression off"""
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                      'COMPRESS_ENABLED': False, 'COMPRESS_MIN_SIZE': 0})
+    response = app.test_client().get('/api/', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
@@ -0,0 +1,59 @@
+"""Tests for database engine configuration"""
+import sqlite3
+import pytest
+from sqlalchemy import text
+from app import create_app, db
+
+@pytest.fixture
+def file_app(tmp_path, monkeypatch):
+    """Create an application backed by a SQLite file with a short busy timeout"""
+    monkeypatch.setenv('SQLITE_BUSY_TIMEOUT_MS', '200')
+    path = tmp_path / 'kanban.db'
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+    })
+    
+    with app.app_context():
+        yield app, path
+        db.session.remove()
+        db.engine.dispose()
+
+def test_sqlite_pragmas_applied(file_app):
+    """Test WAL and the other connect-time pragmas are set"""
+    app, _ = file_app
+    with db.engine.connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 200
+        assert conn.execute(text('PRAGMA cache_size')).scalar() == -16000
+
+def test_reads_proceed_during_write(file_app):
+    """Test readers are not blocked by an open exclusive write transaction"""
+    app, path = file_app
+    client = app.test_client()
+    client.post('/api/tasks', json={'title': 'Committed'})
+    
+    writer = sqlite3.connect(path, timeout=0, isolation_level=None)
+    try:
+        writer.execute('BEGIN EXCLUSIVE')
+        writer.execute("INSERT INTO tasks (title, status) VALUES ('Uncommitted', 'New')")
+        
+        # With a rollback journal this read would fail with "database is locked"
+        response = client.get('/api/tasks')
+        assert response.status_code == 200
+        assert [task['title'] for task in response.get_json()['tasks']] == ['Committed']
+    finally:
+        writer.execute('ROLLBACK')
+        writer.close()
+
+def test_engine_options_from_environment(monkeypatch):
+    """Test pool settings for server databases come from the environment"""
+    monkeypatch.setenv('DB_POOL_SIZE', '20')
+    monkeypatch.setenv('DB_POOL_RECYCLE', '600')
+    
+    from app.database import engine_options
+    options = engine_options('postgresql://kanban@db/kanban')
+    assert options['pool_size'] == 20
+    assert options['pool_recycle'] == 600
+    assert engine_options('sqlite:///kanban.db') == {}
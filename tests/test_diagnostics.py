@@ -0,0 +1,79 @@
+"""Tests for the opt-in request diagnostics"""
+import logging
+import pytest
+from flask import jsonify
+from app import create_app, db
+from app.diagnostics import statement_shape
+from app.models import Task
+
+@pytest.fixture
+def app():
+    """Create application for testing, with diagnostics on"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'DIAGNOSTICS_ENABLED': True,
+        'SLOW_QUERY_MS': 10000
+    })
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    """Create test client"""
+    return app.test_client()
+
+def _server_timing(response):
+    """Parse Server-Timing into {name: (duration, description)}"""
+    metrics = {}
+    for entry in response.headers['Server-Timing'].split(', '):
+        name, *params = entry.split(';')
+        params = dict(param.split('=', 1) for param in params)
+        metrics[name] = (float(params['dur']), params.get('desc', '').strip('"'))
+    return metrics
+
+def test_statement_shape():
+    """Test statements differing only in literals and IN-list length share a shape"""
+    assert statement_shape('SELECT * FROM tasks WHERE id IN (?, ?, ?)') == \
+        statement_shape('SELECT * FROM tasks\n WHERE id IN (?)')
+    assert statement_shape("SELECT * FROM tasks WHERE id = 5 AND title = 'it''s'") == \
+        'SELECT * FROM tasks WHERE id = ? AND title = ?'
+
+def test_server_timing(client):
+    """Test api responses split db, serialize and total time"""
+    client.post('/api/tasks', json={'title': 'Timed'})
+    timing = _server_timing(client.get('/api/tasks'))
+
+    assert timing['db'][1] == '2 queries'
+    assert timing['db'][0] > 0
+    assert timing['serialize'][0] > 0
+    assert timing['total'][0] >= timing['db'][0] + timing['serialize'][0]
+
+def test_slow_query_logged_with_plan(app, client, caplog):
+    """Test statements over SLOW_QUERY_MS are logged with their query plan"""
+    app.config['SLOW_QUERY_MS'] = 0
+    with caplog.at_level(logging.WARNING):
+        client.get('/api/tasks?status=Done')
+
+    slow = [record.getMessage() for record in caplog.records if 'Slow query' in record.getMessage()]
+    assert any('FROM tasks' in message and 'USING INDEX ix_tasks_status' in message for message in slow)
+
+def test_n_plus_one_detected(app, client, caplog):
+    """Test a request repeating one statement shape is flagged"""
+    def one_query_per_task():
+        return jsonify([db.session.get(Task, task_id) is None for task_id in range(1, 8)])
+    app.add_url_rule('/n-plus-one', view_func=one_query_per_task)
+
+    with caplog.at_level(logging.WARNING):
+        client.get('/n-plus-one')
+        client.get('/api/tasks')
+
+    flagged = [record.getMessage() for record in caplog.records if 'N+1' in record.getMessage()]
+    assert len(flagged) == 1
+    assert 'GET /n-plus-one: ran 7 times: SELECT' in flagged[0]
+
+def test_diagnostics_off_by_default():
+    """Test no Server-Timing header is added unless diagnostics are enabled"""
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    assert 'Server-Timing' not in app.test_client().get('/api/tasks').headers
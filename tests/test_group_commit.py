@@ -0,0 +1,126 @@
+"""Tests for group commit of concurrent task writes"""
+import threading
+import pytest
+from concurrent import futures
+from app import create_app, db
+from app import group_commit
+from app.changes import current_version
+from app.group_commit import GroupCommitter, apply_write
+from app.models import Task
+
+@pytest.fixture
+def app(tmp_path):
+    """Create application for testing, with group commit and a long latency budget"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "kanban.db"}',
+        'SHARD_DIRS': [str(tmp_path / 'shards')],
+        'GROUP_COMMIT_ENABLED': True,
+        'GROUP_COMMIT_MAX_DELAY_MS': 200,
+        'GROUP_COMMIT_MAX_BATCH': 8
+    })
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+def test_writes_through_group_commit(app):
+    """Test creates and updates keep their responses and errors"""
+    client = app.test_client()
+    response = client.post('/api/tasks', json={'title': 'Grouped'})
+    assert response.status_code == 201
+    task_id = response.get_json()['task']['id']
+
+    response = client.put(f'/api/tasks/{task_id}', json={'status': 'Done'})
+    assert response.get_json()['task']['status'] == 'Done'
+    assert client.put('/api/tasks/999', json={'status': 'Done'}).status_code == 404
+    assert client.post('/api/tasks', json={}).status_code == 400
+
+    history = client.get(f'/api/tasks/{task_id}/history').get_json()['events']
+    assert [(e['op'], e['field'], e['to']) for e in history][-1] == ('updated', 'status', 'Done')
+    assert app.extensions['group_commit'].writes == 3
+
+def test_concurrent_writes_share_a_commit(app):
+    """Test concurrent writes are committed together at one data version"""
+    committer = app.extensions['group_commit']
+    # A lone write commits at once; the writer then waits for company
+    app.test_client().post('/api/tasks', json={'title': 'Warm up'})
+    committer.busy = True
+
+    statuses = []
+    def create(index):
+        statuses.append(app.test_client().post('/api/tasks', json={'title': f'Task {index}'}).status_code)
+    threads = [threading.Thread(target=create, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [201] * 8
+    assert committer.groups <= 3
+    assert Task.query.count() == 9
+    assert current_version() == committer.groups
+
+def test_failed_write_does_not_sink_the_group(app):
+    """Test a write that raises is rolled back alone and reported to its caller"""
+    committer = GroupCommitter(max_delay=0.2, max_batch=2)
+    committer.busy = True
+
+    def fail():
+        db.session.add(Task(title=None))
+        db.session.flush()
+
+    results = {}
+    def run(name, write, *args):
+        with app.app_context():
+            try:
+                results[name] = committer.submit(app, write, *args)[1]
+            except Exception as e:
+                results[name] = type(e).__name__
+
+    from app.routes import _create_task
+    threads = [threading.Thread(target=run, args=('ok', _create_task, {'title': 'Kept'})),
+               threading.Thread(target=run, args=('bad', fail))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {'ok': 201, 'bad': 'IntegrityError'}
+    assert [task.title for task in Task.query] == ['Kept']
+    assert committer.groups == 1
+
+def test_timed_out_write_is_cancelled(app, monkeypatch):
+    """Test a write still queued when its caller gives up is never applied"""
+    from app.routes import _create_task
+    committer = GroupCommitter(max_delay=0, max_batch=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow(data):
+        started.set()
+        release.wait(5)
+        return _create_task(data)
+
+    def run_slow():
+        with app.app_context():
+            committer.submit(app, slow, {'title': 'First'})
+    thread = threading.Thread(target=run_slow)
+    thread.start()
+    assert started.wait(5)
+
+    monkeypatch.setattr(group_commit, 'RESULT_TIMEOUT', 0.05)
+    with pytest.raises(futures.TimeoutError):
+        committer.submit(app, _create_task, {'title': 'Late'})
+    release.set()
+    thread.join()
+
+    monkeypatch.setattr(group_commit, 'RESULT_TIMEOUT', 5)
+    assert committer.submit(app, _create_task, {'title': 'After'})[1] == 201
+    assert [task.title for task in Task.query.order_by(Task.id)] == ['First', 'After']
+
+def test_apply_write_without_group_commit(app):
+    """Test writes commit in the request when group commit is off"""
+    app.extensions.pop('group_commit')
+    from app.routes import _create_task
+    with app.test_request_context():
+        assert apply_write(_create_task, {'title': 'Direct'})[1] == 201
+    assert Task.query.count() == 1
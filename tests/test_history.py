@@ -0,0 +1,96 @@
+"""Tests for task history and the cumulative flow endpoint"""
+from collections import Counter
+from datetime import date, datetime
+from app import db
+from app.history import cumulative_flow, rebuild_flow
+from app.models import FlowDay, Task
+from app.seed import seed_tasks
+
+def _flow_rows():
+    return sorted((row.day, row.status, row.delta) for row in FlowDay.query if row.delta)
+
+def test_task_history(client):
+    """Test every tracked change is appended, and history survives deletion"""
+    task_id = client.post('/api/tasks', json={'title': 'Tracked', 'assigned_to': 'Ann'}).get_json()['task']['id']
+    client.put(f'/api/tasks/{task_id}', json={'status': 'In Progress', 'priority': 'High'})
+    client.put(f'/api/tasks/{task_id}', json={'title': 'Renamed'})
+    client.delete(f'/api/tasks/{task_id}')
+
+    data = client.get(f'/api/tasks/{task_id}/history').get_json()
+    assert [(e['op'], e['field'], e['from'], e['to']) for e in data['events']] == [
+        ('created', 'status', None, 'New'),
+        ('created', 'priority', None, 'Medium'),
+        ('created', 'assigned_to', None, 'Ann'),
+        ('updated', 'status', 'New', 'In Progress'),
+        ('updated', 'priority', 'Medium', 'High'),
+        ('deleted', 'status', 'In Progress', None),
+    ]
+    assert client.get('/api/tasks/999/history').status_code == 404
+
+def test_deleted_task_ids_are_not_reused(client):
+    """Test a task created after a delete gets a new id, and only its own history"""
+    old_id = client.post('/api/tasks', json={'title': 'Old'}).get_json()['task']['id']
+    client.put(f'/api/tasks/{old_id}', json={'status': 'Done'})
+    client.delete(f'/api/tasks/{old_id}')
+    
+    new_id = client.post('/api/tasks', json={'title': 'New'}).get_json()['task']['id']
+    assert new_id != old_id
+    events = client.get(f'/api/tasks/{new_id}/history').get_json()['events']
+    assert [(e['op'], e['field']) for e in events] == [('created', 'status'), ('created', 'priority')]
+
+def test_flow_today(client):
+    """Test today's point of the diagram follows creates, moves and deletes"""
+    ids = [client.post('/api/tasks', json={'title': f'Task {i}'}).get_json()['task']['id'] for i in range(3)]
+    client.post('/api/tasks/batch', json={'operations': [
+        {'op': 'update', 'id': ids[0], 'task': {'status': 'Done'}},
+        {'op': 'update', 'id': ids[1], 'task': {'status': 'In Progress'}},
+        {'op': 'delete', 'id': ids[2]}
+    ]})
+
+    data = client.get('/api/flow').get_json()
+    assert len(data['dates']) == 30
+    assert data['dates'][-1] == data['to']
+    assert [(series['status'], series['counts'][-1]) for series in data['series']] == \
+        [('New', 0), ('In Progress', 1), ('Done', 1)]
+
+def test_flow_reconstructed_for_imports(client):
+    """Test imported tasks get a history from their own timestamps"""
+    body = '{"title": "Old", "status": "Done", "assigned_to": "Cy", ' \
+           '"created_at": "2024-01-01T09:00:00", "updated_at": "2024-01-03T12:00:00"}\n'
+    client.post('/api/tasks/import', data=body, content_type='application/x-ndjson')
+
+    data = client.get('/api/flow?from=2023-12-31&to=2024-01-04').get_json()
+    assert data['dates'] == ['2023-12-31', '2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04']
+    assert data['series'] == [
+        {'status': 'New', 'counts': [0, 1, 1, 0, 0]},
+        {'status': 'In Progress', 'counts': [0] * 5},
+        {'status': 'Done', 'counts': [0, 0, 0, 1, 1]}
+    ]
+
+    events = client.get('/api/tasks/1/history').get_json()['events']
+    assert [(e['from'], e['to'], e['occurred_at']) for e in events if e['field'] == 'status'] == \
+        [(None, 'New', '2024-01-01T09:00:00'), ('New', 'Done', '2024-01-03T12:00:00')]
+
+def test_flow_after_seed(app):
+    """Test seeded history ends in the current statuses and matches a rebuild"""
+    seed_tasks(3000, end=datetime(2024, 6, 1))
+    dates, counts = cumulative_flow(date(2023, 6, 1), date(2024, 6, 1), 'month')
+    assert dates[0] == date(2023, 6, 1) and dates[-1] == date(2024, 6, 1)
+    assert counts[-1] == Counter(status for (status,) in db.session.query(Task.status))
+    assert sum(counts[0].values()) < sum(counts[-1].values())
+
+    incremental = _flow_rows()
+    rebuild_flow()
+    assert _flow_rows() == incremental
+
+def test_flow_buckets(client):
+    """Test week and month buckets start on Mondays and the 1st, and bad ranges are rejected"""
+    weeks = client.get('/api/flow?from=2024-01-10&to=2024-02-01&bucket=week').get_json()['dates']
+    assert weeks == ['2024-01-08', '2024-01-15', '2024-01-22', '2024-01-29']
+    months = client.get('/api/flow?from=2024-01-10&to=2024-03-01&bucket=month').get_json()['dates']
+    assert months == ['2024-01-01', '2024-02-01', '2024-03-01']
+
+    assert client.get('/api/flow?bucket=year').status_code == 400
+    assert client.get('/api/flow?from=2024-02-01&to=2024-01-01').status_code == 400
+    assert client.get('/api/flow?from=junk').status_code == 400
+    assert client.get('/api/flow?from=2000-01-01&to=2024-01-01').status_code == 400
@@ -0,0 +1,76 @@
+"""Tests for the Prometheus metrics endpoint"""
+import pytest
+from app import create_app
+
+prometheus_client = pytest.importorskip('prometheus_client')
+from prometheus_client.parser import text_string_to_metric_families  # noqa: E402
+
+def _samples(client):
+    """Return {(sample name, sorted labels): value} from /api/metrics"""
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    samples = {}
+    for family in text_string_to_metric_families(response.get_data(as_text=True)):
+        for sample in family.samples:
+            samples[(sample.name, tuple(sorted(sample.labels.items())))] = sample.value
+    return samples
+
+def test_request_counts_and_latency(client):
+    """Test requests are counted per route template, method and status"""
+    client.post('/api/tasks', json={'title': 'Metered'})
+    client.get('/api/tasks/1')
+    client.get('/api/tasks/1')
+    client.get('/api/tasks/999')
+
+    samples = _samples(client)
+    route = (('method', 'GET'), ('route', '/api/tasks/<int:task_id>'))
+    assert samples[('http_requests_total', route + (('status', '200'),))] == 2
+    assert samples[('http_requests_total', route + (('status', '404'),))] == 1
+    assert samples[('http_requests_total', (('method', 'POST'), ('route', '/api/tasks'), ('status', '201')))] == 1
+    assert samples[('http_request_duration_seconds_count', route)] == 3
+    assert samples[('http_request_duration_seconds_sum', route)] > 0
+    # Only the metrics request itself is in progress
+    assert samples[('http_requests_in_progress', ())] == 1
+
+def test_sql_statements_per_request(client):
+    """Test SQL statements and their time are recorded per request"""
+    client.post('/api/tasks', json={'title': 'Metered'})
+    client.get('/api/tasks/1')
+
+    samples = _samples(client)
+    route = (('method', 'GET'), ('route', '/api/tasks/<int:task_id>'))
+    # Data version lookup plus the task itself
+    assert samples[('http_request_db_statements_sum', route)] == 2
+    assert samples[('http_request_db_statements_bucket', (('le', '2.0'),) + route)] == 1
+    assert samples[('http_request_db_duration_seconds_sum', route)] > 0
+
+def test_streamed_response_recorded_on_close(client):
+    """Test a streamed export is recorded once its body has been sent, SQL included"""
+    client.post('/api/tasks', json={'title': 'Metered'})
+    client.get('/api/tasks/export', buffered=True)
+
+    samples = _samples(client)
+    route = (('method', 'GET'), ('route', '/api/tasks/export'))
+    assert samples[('http_requests_total', route + (('status', '200'),))] == 1
+    assert samples[('http_request_db_statements_sum', route)] >= 1
+
+def test_task_cache_counters(client):
+    """Test task list cache hits, misses and invalidations are exported"""
+    client.post('/api/tasks', json={'title': 'Cached'})
+    client.get('/api/tasks')
+    client.get('/api/tasks')
+    client.put('/api/tasks/1', json={'title': 'Changed'})
+
+    samples = _samples(client)
+    assert samples[('task_cache_lookups_total', (('result', 'hit'),))] == 1
+    assert samples[('task_cache_lookups_total', (('result', 'miss'),))] == 1
+    assert samples[('task_cache_invalidations_total', ())] == 1
+    assert samples[('task_cache_entries', ())] == 0
+
+def test_metrics_disabled():
+    """Test METRICS_ENABLED=False turns the endpoint off"""
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                      'METRICS_ENABLED': False})
+    response = app.test_client().get('/api/metrics')
+    assert response.status_code == 404
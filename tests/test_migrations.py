@@ -0,0 +1,191 @@
+"""Tests for versioned schema migrations and the readiness check"""
+import sqlite3
+import pytest
+from sqlalchemy import inspect, text
+from app import create_app, db
+from app import migrations
+from app.migrations import MIGRATIONS, head_version, schema_version, upgrade
+from app.schema import ensure_task_history
+
+def _config(tmp_path, **config):
+    return dict({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "kanban.db"}',
+        'SHARD_DIRS': [str(tmp_path / 'shards')]
+    }, **config)
+
+@pytest.fixture
+def add_migration():
+    """Register a migration after the latest one when called; returns the shard flags it ran with"""
+    applied = []
+    entry = (head_version() + 1, 'add_task_estimate', None)
+
+    def add_column(engine, shard):
+        applied.append(shard)
+        with engine.begin() as conn:
+            conn.execute(text('ALTER TABLE tasks ADD COLUMN estimate INTEGER'))
+
+    def register():
+        MIGRATIONS.append(entry[:2] + (add_column,))
+        return applied
+
+    yield register
+    if MIGRATIONS[-1][0] == entry[0]:
+        MIGRATIONS.pop()
+
+def test_new_database_is_stamped(tmp_path):
+    """Test a new database gets the whole schema and the latest version, and is ready"""
+    app = create_app(_config(tmp_path, SCHEMA_AUTO_UPGRADE=False))
+    with app.app_context():
+        assert schema_version() == head_version()
+        assert 'tasks' in inspect(db.engine).get_table_names()
+    response = app.test_client().get('/api/ready')
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'ready', 'schema_version': head_version()}
+
+def test_unmigrated_database_waits_for_upgrade(tmp_path):
+    """Test a database from before migrations is not ready until `flask upgrade` brings it up to date"""
+    conn = sqlite3.connect(tmp_path / 'kanban.db')
+    conn.execute('CREATE TABLE tasks (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, description TEXT, '
+                 'status VARCHAR(50), priority VARCHAR(50), assigned_to VARCHAR(100), '
+                 'created_at DATETIME, updated_at DATETIME)')
+    conn.execute("INSERT INTO tasks (title, status) VALUES ('Old', 'New')")
+    conn.commit()
+    conn.close()
+
+    app = create_app(_config(tmp_path, SCHEMA_AUTO_UPGRADE=False))
+    client = app.test_client()
+    response = client.get('/api/ready')
+    assert response.status_code == 503
+    assert response.get_json()['schema_version'] is None
+    response = client.get('/api/tasks')
+    assert response.status_code == 503
+    assert response.get_json() == {'success': False, 'error': 'Database needs `flask --app run upgrade`'}
+    assert client.get('/api/health').status_code == 200
+
+    result = app.test_cli_runner().invoke(args=['upgrade'])
+    assert 'Upgraded from version None' in result.output
+    assert client.get('/api/ready').status_code == 200
+    assert client.get('/api/tasks').get_json()['tasks'][0]['title'] == 'Old'
+
+def test_pending_migrations_run_once(tmp_path, add_migration):
+    """Test upgrade applies only the migrations newer than the database, to board databases too"""
+    app = create_app(_config(tmp_path))
+    board_id = app.test_client().post('/api/boards', json={'name': 'Sharded'}).get_json()['board']['id']
+    applied = add_migration()
+    assert app.test_client().get('/api/ready').status_code == 503
+
+    result = app.test_cli_runner().invoke(args=['upgrade'])
+    assert 'add_task_estimate' in result.output
+    assert 'Upgraded 1 board databases' in result.output
+    assert applied == [False, True]
+    with app.app_context():
+        assert schema_version() == head_version()
+        assert 'estimate' in {column['name'] for column in inspect(db.engine).get_columns('tasks')}
+
+    assert 'up to date' in app.test_cli_runner().invoke(args=['upgrade']).output
+    assert applied == [False, True]
+    assert app.test_client().get(f'/api/boards/{board_id}/tasks').status_code == 200
+
+def test_stale_board_database_waits_for_upgrade(tmp_path, add_migration):
+    """Test without SCHEMA_AUTO_UPGRADE an out-of-date board database answers 503 until upgraded"""
+    app = create_app(_config(tmp_path))
+    board_id = app.test_client().post('/api/boards', json={'name': 'Sharded'}).get_json()['board']['id']
+    applied = add_migration()
+    
+    app = create_app(_config(tmp_path, SCHEMA_AUTO_UPGRADE=False))
+    client = app.test_client()
+    response = client.get(f'/api/boards/{board_id}/tasks')
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
+    assert 'upgrade' in response.get_json()['error']
+    assert applied == []
+    
+    result = app.test_cli_runner().invoke(args=['upgrade'])
+    assert 'Upgraded 1 board databases' in result.output
+    assert applied == [False, True]
+    assert client.get(f'/api/boards/{board_id}/tasks').status_code == 200
+
+def test_existing_tasks_get_history_and_flow(tmp_path):
+    """Test migration 3 reconstructs the history of tasks written before task_events existed"""
+    create_app(_config(tmp_path))
+    conn = sqlite3.connect(tmp_path / 'kanban.db')
+    conn.execute("INSERT INTO tasks (title, status, created_at, updated_at) "
+                 "VALUES ('Shipped', 'Done', '2024-01-01 09:00:00', '2024-01-03 09:00:00')")
+    conn.execute("INSERT INTO tasks (title, status, created_at) VALUES ('Open', 'New', '2024-01-02 09:00:00')")
+    conn.execute('DELETE FROM schema_migrations WHERE version >= 3')
+    conn.commit()
+    conn.close()
+    
+    app = create_app(_config(tmp_path, SCHEMA_AUTO_UPGRADE=False))
+    client = app.test_client()
+    assert 'backfill_task_events' in app.test_cli_runner().invoke(args=['upgrade']).output
+    
+    events = client.get('/api/tasks/1/history').get_json()['events']
+    assert [(e['field'], e['from'], e['to'], e['occurred_at']) for e in events if e['field'] == 'status'] == [
+        ('status', None, 'New', '2024-01-01T09:00:00'),
+        ('status', 'New', 'Done', '2024-01-03T09:00:00'),
+    ]
+    flow = client.get('/api/flow?from=2024-01-01&to=2024-01-03').get_json()
+    assert {series['status']: series['counts'] for series in flow['series']} == {
+        'New': [1, 2, 1], 'In Progress': [0, 0, 0], 'Done': [0, 0, 1]
+    }
+    # Running it again adds nothing
+    with app.app_context():
+        ensure_task_history()
+    assert len(client.get('/api/tasks/1/history').get_json()['events']) == len(events)
+
+def test_startup_only_checks_the_version(tmp_path, monkeypatch):
+    """Test starting against an up-to-date database does not touch the schema"""
+    create_app(_config(tmp_path))
+
+    def fail(*args, **kwargs):
+        raise AssertionError('schema rebuilt at startup')
+    monkeypatch.setattr(migrations, 'ensure_schema', fail)
+    app = create_app(_config(tmp_path))
+    with app.app_context():
+        assert upgrade() == []
+
+def test_task_ids_migration_keeps_data_and_stops_reuse(tmp_path):
+    """Test migration 2 rebuilds tasks with AUTOINCREMENT, keeping rows, search and triggers"""
+    app = create_app(_config(tmp_path))
+    client = app.test_client()
+    for title in ('Alpha', 'Beta', 'Gamma'):
+        client.post('/api/tasks', json={'title': title})
+    client.delete('/api/tasks/3')
+    
+    # Put the database back at version 1, from before the change
+    conn = sqlite3.connect(tmp_path / 'kanban.db')
+    conn.execute('PRAGMA writable_schema = ON')
+    conn.execute("UPDATE sqlite_master SET sql = replace(sql, ' AUTOINCREMENT', '') WHERE name = 'tasks'")
+    conn.execute('PRAGMA writable_schema = OFF')
+    conn.execute("DELETE FROM sqlite_sequence WHERE name = 'tasks'")
+    conn.execute('DELETE FROM schema_migrations WHERE version >= 2')
+    conn.commit()
+    conn.close()
+    
+    app = create_app(_config(tmp_path, SCHEMA_AUTO_UPGRADE=False))
+    client = app.test_client()
+    assert 'task_ids_autoincrement' in app.test_cli_runner().invoke(args=['upgrade']).output
+    
+    assert [task['title'] for task in client.get('/api/tasks').get_json()['tasks']] == ['Alpha', 'Beta']
+    task = client.post('/api/tasks', json={'title': 'Delta', 'status': 'Done'}).get_json()['task']
+    assert task['id'] == 4
+    assert client.get('/api/tasks/search?q=delta').get_json()['tasks'][0]['id'] == 4
+    assert client.get('/api/stats').get_json()['wip'] == {'Done': 1, 'New': 2}
+
+def test_board_generation_migration(tmp_path):
+    """Test migration 4 adds the generation column to an existing board registry"""
+    create_app(_config(tmp_path))
+    conn = sqlite3.connect(tmp_path / 'kanban.db')
+    conn.execute('ALTER TABLE boards DROP COLUMN generation')
+    conn.execute('DELETE FROM schema_migrations WHERE version >= 4')
+    conn.commit()
+    conn.close()
+
+    app = create_app(_config(tmp_path, SCHEMA_AUTO_UPGRADE=False))
+    assert 'board_generation' in app.test_cli_runner().invoke(args=['upgrade']).output
+    with app.app_context():
+        columns = {column['name'] for column in inspect(db.engine).get_columns('boards')}
+        assert 'generation' in columns
+        assert schema_version() == head_version()
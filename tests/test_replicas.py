@@ -0,0 +1,116 @@
+"""Tests for read replica routing"""
+import sqlite3
+import threading
+import time
+import pytest
+from app import create_app, db
+
+@pytest.fixture
+def app(tmp_path):
+    """Create application for testing, with a primary and one replica file, checked only by the tests"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "primary.db"}',
+        'DATABASE_REPLICA_URLS': [f'sqlite:///{tmp_path / "replica.db"}'],
+        'REPLICA_CHECK_INTERVAL': 0,
+        'SHARD_DIRS': [str(tmp_path / 'shards')]
+    })
+    app.replicate = lambda: _replicate(tmp_path / 'primary.db', tmp_path / 'replica.db')
+    app.replicate()
+    with app.app_context():
+        yield app
+        db.session.remove()
+    app.extensions['replicas'].close()
+
+def _replicate(primary, replica):
+    source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+def _titles(client, path='/api/tasks'):
+    return [task['title'] for task in client.get(path).get_json()['tasks']]
+
+def test_reads_go_to_replica(app):
+    """Test task reads are served by the replica and writes by the primary"""
+    writer, reader = app.test_client(), app.test_client()
+    writer.post('/api/tasks', json={'title': 'Replicated'})
+    app.replicate()
+    writer.post('/api/tasks', json={'title': 'Recent'})
+    app.extensions['replicas'].check(db.engine, force=True)
+
+    assert _titles(reader) == ['Replicated']
+    assert reader.get('/api/tasks/2').status_code == 404
+    # Unrouted views read the primary
+    assert reader.get('/api/board').get_json()['total'] == 2
+
+def test_read_your_writes(app):
+    """Test a client's reads skip replicas that have not caught up with its latest write"""
+    writer = app.test_client()
+    writer.post('/api/tasks', json={'title': 'Replicated'})
+    app.replicate()
+    response = writer.post('/api/tasks', json={'title': 'Mine'})
+    assert 'kanban_written_version=2' in response.headers['Set-Cookie']
+    app.extensions['replicas'].check(db.engine, force=True)
+
+    assert _titles(writer) == ['Replicated', 'Mine']
+    assert writer.get('/api/tasks/2').get_json()['task']['title'] == 'Mine'
+    assert _titles(app.test_client()) == ['Replicated']
+
+def test_lagging_replica_falls_back_to_primary(app):
+    """Test a replica more than REPLICA_MAX_LAG seconds behind is skipped until it catches up"""
+    pool = app.extensions['replicas']
+    now = [0.0]
+    pool.clock = lambda: now[0]
+    app.test_client().post('/api/tasks', json={'title': 'Unreplicated'})
+
+    reader = app.test_client()
+    pool.check(db.engine)
+    assert _titles(reader) == []
+    now[0] = 0.5
+    pool.check(db.engine)
+    assert _titles(reader) == []
+    now[0] = 1.5
+    pool.check(db.engine)
+    assert _titles(reader) == ['Unreplicated']
+
+    app.replicate()
+    now[0] = 2.0
+    pool.check(db.engine)
+    assert pool.lags == [0.0] and pool.versions == [1]
+
+def test_unreachable_replica(tmp_path):
+    """Test reads fall back to the primary when no replica can be reached"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "primary.db"}',
+        'DATABASE_REPLICA_URLS': [f'sqlite:///{tmp_path / "missing" / "replica.db"}'],
+        'REPLICA_CHECK_INTERVAL': 0,
+        'SHARD_DIRS': [str(tmp_path / 'shards')]
+    })
+    client = app.test_client()
+    client.post('/api/tasks', json={'title': 'Primary'})
+    with app.app_context():
+        app.extensions['replicas'].check(db.engine, force=True)
+    assert app.extensions['replicas'].lags == [float('inf')]
+    assert _titles(app.test_client()) == ['Primary']
+    app.extensions['replicas'].close()
+
+def test_replicas_are_checked_in_the_background(app):
+    """Test the first routed read starts a thread that keeps the replica versions current"""
+    pool = app.extensions['replicas']
+    pool.check_interval = 0.01
+    app.test_client().post('/api/tasks', json={'title': 'Replicated'})
+    app.replicate()
+    
+    # Not checked yet, so served by the primary
+    assert _titles(app.test_client()) == ['Replicated']
+    deadline = time.monotonic() + 5
+    while pool.versions != [1] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.versions == [1] and pool.lags == [0.0]
+    
+    pool.close()
+    assert 'replica-checker' not in [thread.name for thread in threading.enumerate()]
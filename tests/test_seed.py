@@ -0,0 +1,56 @@
+"""Tests for the synthetic task generator"""
+from collections import Counter
+from datetime import datetime
+from app.changes import current_version
+from app.models import Task
+from app.seed import generate_tasks, seed_tasks
+
+END = datetime(2024, 6, 1)
+
+def _rows(count, **kwargs):
+    return [row for rows in generate_tasks(count, end=END, chunk_size=300, **kwargs) for row in rows]
+
+def test_generate_is_deterministic():
+    """Test the same seed generates the same tasks and another seed does not"""
+    assert _rows(1000, seed=7) == _rows(1000, seed=7)
+    assert _rows(1000, seed=7) != _rows(1000, seed=8)
+
+def test_generate_distributions():
+    """Test statuses are skewed, assignees limited and timestamps ordered"""
+    rows = _rows(5000, assignees=10, days=30)
+    statuses = Counter(row['status'] for row in rows)
+    assert statuses['Done'] > statuses['New'] > statuses['In Progress']
+    assert len({row['assigned_to'] for row in rows} - {''}) == 10
+
+    created = [row['created_at'] for row in rows]
+    assert created == sorted(created)
+    assert (END - created[0]).days <= 30 and created[-1] <= END
+    assert all(row['created_at'] <= row['updated_at'] for row in rows)
+
+def test_seed_tasks(app, client):
+    """Test seeding inserts every task, indexes it for search and bumps the version"""
+    version = current_version()
+    seed_tasks(2500, end=END, chunk_size=1000)
+
+    assert Task.query.count() == 2500
+    assert current_version() == version + 1
+    assert client.get('/api/tasks/search?q=checkout').get_json()['count'] > 0
+    data = client.get('/api/tasks?limit=1').get_json()
+    assert data['tasks'][0]['created_at'].startswith('2023-06')
+
+def test_seed_reset_expires_sync_tokens(app, client):
+    """Test --reset replaces the tasks and old sync tokens get 410"""
+    seed_tasks(100, end=END)
+    token = client.get('/api/tasks/changes').get_json()['next_token']
+
+    seed_tasks(50, end=END, reset=True)
+    assert Task.query.count() == 50
+    assert client.get(f'/api/tasks/changes?since={token}').status_code == 410
+    assert client.get('/api/tasks/search?q=the').get_json()['count'] <= 50
+
+def test_seed_command(app):
+    """Test the seed CLI command"""
+    result = app.test_cli_runner().invoke(args=['seed', '--count', '300', '--seed', '3'])
+    assert result.exit_code == 0
+    assert 'Inserted 300 tasks' in result.output
+    assert Task.query.count() == 300
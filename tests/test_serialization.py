@@ -0,0 +1,70 @@
+"""Tests for the fast serialization path"""
+from datetime import datetime
+import json
+import pytest
+from flask.json.provider import DefaultJSONProvider
+from app import db
+from app.models import Task
+from app.serialization import (CompactJSONProvider, OrJSONProvider, orjson,
+                               task_row_serializer, task_select)
+
+def _add_tasks():
+    """Insert tasks covering the awkward cases: unicode, NULLs, whole-second timestamps"""
+    db.session.add_all([
+        Task(title='Café ☕ 日本語', description='line\nbreak "quoted"  ', assigned_to='Zoë'),
+        Task(title='No dates', description=None, assigned_to=None,
+             created_at=datetime(2024, 1, 2, 3, 4, 5), updated_at=datetime(2024, 1, 2, 3, 4, 5, 6)),
+    ])
+    db.session.commit()
+
+def test_row_serializer_matches_to_dict(app):
+    """Test Core rows serialize exactly like Task.to_dict()"""
+    _add_tasks()
+    dialect = db.engine.dialect.name
+    
+    for fields in (Task.FIELDS, ('title', 'updated_at')):
+        serialize = task_row_serializer(fields, dialect)
+        rows = db.session.execute(task_select(fields, dialect).order_by(Task.id)).all()
+        expected = [task.to_dict(fields) for task in Task.query.order_by(Task.id)]
+        assert [serialize(row) for row in rows] == expected
+
+@pytest.mark.skipif(orjson is None, reason='orjson is not installed')
+def test_json_providers_are_byte_identical(app):
+    """Test the orjson and standard library providers write the same bytes"""
+    _add_tasks()
+    client = app.test_client()
+    payloads = [
+        client.get('/api/tasks').get_json(),
+        client.get('/api/board').get_json(),
+        {'none': None, 'bool': True, 'float': 0.5, 'int': -3, 'nested': {'b': [1, 'ü'], 'a': {}}},
+    ]
+    
+    stdlib, fast = CompactJSONProvider(app), OrJSONProvider(app)
+    for payload in payloads:
+        assert stdlib.response(payload).get_data() == fast.response(payload).get_data()
+        assert stdlib.dumps(payload) == fast.dumps(payload)
+
+def test_non_ascii_is_written_as_utf8(app):
+    """Test responses match Flask's default provider except that non-ASCII text is not escaped"""
+    _add_tasks()
+    client = app.test_client()
+    payload = client.get('/api/tasks').get_json()
+    flask_default = json.dumps(payload, ensure_ascii=True, sort_keys=True, separators=(',', ':'))
+    
+    body = CompactJSONProvider(app).dumps(payload)
+    assert json.loads(body) == json.loads(flask_default)
+    assert 'Café ☕ 日本語' in body
+    assert '\\u' not in body and '\\u00e9' in flask_default
+    
+    ascii_payload = {'tasks': [{'title': 'plain', 'id': 1}], 'count': 1}
+    assert CompactJSONProvider(app).response(ascii_payload).get_data() == \
+        DefaultJSONProvider(app).response(ascii_payload).get_data()
+
+@pytest.mark.skipif(orjson is None, reason='orjson is not installed')
+def test_orjson_dumps_honours_arguments(app):
+    """Test json.dumps arguments orjson cannot handle fall back to the standard library"""
+    payload = {'b': 1, 'a': 'ü'}
+    fast = OrJSONProvider(app)
+    assert fast.dumps(payload) == '{"a":"ü","b":1}'
+    assert fast.dumps(payload, sort_keys=False) == '{"b":1,"a":"ü"}'
+    assert fast.dumps(payload, indent=2) == CompactJSONProvider(app).dumps(payload, indent=2)
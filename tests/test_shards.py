@@ -0,0 +1,136 @@
+"""Tests for boards and the shard router"""
+import os
+import pytest
+from sqlalchemy import func, select
+from app import create_app, db
+from app.models import Board, Task
+from app.shards import ShardRouter, board_scope, move_board, plan_rebalance
+
+@pytest.fixture
+def app(tmp_path):
+    """Create application for testing, with two shard directories"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SHARD_DIRS': [str(tmp_path / 'a'), str(tmp_path / 'b')]
+    })
+    with app.app_context():
+        yield app
+        db.session.remove()
+        for path in app.extensions['shards'].open_paths():
+            app.extensions['shards'].close(path)
+
+@pytest.fixture
+def client(app):
+    """Create test client"""
+    return app.test_client()
+
+def _create_board(client, name):
+    response = client.post('/api/boards', json={'name': name})
+    assert response.status_code == 201
+    return response.get_json()['board']['id']
+
+def test_boards_are_isolated(client, tmp_path):
+    """Test each board reads and writes only its own database file"""
+    first, second = _create_board(client, 'First'), _create_board(client, 'Second')
+    assert os.path.exists(tmp_path / 'a' / f'board-{first}.db')
+    assert os.path.exists(tmp_path / 'b' / f'board-{second}.db')
+
+    client.post(f'/api/boards/{first}/tasks', json={'title': 'On first'})
+    client.post(f'/api/boards/{second}/tasks', json={'title': 'On second'})
+    client.post('/api/tasks', json={'title': 'On default'})
+
+    for prefix, title in ((f'/api/boards/{first}', 'On first'), (f'/api/boards/{second}', 'On second'),
+                          ('/api', 'On default'), ('/api/boards/1', 'On default')):
+        tasks = client.get(f'{prefix}/tasks').get_json()['tasks']
+        assert [task['title'] for task in tasks] == [title]
+        assert client.get(f'{prefix}/tasks/1').get_json()['task']['title'] == title
+
+    names = [board['name'] for board in client.get('/api/boards').get_json()['boards']]
+    assert names == ['Default', 'First', 'Second']
+
+def test_unknown_and_moving_boards(client, app):
+    """Test unknown boards are 404 and boards being moved are 503"""
+    assert client.get('/api/boards/99/tasks').status_code == 404
+    assert client.post('/api/boards', json={}).status_code == 400
+
+    board_id = _create_board(client, 'Busy')
+    db.session.get(Board, board_id).moving = True
+    db.session.commit()
+    response = client.get(f'/api/boards/{board_id}/tasks')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+def test_cache_is_per_board(client):
+    """Test cached task lists are never served to, or invalidated by, another board"""
+    board_id = _create_board(client, 'Cached')
+    client.post('/api/tasks', json={'title': 'Default'})
+    client.post(f'/api/boards/{board_id}/tasks', json={'title': 'Board'})
+
+    assert client.get('/api/tasks').headers['X-Cache'] == 'MISS'
+    response = client.get(f'/api/boards/{board_id}/tasks')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['tasks'][0]['title'] == 'Board'
+
+    # Both boards are now at data version 1
+    client.post(f'/api/boards/{board_id}/tasks', json={'title': 'Second'})
+    assert client.get('/api/tasks').headers['X-Cache'] == 'HIT'
+    assert client.get(f'/api/boards/{board_id}/tasks').get_json()['count'] == 2
+
+def test_idle_shards_are_closed(client, app):
+    """Test idle shard engines are disposed and reopened on demand"""
+    board_id = _create_board(client, 'Idle')
+    client.post(f'/api/boards/{board_id}/tasks', json={'title': 'Kept'})
+    router = app.extensions['shards']
+    assert len(router.open_paths()) == 1
+
+    assert router.close_idle(now=float('inf')) == 1
+    assert router.open_paths() == []
+    assert client.get(f'/api/boards/{board_id}/tasks').get_json()['count'] == 1
+
+def test_move_board(client, app, tmp_path):
+    """Test a moved board keeps its tasks and its old file is removed"""
+    board_id = _create_board(client, 'Mover')
+    client.post(f'/api/boards/{board_id}/tasks', json={'title': 'Travels'})
+
+    move_board(board_id, str(tmp_path / 'b'), settle=0)
+    assert not os.path.exists(tmp_path / 'a' / f'board-{board_id}.db')
+    assert db.session.get(Board, board_id).shard == str(tmp_path / 'b')
+    assert client.get(f'/api/boards/{board_id}/tasks').get_json()['tasks'][0]['title'] == 'Travels'
+    with board_scope(board_id):
+        assert Task.query.count() == 1
+
+def test_other_worker_reopens_moved_board(client, app, tmp_path):
+    """Test a router holding a board open reopens it after the board moves away and back"""
+    board_id = _create_board(client, 'Roundtrip')
+    client.post(f'/api/boards/{board_id}/tasks', json={'title': 'Before'})
+    worker = ShardRouter(app.extensions['shards'].directories, registry_ttl=0)
+
+    def count():
+        shard, _, generation = worker.lookup(board_id)
+        with worker.engine(ShardRouter.path(board_id, shard), generation).connect() as conn:
+            return conn.execute(select(func.count()).select_from(Task)).scalar()
+
+    try:
+        assert count() == 1
+        move_board(board_id, str(tmp_path / 'b'), settle=0)
+        move_board(board_id, str(tmp_path / 'a'), settle=0)
+        client.post(f'/api/boards/{board_id}/tasks', json={'title': 'After'})
+        assert count() == 2
+        assert len(worker.open_paths()) == 1
+    finally:
+        for path in worker.open_paths():
+            worker.close(path)
+
+def test_plan_rebalance():
+    """Test boards move off dropped directories and from the fullest to the emptiest"""
+    loads = {1: ('a', 50), 2: ('a', 30), 3: ('a', 20), 4: ('b', 10), 5: ('old', 40)}
+    moves = plan_rebalance(loads, ['a', 'b'])
+    assert (5, 'old', 'b') in moves
+    totals = {'a': 0, 'b': 0}
+    placement = {board_id: directory for board_id, (directory, _) in loads.items()}
+    placement.update({board_id: target for board_id, _, target in moves})
+    for board_id, directory in placement.items():
+        totals[directory] += loads[board_id][1]
+    assert abs(totals['a'] - totals['b']) <= 10
+    assert plan_rebalance({1: ('a', 10), 2: ('b', 10)}, ['a', 'b']) == []
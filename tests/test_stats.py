@@ -0,0 +1,103 @@
+"""Tests for the flow analytics summaries and GET /api/stats"""
+from datetime import date, datetime
+import pytest
+from sqlalchemy import text
+from app import db
+from app.models import AssigneeCycleTime, StatusCount, Task, WeeklyThroughput
+from app.seed import seed_tasks
+from app.stats import read_stats, rebuild_stats
+
+def _summaries():
+    """Non-empty rows of every summary table"""
+    return (
+        sorted((row.status, row.tasks) for row in StatusCount.query if row.tasks),
+        sorted((row.week, row.completed) for row in WeeklyThroughput.query if row.completed),
+        sorted((row.assigned_to, row.completed, row.cycle_seconds)
+               for row in AssigneeCycleTime.query if row.completed)
+    )
+
+def _assert_matches_rebuild():
+    """The incrementally maintained summaries equal a rebuild from scratch"""
+    incremental = _summaries()
+    rebuild_stats()
+    assert _summaries() == incremental
+
+def test_stats_follow_status_changes(client):
+    """Test WIP, throughput and cycle time follow creates, updates and deletes"""
+    ids = [client.post('/api/tasks', json={'title': f'Task {i}', 'assigned_to': 'Ann'}).get_json()['task']['id']
+           for i in range(4)]
+    client.put(f'/api/tasks/{ids[0]}', json={'status': 'In Progress'})
+    client.put(f'/api/tasks/{ids[0]}', json={'status': 'Done'})
+    client.put(f'/api/tasks/{ids[1]}', json={'status': 'Done', 'assigned_to': 'Bob'})
+    client.put(f'/api/tasks/{ids[2]}', json={'status': 'Done'})
+    client.put(f'/api/tasks/{ids[2]}', json={'status': 'New'})
+    client.delete(f'/api/tasks/{ids[3]}')
+
+    data = client.get('/api/stats').get_json()
+    assert data['wip'] == {'Done': 2, 'New': 1}
+    assert data['throughput'][-1]['completed'] == 2
+    assert sum(week['completed'] for week in data['throughput']) == 2
+    assert [(row['assigned_to'], row['completed']) for row in data['cycle_time']] == [('Ann', 1), ('Bob', 1)]
+    _assert_matches_rebuild()
+
+def test_stats_timestamps(app, client):
+    """Test started_at is kept from the first start and completed_at cleared on reopen"""
+    task_id = client.post('/api/tasks', json={'title': 'Flow', 'status': 'In Progress'}).get_json()['task']['id']
+    task = db.session.get(Task, task_id)
+    assert task.started_at == task.created_at
+    started = task.started_at
+
+    client.put(f'/api/tasks/{task_id}', json={'status': 'Done'})
+    db.session.refresh(task)
+    assert task.completed_at >= started
+
+    client.put(f'/api/tasks/{task_id}', json={'status': 'In Progress'})
+    db.session.refresh(task)
+    assert task.completed_at is None
+    assert task.started_at == started
+
+def test_stats_batch_and_import(client):
+    """Test batch writes and imports keep the summaries exact"""
+    keep = client.post('/api/tasks', json={'title': 'Keep', 'status': 'Done'}).get_json()['task']['id']
+    drop = client.post('/api/tasks', json={'title': 'Drop', 'status': 'Done'}).get_json()['task']['id']
+    client.post('/api/tasks/batch', json={'operations': [
+        {'op': 'create', 'task': {'title': 'Batch', 'status': 'In Progress'}},
+        {'op': 'update', 'id': keep, 'task': {'assigned_to': 'Cy'}},
+        {'op': 'delete', 'id': drop}
+    ]})
+    body = '{"title": "Old", "status": "Done", "assigned_to": "Cy", ' \
+           '"created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-03T12:00:00"}\n'
+    client.post('/api/tasks/import', data=body, content_type='application/x-ndjson')
+
+    wip, throughput, cycle_time = read_stats(30, today=date(2024, 1, 10))
+    assert wip == {'Done': 2, 'In Progress': 1}
+    assert throughput[-2:] == [{'week': '2024-01-01', 'completed': 1}, {'week': '2024-01-08', 'completed': 0}]
+    assert cycle_time == [{'assigned_to': 'Cy', 'completed': 2, 'average_hours': pytest.approx(30, abs=1)}]
+    _assert_matches_rebuild()
+
+def test_stats_after_seed(app):
+    """Test seeding rebuilds the summaries and keeps their triggers"""
+    seed_tasks(2000, end=datetime(2024, 6, 1))
+    wip, throughput, cycle_time = read_stats(52, today=date(2024, 6, 1))
+    assert sum(wip.values()) == 2000
+    assert sum(week['completed'] for week in throughput) == wip['Done']
+    assert sum(row['completed'] for row in cycle_time) == wip['Done']
+
+    db.session.execute(text("UPDATE tasks SET status = 'Done' WHERE status = 'New'"))
+    _assert_matches_rebuild()
+
+def test_rebuild_stats_command(app, client):
+    """Test the rebuild-stats command repairs summaries that drifted"""
+    client.post('/api/tasks', json={'title': 'Counted'})
+    db.session.execute(text('UPDATE stats_status SET tasks = 42'))
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['rebuild-stats'])
+    assert result.exit_code == 0
+    assert client.get('/api/stats').get_json()['wip'] == {'New': 1}
+
+def test_stats_weeks_validation(client):
+    """Test ?weeks= sets the throughput window and is validated"""
+    assert len(client.get('/api/stats?weeks=4').get_json()['throughput']) == 4
+    assert client.get('/api/stats?weeks=0').status_code == 400
+    assert client.get('/api/stats?weeks=abc').status_code == 400
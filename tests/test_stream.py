@@ -0,0 +1,114 @@
+"""Tests for the Server-Sent Events change feed"""
+from collections import deque
+import pytest
+from app import create_app, db
+from app.stream import ChangeBroker
+
+@pytest.fixture
+def app():
+    """Create application for testing, without the cross-process watcher"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'SSE_POLL_INTERVAL': 0,
+        'SSE_HEARTBEAT_INTERVAL': 0.05,
+        'SSE_MAX_DURATION': 0.2
+    })
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+def test_broker_fan_out():
+    """Test every subscriber receives each published event"""
+    broker = ChangeBroker(queue_size=10)
+    first, _ = broker.subscribe()
+    second, _ = broker.subscribe()
+    
+    broker.publish(1, [('created', {'task': {'id': 1}})])
+    
+    for subscriber in (first, second):
+        assert subscriber.queue.get_nowait().startswith('id: 1\nevent: created\n')
+
+def test_broker_drops_slow_subscribers():
+    """Test a subscriber whose queue is full is dropped instead of blocking publishers"""
+    broker = ChangeBroker(queue_size=2)
+    slow, _ = broker.subscribe()
+    
+    for version in range(1, 4):
+        broker.publish(version, [('updated', {'task': {'id': 1}})])
+    
+    assert slow.dropped is True
+    assert broker.subscriber_count() == 0
+    assert broker.dropped == 1
+
+def test_broker_resume_from_last_event_id():
+    """Test reconnecting subscribers get retained events after Last-Event-ID"""
+    broker = ChangeBroker(history_size=3)
+    for version in range(1, 6):
+        broker.publish(version, [('updated', {'task': {'id': version}})])
+    
+    _, backlog = broker.subscribe(last_event_id=3)
+    assert [message.split('\n')[0] for message in backlog] == ['id: 4', 'id: 5']
+    
+    _, backlog = broker.subscribe(last_event_id=5)
+    assert backlog == []
+    
+    # Events after version 1 are no longer retained
+    _, backlog = broker.subscribe(last_event_id=1)
+    assert backlog is None
+
+def test_stream_endpoint(app):
+    """Test the stream replays missed events and sends heartbeats"""
+    client = app.test_client()
+    broker = app.extensions['change_broker']
+    
+    response = client.get('/api/tasks/stream')
+    assert response.mimetype == 'text/event-stream'
+    body = response.get_data(as_text=True)
+    assert body.startswith('retry: 3000\n\n')
+    assert ': keep-alive' in body
+    assert broker.subscriber_count() == 0
+    
+    # A task created while disconnected is replayed on reconnect
+    client.post('/api/tasks', json={'title': 'Missed'})
+    body = client.get('/api/tasks/stream', headers={'Last-Event-ID': '0'}).get_data(as_text=True)
+    assert 'id: 1\nevent: created' in body
+    assert '"title":"Missed"' in body
+
+def test_stream_reset_when_history_is_gone(app):
+    """Test an unknown resume point gets a reset event"""
+    client = app.test_client()
+    app.extensions['change_broker']._history = deque(maxlen=1)
+    for title in ('One', 'Two', 'Three'):
+        client.post('/api/tasks', json={'title': title})
+    
+    body = client.get('/api/tasks/stream', headers={'Last-Event-ID': '1'}).get_data(as_text=True)
+    assert 'event: reset' in body
+
+def test_broker_reports_writes_from_other_processes():
+    """Test a gap in the version sequence is published as a sync event"""
+    broker = ChangeBroker()
+    broker.observe(1)
+    subscriber, _ = broker.subscribe()
+    
+    broker.publish(4, [('created', {'task': {'id': 9}})])
+    
+    assert subscriber.queue.get_nowait().startswith('id: 3\nevent: sync\n')
+    assert subscriber.queue.get_nowait().startswith('id: 4\nevent: created\n')
+
+def test_stream_refused_beyond_subscriber_limit(app):
+    """Test streams beyond SSE_MAX_SUBSCRIBERS per process get 503 with Retry-After"""
+    client = app.test_client()
+    broker = app.extensions['change_broker']
+    app.config['SSE_MAX_SUBSCRIBERS'] = 1
+    subscriber, _ = broker.subscribe()
+    
+    response = client.get('/api/tasks/stream')
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
+    assert response.get_json()['success'] is False
+    
+    broker.unsubscribe(subscriber)
+    response = client.get('/api/tasks/stream')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'